@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end pipeline throughput at several scales.
+
+Runs main.run_pipeline for geos x industries x leads-per-industry against the
+stub providers (no keys, modules/stubs.py) or the mock API server
+(benchmarks/mock_api_server.py), and reports wall time, leads/sec, p50/p95 per
+stage (discovery, enumeration, audit, llm, persistence) and peak RSS. Results
+are saved as JSON so runs on different commits can be diffed with --compare.
+
+Usage:
+    python benchmarks/bench_pipeline.py                                   # stub providers, default scales
+    python benchmarks/bench_pipeline.py --mode mock --scales 1x5x100,2x5x400
+    python benchmarks/bench_pipeline.py --mode mock --mock-url http://127.0.0.1:8799   # already-running server
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/pipeline_abc1234_stub.json
+
+Each scale runs in its own subprocess and temporary working directory, so
+peak RSS is per scale and the run's CSVs, reports and cache never touch the
+repo. Extra env (e.g. AUDIT_WORKERS=32 RATE_LIMIT_PAGESPEED=0) is passed through.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+MOCK_SERVER = Path(__file__).resolve().parent / "mock_api_server.py"
+
+DEFAULT_SCALES = "1x2x10,1x5x30,2x5x60"
+GEOS = ["Houston, TX", "Austin, TX", "Denver, CO", "Phoenix, AZ", "Atlanta, GA",
+        "Seattle, WA", "Tampa, FL", "Columbus, OH", "Nashville, TN", "San Diego, CA"]
+
+# Cleared in stub mode so every provider falls back to modules/stubs.py
+PROVIDER_ENV = ["GOOGLE_PLACES_API_KEY", "PSI_API_KEY", "HUNTER_API_KEY", "SERPAPI_KEY",
+                "DATAFORSEO_LOGIN", "DATAFORSEO_PASSWORD", "ANTHROPIC_API_KEY", "OPENAI_API_KEY",
+                "SLACK_WEBHOOK_URL", "GOOGLE_SHEETS_SPREADSHEET_ID", "MOCK_API_URL"]
+
+
+def _parse_scale(spec: str) -> Dict[str, int]:
+    geos, industries, leads = (int(part) for part in spec.lower().split("x"))
+    if geos > len(GEOS):
+        raise ValueError(f"at most {len(GEOS)} geos, got {geos}")
+    return {"geos": geos, "industries": industries, "leads_per_industry": leads}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_scale(scale: Dict[str, int], warm: bool, verbose: bool) -> Dict:
+    """Run one scale in this process (the --run-scale child) and measure it."""
+    import main
+    from modules import cache, metrics, psi
+
+    os.environ["MAX_INDUSTRIES"] = str(scale["industries"])
+    os.environ["LEADS_PER_INDUSTRY"] = str(scale["leads_per_industry"])
+    geos = GEOS[:scale["geos"]]
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        if warm:
+            for geo in geos:
+                main.run_pipeline(geo)
+
+        # run_pipeline resets the per-run metrics, so collect them after each geo
+        stage_samples: Dict[str, List[float]] = {}
+        psi_stats, cache_stats, rows = [], [], 0
+        start = time.perf_counter()
+        for geo in geos:
+            rows += len(main.run_pipeline(geo))
+            for stage, values in metrics.samples().items():
+                stage_samples.setdefault(stage, []).extend(values)
+            psi_stats.append(psi.stats())
+            cache_stats.append(cache.stats())
+        wall = time.perf_counter() - start
+
+    return {
+        "scale": scale,
+        "warm_cache": warm,
+        "wall_s": round(wall, 2),
+        "rows": rows,
+        "leads_per_sec": round(rows / wall, 2) if wall else 0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": metrics.summarize(stage_samples),
+        "psi": psi_stats,
+        "cache": cache_stats,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_mock(places_pages: int) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, str(MOCK_SERVER), "--port", str(port),
+                             "--places-pages", str(places_pages)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(50):
+        try:
+            urllib.request.urlopen(f"{base_url}/__stats", timeout=1).read()
+            return proc, base_url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("mock API server did not start")
+
+
+def _child_env(mode: str, mock_url: Optional[str], places_pages: int, workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    for name in PROVIDER_ENV:
+        env.pop(name, None)
+    if mode == "mock":
+        sys.path.insert(0, str(MOCK_SERVER.parent))
+        from mock_api_server import mock_env
+        env.update(mock_env(mock_url))
+        env["PLACES_MAX_PAGES"] = str(places_pages)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    env.setdefault("CACHE_PATH", os.path.join(workdir, "cache", "http_cache.sqlite"))
+    return env
+
+
+def _git_label() -> str:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _print_results(results: List[Dict], baseline: Optional[Dict] = None):
+    base_by_scale = {json.dumps(r["scale"], sort_keys=True): r for r in (baseline or {}).get("results", [])}
+    print(f"\n{'scale (GxIxL)':<16}{'rows':>7}{'wall s':>9}{'leads/s':>9}{'RSS MB':>8}  stages p50/p95 (s)")
+    for r in results:
+        s = r["scale"]
+        stages = "  ".join(f"{name} {st['p50_s']}/{st['p95_s']}" for name, st in r["stages"].items())
+        print(f"{s['geos']}x{s['industries']}x{s['leads_per_industry']:<10}{r['rows']:>7}{r['wall_s']:>9}"
+              f"{r['leads_per_sec']:>9}{r['peak_rss_mb'] or '-':>8}  {stages}")
+        base = base_by_scale.get(json.dumps(s, sort_keys=True))
+        if base and base["leads_per_sec"]:
+            change = (r["leads_per_sec"] - base["leads_per_sec"]) / base["leads_per_sec"] * 100
+            print(f"{'':<16}vs {baseline['label']}: {base['leads_per_sec']} leads/s ({change:+.1f}%), "
+                  f"wall {base['wall_s']}s, RSS {base['peak_rss_mb']} MB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated geos x industries x leads")
+    parser.add_argument("--mode", choices=["stub", "mock"], default="stub", help="Provider backend")
+    parser.add_argument("--mock-url", help="Use an already-running mock server instead of starting one")
+    parser.add_argument("--warm", action="store_true", help="Run each scale once untimed first (warm cache)")
+    parser.add_argument("--output", type=Path, help="Results JSON (default benchmarks/results/pipeline_<commit>_<mode>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    parser.add_argument("--run-scale", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scale:
+        print(json.dumps(_run_scale(_parse_scale(args.run_scale), args.warm, args.verbose)))
+        return 0
+
+    scales = [spec.strip() for spec in args.scales.split(",") if spec.strip()]
+    for spec in scales:
+        _parse_scale(spec)
+    places_pages = max(1, math.ceil(max(_parse_scale(spec)["leads_per_industry"] for spec in scales) / 20))
+
+    mock_proc, mock_url = None, args.mock_url
+    if args.mode == "mock" and not mock_url:
+        mock_proc, mock_url = _start_mock(places_pages)
+        print(f"🧪 Mock APIs on {mock_url}")
+
+    results = []
+    try:
+        for spec in scales:
+            print(f"⏱️  {args.mode} {spec} ...", flush=True)
+            with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+                cmd = [sys.executable, str(Path(__file__).resolve()), "--run-scale", spec]
+                cmd += ["--warm"] * args.warm + ["--verbose"] * args.verbose
+                proc = subprocess.run(cmd, cwd=workdir, env=_child_env(args.mode, mock_url, places_pages, workdir),
+                                      stdout=subprocess.PIPE, text=True)
+            if proc.returncode != 0:
+                print(f"❌ {spec} failed (exit {proc.returncode})")
+                continue
+            if args.verbose:
+                print(proc.stdout.rsplit("\n", 2)[0])
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    finally:
+        if mock_proc:
+            mock_proc.terminate()
+            mock_proc.wait()
+
+    label = _git_label()
+    payload = {
+        "label": label,
+        "mode": args.mode,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"pipeline_{label}_{args.mode}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, indent=2))
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    _print_results(results, baseline)
+    print(f"\n💾 Results saved to {output}")
+    return 0 if len(results) == len(scales) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Mock API server for offline load tests.
+
+Stands in for every external service the pipeline calls: Google Places
+(text search + details), PageSpeed Insights, DataForSEO (live, task queue and
+locations), SerpAPI, Hunter, Anthropic messages, OpenAI chat completions and a
+Slack webhook, plus the lead websites themselves. Responses are deterministic
+per --seed, and latency, error rate, per-second rate limits and total quotas
+are configurable per provider, so the real HTTP code paths (pagination,
+retries, 429 handling, caching) run end to end without keys.
+
+Usage:
+    python benchmarks/mock_api_server.py --port 8799 --latency pagespeed=2,google_places=0.1 \\
+        --error-rate 0.01 --rps pagespeed=4 --quota pagespeed=500
+    python benchmarks/mock_api_server.py --print-env     # env vars that point the pipeline here
+
+    MOCK_API_URL=http://127.0.0.1:8799 GOOGLE_PLACES_API_KEY=mock PSI_API_KEY=mock \\
+        python main.py --once --geo "Houston, TX"
+
+Providers: google_places, pagespeed, dataforseo, serpapi, hunter, anthropic,
+openai, slack, sites. GET /__stats returns per-provider request counts.
+
+For ~10k leads: PLACES_MAX_PAGES=20 LEADS_PER_INDUSTRY=400 MAX_INDUSTRIES=25.
+All mock sites share this server's host, so raise HTTP_POOL_MAXSIZE, or on
+Linux pass --spread-hosts to give each site its own 127.x.y.z address.
+The client-side RATE_LIMIT_* budgets still apply (set them to 0 to measure the
+pipeline rather than its limiters), and a provider's own <PROVIDER>_BASE_URL
+(e.g. ANTHROPIC_BASE_URL) overrides MOCK_API_URL.
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import base64
+import hashlib
+import argparse
+import threading
+from collections import defaultdict
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+PROVIDERS = ("google_places", "pagespeed", "dataforseo", "serpapi", "hunter", "anthropic", "openai", "slack", "sites")
+
+INDUSTRY_WORDS = ("Plumbing", "Roofing", "Dental", "Law", "Auto", "HVAC", "Landscaping", "Cleaning", "Realty", "Solar")
+SERVICE_PAGES = ("services", "about", "contact", "locations", "faq", "blog")
+
+
+class MockConfig:
+    """Server-wide knobs, shared by all handler threads."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.seed = args.seed
+        self.latency = _parse_pairs(args.latency)
+        self.error_rate = args.error_rate
+        self.rps = _parse_pairs(args.rps)
+        self.quota = {k: int(v) for k, v in _parse_pairs(args.quota).items()}
+        self.places_pages = args.places_pages
+        self.token_delay = args.token_delay
+        self.psi_payload_kb = args.psi_payload_kb
+        self.task_delay = args.task_delay
+        self.spread_hosts = args.spread_hosts
+        self.no_website_rate = args.no_website_rate
+
+
+class MockState:
+    """Counters, rate buckets, quotas and queued DataForSEO tasks."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.rejected: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self.tasks: Dict[str, Tuple[float, Dict]] = {}
+        self.cached_prefixes: set = set()
+
+    def take_rate(self, provider: str, rate: float) -> bool:
+        """Non-blocking token bucket (burst = 1 second of traffic)."""
+        with self.lock:
+            now = time.monotonic()
+            tokens, updated = self.buckets.get(provider, (rate, now))
+            tokens = min(max(rate, 1.0), tokens + (now - updated) * rate)
+            if tokens < 1:
+                self.buckets[provider] = (tokens, now)
+                return False
+            self.buckets[provider] = (tokens - 1, now)
+            return True
+
+
+def _parse_pairs(spec: str) -> Dict[str, float]:
+    """"pagespeed=2,google_places=0.1" -> {"pagespeed": 2.0, "google_places": 0.1}"""
+    pairs = {}
+    for part in filter(None, (spec or "").split(",")):
+        name, _, value = part.partition("=")
+        if name.strip() not in PROVIDERS:
+            raise SystemExit(f"Unknown provider '{name}', expected one of {', '.join(PROVIDERS)}")
+        pairs[name.strip()] = float(value)
+    return pairs
+
+
+def _rng(seed: int, *key) -> random.Random:
+    material = "|".join([str(seed)] + [str(k) for k in key])
+    return random.Random(int.from_bytes(hashlib.sha256(material.encode()).digest()[:8], "big"))
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    server_version = "MockAPI/1.0"
+
+    # (method, path regex, provider, handler method name)
+    ROUTES = [
+        ("GET", r"/maps/api/place/textsearch/json$", "google_places", "places_textsearch"),
+        ("GET", r"/maps/api/place/details/json$", "google_places", "places_details"),
+        ("GET", r"/pagespeedonline/v5/runPagespeed$", "pagespeed", "pagespeed"),
+        ("POST", r"/v3/serp/google/locations$", "dataforseo", "dataforseo_location_lookup"),
+        ("GET", r"/v3/serp/google/locations/(\w+)$", "dataforseo", "dataforseo_location_list"),
+        ("POST", r"/v3/serp/google/organic/live/advanced$", "dataforseo", "dataforseo_live"),
+        ("POST", r"/v3/serp/google/organic/task_post$", "dataforseo", "dataforseo_task_post"),
+        ("GET", r"/v3/serp/google/organic/tasks_ready$", "dataforseo", "dataforseo_tasks_ready"),
+        ("GET", r"/v3/serp/google/organic/task_get/advanced/([\w-]+)$", "dataforseo", "dataforseo_task_get"),
+        ("GET", r"/search$", "serpapi", "serpapi"),
+        ("GET", r"/v2/domain-search$", "hunter", "hunter"),
+        ("POST", r"/v1/messages$", "anthropic", "anthropic"),
+        ("POST", r"(?:/v1)?/chat/completions$", "openai", "openai"),
+        ("POST", r"/slack/webhook$", "slack", "slack"),
+        ("GET", r"/__stats$", None, "stats"),
+        ("GET", r"/robots\.txt$", "sites", "robots"),
+        ("GET", r"/sitemap\.xml$", "sites", "sitemap"),
+        ("GET", r"/sites/([\w-]+)/(.*)$", "sites", "site_page"),
+    ]
+
+    @property
+    def config(self) -> MockConfig:
+        return self.server.config
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass  # one line per request would swamp a load test
+
+    # --- plumbing -------------------------------------------------------
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        parsed = urlparse(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        self.query_lists = parse_qs(parsed.query)
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length) if length else b""
+
+        for route_method, pattern, provider, handler in self.ROUTES:
+            match = re.match(pattern, parsed.path)
+            if route_method == method and match:
+                if provider and not self._admit(provider):
+                    return
+                getattr(self, handler)(*match.groups())
+                return
+        self._send_json({"error": f"no mock for {method} {parsed.path}"}, status=404)
+
+    def _admit(self, provider: str) -> bool:
+        """Apply quota, rate limit, injected errors and latency; False if the request was answered."""
+        state, config = self.state, self.config
+        with state.lock:
+            state.requests[provider] += 1
+            served = state.requests[provider]
+
+        if provider in config.quota and served > config.quota[provider]:
+            with state.lock:
+                state.rejected[provider] += 1
+            self._send_json({"error": {"code": 429, "message": "Quota exceeded for quota metric 'Queries per day'"}},
+                            status=429)
+            return False
+        if provider in config.rps and not state.take_rate(provider, config.rps[provider]):
+            with state.lock:
+                state.rejected[provider] += 1
+            self._send_json({"error": {"code": 429, "message": "Rate limit exceeded"}}, status=429,
+                            headers={"Retry-After": "1"})
+            return False
+        if provider != "sites" and config.error_rate and random.random() < config.error_rate:
+            with state.lock:
+                state.errors[provider] += 1
+            self._send_json({"error": {"code": 503, "message": "Injected failure"}}, status=503)
+            return False
+
+        median = config.latency.get(provider)
+        if median:
+            time.sleep(max(0.0, random.gauss(median, median / 2)))
+        return True
+
+    def _send(self, body: bytes, content_type: str, status: int = 200, headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, payload, status: int = 200, headers: Optional[Dict] = None):
+        self._send(json.dumps(payload).encode(), "application/json", status, headers)
+
+    def _json_body(self):
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            return None
+
+    def _base_url(self) -> str:
+        return f"http://{self.headers.get('Host', '127.0.0.1')}"
+
+    def _site_url(self, place_id: str) -> str:
+        if self.config.spread_hosts:
+            digest = hashlib.sha256(place_id.encode()).digest()
+            port = self.server.server_address[1]
+            return f"http://127.{digest[0] % 250 + 1}.{digest[1]}.{digest[2] % 250 + 1}:{port}/sites/{place_id}/"
+        return f"{self._base_url()}/sites/{place_id}/"
+
+    # --- Google Places ----------------------------------------------------
+
+    def places_textsearch(self):
+        if "pagetoken" in self.query:
+            try:
+                query, page, issued = base64.urlsafe_b64decode(self.query["pagetoken"]).decode().rsplit("|", 2)
+                page, issued = int(page), float(issued)
+            except ValueError:
+                self._send_json({"status": "INVALID_REQUEST", "results": []})
+                return
+            if time.time() - issued < self.config.token_delay:
+                # Real tokens aren't valid for a couple of seconds after they're issued
+                self._send_json({"status": "INVALID_REQUEST", "results": []})
+                return
+        else:
+            query, page = self.query.get("query", ""), 0
+
+        results = []
+        for i in range(20):
+            place_id = hashlib.sha256(f"{self.config.seed}|{query}|{page}|{i}".encode()).hexdigest()[:20]
+            r = _rng(self.config.seed, "place", place_id)
+            results.append({
+                "place_id": place_id,
+                "name": f"{r.choice(INDUSTRY_WORDS)} Co {place_id[:6]}",
+                "formatted_address": f"{r.randint(1, 9999)} Main St",
+            })
+
+        payload = {"status": "OK", "results": results}
+        if page + 1 < self.config.places_pages:
+            token = f"{query}|{page + 1}|{time.time()}"
+            payload["next_page_token"] = base64.urlsafe_b64encode(token.encode()).decode()
+        self._send_json(payload)
+
+    def places_details(self):
+        place_id = self.query.get("place_id", "")
+        r = _rng(self.config.seed, "place", place_id)
+        full = {
+            "name": f"{r.choice(INDUSTRY_WORDS)} Co {place_id[:6]}",
+            "website": None if r.random() < self.config.no_website_rate else self._site_url(place_id),
+            "formatted_phone_number": f"(555) {r.randint(100, 999)}-{r.randint(1000, 9999)}",
+            "formatted_address": f"{r.randint(1, 9999)} Main St",
+        }
+        fields = (self.query.get("fields") or ",".join(full)).split(",")
+        result = {f: full[f] for f in fields if full.get(f) is not None}
+        self._send_json({"status": "OK", "result": result})
+
+    # --- PageSpeed Insights ---------------------------------------------
+
+    def pagespeed(self):
+        url = self.query.get("url", "")
+        r = _rng(self.config.seed, "psi", url)
+        categories = self.query_lists.get("category", ["performance"])
+        lighthouse = {
+            "finalUrl": url,
+            "finalDisplayedUrl": url,
+            "categories": {"performance": {"score": round(r.uniform(0.3, 0.98), 2)}},
+            "audits": {
+                "largest-contentful-paint": {"numericValue": r.uniform(1500, 6500)},
+                "cumulative-layout-shift": {"numericValue": r.uniform(0, 0.4)},
+                "total-blocking-time": {"numericValue": r.uniform(0, 1200)},
+                "first-contentful-paint": {"numericValue": r.uniform(800, 3500)},
+                "speed-index": {"numericValue": r.uniform(1500, 8000)},
+                "render-blocking-resources": {"details": {
+                    "overallSavingsMs": r.uniform(0, 1500),
+                    "items": [{"url": f"{url}asset-{i}.css"} for i in range(r.randint(0, 6))],
+                }},
+                "uses-optimized-images": {"details": {
+                    "overallSavingsBytes": r.uniform(0, 500000),
+                    "items": [{"url": f"{url}img-{i}.jpg"} for i in range(r.randint(0, 8))],
+                }},
+                # Screenshots make real payloads large; mimic that for memory tests
+                "final-screenshot": {"details": {"data": "A" * (self.config.psi_payload_kb * 1024)}},
+            },
+        }
+        if "seo" in categories:
+            lighthouse["categories"]["seo"] = {"score": round(r.uniform(0.5, 1.0), 2)}
+            for audit_id in ("document-title", "meta-description", "is-crawlable", "canonical", "image-alt"):
+                lighthouse["audits"][audit_id] = {"score": 1 if r.random() < 0.8 else 0}
+        self._send_json({"id": url, "lighthouseResult": lighthouse})
+
+    # --- DataForSEO -----------------------------------------------------
+
+    def _serp_result(self, keyword: str, location_code) -> Dict:
+        r = _rng(self.config.seed, "serp", keyword, location_code)
+        items = ([{"type": "paid"}] * r.randint(0, 4) + [{"type": "local_pack"}] * r.randint(0, 1)
+                 + [{"type": "organic"}] * r.randint(5, 10))
+        return {"keyword": keyword, "total_count": r.randint(100000, 50000000), "items": items}
+
+    def dataforseo_location_lookup(self):
+        tasks = []
+        for task in self._json_body() or []:
+            name = task.get("location_name", "Unknown")
+            code = 1000000 + int(hashlib.sha256(name.lower().encode()).hexdigest()[:5], 16)
+            tasks.append({"status_code": 20000, "result": [
+                {"location_code": code, "location_name": f"{name},Texas,United States", "location_type": "City"}
+            ]})
+        self._send_json({"status_code": 20000, "tasks": tasks})
+
+    def dataforseo_location_list(self, country: str):
+        cities = ["Houston", "Austin", "Dallas", "San Antonio", "Chicago", "Phoenix", "Denver", "Miami"]
+        result = [{"location_code": 1000000 + i, "location_name": f"{city},State,United States", "location_type": "City"}
+                  for i, city in enumerate(cities)]
+        self._send_json({"status_code": 20000, "tasks": [{"status_code": 20000, "result": result}]})
+
+    def dataforseo_live(self):
+        tasks = [{"status_code": 20000, "result": [self._serp_result(t.get("keyword"), t.get("location_code"))]}
+                 for t in self._json_body() or []]
+        self._send_json({"status_code": 20000, "tasks": tasks})
+
+    def dataforseo_task_post(self):
+        tasks = []
+        with self.state.lock:
+            for task in self._json_body() or []:
+                task_id = hashlib.sha256(f"{time.time()}|{len(self.state.tasks)}".encode()).hexdigest()[:24]
+                self.state.tasks[task_id] = (time.time() + self.config.task_delay, task)
+                tasks.append({"id": task_id, "status_code": 20100, "status_message": "Task Created.", "data": task})
+        self._send_json({"status_code": 20000, "tasks": tasks})
+
+    def dataforseo_tasks_ready(self):
+        now = time.time()
+        with self.state.lock:
+            ready = [{"id": task_id} for task_id, (ready_at, _) in self.state.tasks.items() if ready_at <= now]
+        self._send_json({"status_code": 20000, "tasks": [{"status_code": 20000, "result": ready}]})
+
+    def dataforseo_task_get(self, task_id: str):
+        with self.state.lock:
+            entry = self.state.tasks.pop(task_id, None)
+        if entry is None:
+            self._send_json({"status_code": 20000, "tasks": [{"status_code": 40401, "status_message": "Task Not Found."}]})
+            return
+        task = entry[1]
+        self._send_json({"status_code": 20000, "tasks": [{
+            "status_code": 20000, "result": [self._serp_result(task.get("keyword"), task.get("location_code"))]
+        }]})
+
+    # --- SerpAPI / Hunter -----------------------------------------------
+
+    def serpapi(self):
+        r = _rng(self.config.seed, "serpapi", self.query.get("q"), self.query.get("location"))
+        self._send_json({
+            "search_information": {"total_results": r.randint(100000, 50000000)},
+            "ads": [{}] * r.randint(0, 4),
+            "local_results": [{}] * r.randint(0, 3),
+        })
+
+    def hunter(self):
+        domain = self.query.get("domain", "")
+        r = _rng(self.config.seed, "hunter", domain)
+        emails = [{"value": f"info@{domain}"}] if r.random() < 0.6 else []
+        self._send_json({"data": {"domain": domain, "emails": emails}})
+
+    # --- LLMs -----------------------------------------------------------
+
+    def _llm_analysis(self, prompt: str) -> str:
+        r = _rng(self.config.seed, "llm", hashlib.sha256(prompt.encode()).hexdigest())
+        return json.dumps({
+            "seo_score": r.randint(20, 85),
+            "critical_issues": ["Missing local schema", "Thin service pages", "No reviews on homepage"][:r.randint(1, 3)],
+            "revenue_impact": f"${r.randint(2, 20)},000/month",
+            "opportunities": ["Add FAQ schema", "Create city landing pages", "Speed up mobile LCP"],
+            "services_offered": ["Repairs", "Installation", "Maintenance"],
+            "unique_selling_proposition": "Family owned since 1998",
+            "call_to_action_quality": r.choice(["Strong", "Weak", "Missing"]),
+            "target_keywords": ["emergency repair", "near me"],
+            "missing_keywords": ["24/7 service", "free estimate"],
+            "content_quality": "Mock analysis.",
+            "quick_wins": ["Fix title tag", "Add meta description", "Compress hero image"],
+            "pitch_angle": "Competitors outrank them in the local pack.",
+        })
+
+    def anthropic(self):
+        body = self._json_body() or {}
+        system = body.get("system", "")
+        prompt = json.dumps(system) + json.dumps(body.get("messages", []))
+        text = self._llm_analysis(prompt)
+        # Like the real API: a system prompt marked cache_control is written to the
+        # prompt cache on first sight and read from it afterwards
+        cache_read = cache_write = 0
+        if isinstance(system, list) and any(block.get("cache_control") for block in system):
+            prefix = json.dumps(system)
+            with self.state.lock:
+                seen = prefix in self.state.cached_prefixes
+                self.state.cached_prefixes.add(prefix)
+            if seen:
+                cache_read = _estimate_tokens(prefix)
+            else:
+                cache_write = _estimate_tokens(prefix)
+        self._send_json({
+            "id": "msg_mock", "type": "message", "role": "assistant", "model": body.get("model"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": _estimate_tokens(prompt) - cache_read - cache_write,
+                      "cache_read_input_tokens": cache_read, "cache_creation_input_tokens": cache_write,
+                      "output_tokens": _estimate_tokens(text)},
+        })
+
+    def openai(self):
+        body = self._json_body() or {}
+        prompt = json.dumps(body.get("messages", []))
+        text = self._llm_analysis(prompt)
+        self._send_json({
+            "id": "chatcmpl-mock", "object": "chat.completion", "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": _estimate_tokens(prompt), "completion_tokens": _estimate_tokens(text),
+                      "total_tokens": _estimate_tokens(prompt) + _estimate_tokens(text)},
+        })
+
+    def slack(self):
+        self._send(b"ok", "text/plain")
+
+    # --- Lead websites --------------------------------------------------
+
+    def robots(self):
+        self._send(b"User-agent: *\nAllow: /\n", "text/plain")
+
+    def sitemap(self):
+        self._send(b"not found", "text/plain", status=404)
+
+    def site_page(self, site_id: str, subpath: str):
+        r = _rng(self.config.seed, "site", site_id)
+        word = r.choice(INDUSTRY_WORDS)
+        title = f"{word} Co {site_id[:6]}" + (" | Trusted local experts since 1998" if r.random() < 0.5 else "")
+        head = [f"<title>{title}</title>"]
+        if r.random() < 0.6:
+            head.append(f'<meta name="description" content="{word} services you can count on. ' + "x" * r.randint(40, 140) + '">')
+        if r.random() < 0.5:
+            head.append(f'<meta name="generator" content="{r.choice(["WordPress 6.4", "Wix.com Website Builder", "Squarespace"])}">')
+        if r.random() < 0.4:
+            schema = {"@context": "https://schema.org", "@type": r.choice(["LocalBusiness", "Plumber", "Organization"]),
+                      "name": title}
+            head.append(f'<script type="application/ld+json">{json.dumps(schema)}</script>')
+        if subpath == "faq" and r.random() < 0.5:
+            head.append('<script type="application/ld+json">{"@type": "FAQPage"}</script>')
+
+        links = "".join(f'<li><a href="/sites/{site_id}/{p}">{p.title()}</a></li>' for p in SERVICE_PAGES)
+        sections = "".join(f"<section><h2>{word} service {i}</h2><p>{'Quality work. ' * 40}</p></section>"
+                           for i in range(r.randint(5, 60)))
+        html = (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\">{''.join(head)}</head>"
+                f"<body><nav><ul>{links}</ul></nav><main><h1>{title}</h1>{sections}</main>"
+                f"<footer>&copy; 2019 {title}</footer></body></html>").encode()
+
+        modified = time.time() - r.randint(1, 900) * 86400
+        self._send(html, "text/html; charset=utf-8", headers={"Last-Modified": formatdate(modified, usegmt=True)})
+
+    # --- Introspection --------------------------------------------------
+
+    def stats(self):
+        self._send_json(self.server.stats())
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, config: MockConfig):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.state = MockState()
+
+    def stats(self) -> Dict:
+        with self.state.lock:
+            return {p: {"requests": self.state.requests[p], "rejected": self.state.rejected[p],
+                        "errors": self.state.errors[p]}
+                    for p in PROVIDERS if self.state.requests[p]}
+
+
+def mock_env(base_url: str) -> Dict[str, str]:
+    """Env vars that point the pipeline at a mock server on base_url."""
+    return {
+        "MOCK_API_URL": base_url,
+        "GOOGLE_PLACES_API_KEY": "mock", "PSI_API_KEY": "mock", "HUNTER_API_KEY": "mock",
+        "DATAFORSEO_LOGIN": "mock", "DATAFORSEO_PASSWORD": "mock",
+        "ANTHROPIC_API_KEY": "mock",
+        "SLACK_WEBHOOK_URL": f"{base_url}/slack/webhook",
+        "PLACES_PAGE_TOKEN_DELAY": "0",
+    }
+
+
+def _print_env(base_url: str):
+    print("\n".join(f"export {name}={value}" for name, value in mock_env(base_url).items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1" if "--spread-hosts" not in sys.argv else "0.0.0.0")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--seed", type=int, default=0, help="Seed for all generated data")
+    parser.add_argument("--latency", default="", help="Median seconds per provider, e.g. pagespeed=2,openai=1.5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests answered with 503")
+    parser.add_argument("--rps", default="", help="Requests/second per provider before 429s, e.g. pagespeed=4")
+    parser.add_argument("--quota", default="", help="Total requests per provider before quota 429s, e.g. pagespeed=500")
+    parser.add_argument("--places-pages", type=int, default=3, help="Text Search pages per query (20 results each)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds before a next_page_token is valid")
+    parser.add_argument("--psi-payload-kb", type=int, default=256, help="Screenshot padding in PSI responses")
+    parser.add_argument("--task-delay", type=float, default=1.0, help="Seconds until a DataForSEO queued task is ready")
+    parser.add_argument("--no-website-rate", type=float, default=0.1, help="Fraction of places without a website")
+    parser.add_argument("--spread-hosts", action="store_true", help="Serve each site on its own 127.x.y.z host (Linux)")
+    parser.add_argument("--print-env", action="store_true", help="Print env vars pointing the pipeline here and exit")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    if args.print_env:
+        _print_env(base_url)
+        return
+
+    server = MockServer((args.host, args.port), MockConfig(args))
+    print(f"🧪 Mock APIs listening on {base_url} (seed {args.seed}); run with --print-env for the pipeline env")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
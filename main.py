@@ -1,20 +1,254 @@
 import os
 import argparse
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 import pytz
 from dotenv import load_dotenv
 
-from modules import industry_discovery, lead_finder, sheets_io, scoring, alerts, seo_checks, llm_seo_analyzer, report_generator
+from modules import industry_discovery, lead_finder, sheets_io, scoring, alerts, seo_checks, llm_seo_analyzer, llm_batch, report_generator, page_fetch, cache, crawler, psi, metrics
 
-def run_pipeline(geo: str, industries_override: list = None, industries_add: list = None):
+# Leads scoring at least this get the LLM sales analysis
+LLM_MIN_SCORE = 60
+
+
+def _audit_site(lead: Dict) -> Dict:
+    """Audit a lead's site (the LLM analysis runs later, see _run_llm_stage)."""
+    with metrics.timer("audit"):
+        return seo_checks.evaluate_site(lead.get("website"))
+
+
+def _llm_columns(llm_data: Dict) -> Dict:
+    """Output-row LLM_* columns for an analysis ({} for leads that weren't analyzed)."""
+    return {
+        "LLM_SEOScore": llm_data.get("llm_seo_score"),
+        "LLM_CriticalIssues": llm_data.get("llm_critical_issues", []),
+        "LLM_RevenueImpact": llm_data.get("llm_revenue_impact", ""),
+        "LLM_Opportunities": llm_data.get("llm_opportunities", []),
+        "LLM_ServicesOffered": llm_data.get("llm_services_offered", []),
+        "LLM_USP": llm_data.get("llm_unique_selling_proposition", ""),
+        "LLM_CTAQuality": llm_data.get("llm_call_to_action_quality", ""),
+        "LLM_TargetKeywords": llm_data.get("llm_target_keywords", []),
+        "LLM_MissingKeywords": llm_data.get("llm_missing_keywords", []),
+        "LLM_ContentQuality": llm_data.get("llm_content_quality", ""),
+        "LLM_QuickWins": llm_data.get("llm_quick_wins", []),
+        "LLM_PitchAngle": llm_data.get("llm_pitch_angle", "")
+    }
+
+
+def _build_row(lead: Dict, industry: str, geo: str, run_date: str, audit: Dict, llm_data: Optional[Dict] = None) -> Dict:
+    """Combine a lead, its audit and LLM analysis into an output row."""
+    score = scoring.score_lead(lead, audit)
+
+    return {
+        "RunDate": run_date,
+        "Geo": geo,
+        "Industry": industry,
+        "BusinessName": lead.get("name", ""),
+        "Website": lead.get("website", ""),
+        "Email": lead.get("email", ""),
+        "Phone": lead.get("phone", ""),
+        "City": lead.get("city", ""),
+        "TechStack": audit.get("tech_stack", ""),
+        "CoreWebVitals_LCP": audit.get("lcp") or 0,  # 0 = not measured (no site or PSI deferred)
+        "HasSchema": audit.get("has_schema", False),
+        "HasFAQ": audit.get("has_faq", False),
+        "HasOrg": audit.get("has_org", False),
+        "MetaTitleOK": audit.get("meta_title_ok", False),
+        "MetaDescOK": audit.get("meta_desc_ok", False),
+        "ContentFreshMonths": audit.get("content_fresh_months", 0),
+        "TrafficTrend_90d": audit.get("traffic_trend_90d", 0),
+        "Issues": ", ".join(audit.get("issues", [])),
+        "Score": score,
+        "Notes": audit.get("notes", ""),
+        "Source": lead.get("source", ""),
+        # LLM fields
+        **_llm_columns(llm_data or {})
+    }
+
+
+def _dedup_key(lead: Dict) -> Optional[str]:
+    """Identify the site behind a lead so it's audited once across industries.
+
+    Keyed on the normalized website (host without www, plus path) because the
+    audit only depends on the page; host alone would merge unrelated leads
+    hosted on shared platforms (facebook.com/..., linktr.ee/...). Leads without
+    a website fall back to place_id; leads with neither are never merged.
+    """
+    website = str(lead.get("website") or "").strip()
+    if website:
+        parsed = urlparse(website if "://" in website else f"http://{website}")
+        host = parsed.netloc.lower()
+        if host.startswith("www."):
+            host = host[4:]
+        return f"site:{host}{parsed.path.rstrip('/')}"
+    if lead.get("place_id"):
+        return f"place:{lead['place_id']}"
+    return None
+
+
+def _safe_audit_site(job: Tuple[str, Dict]) -> Optional[Dict]:
+    """Run _audit_site, isolating failures so one bad lead never sinks the run."""
+    industry, lead = job
+    try:
+        return _audit_site(lead)
+    except Exception as e:
+        print(f"  ⚠️  Error processing lead {lead.get('name', 'unknown')}: {e}")
+        return None
+
+
+def _run_audits(jobs: List[Tuple[str, Dict]], geo: str, run_date: str, workers: int) -> List[Dict]:
+    """Audit (industry, lead) jobs with bounded concurrency, preserving input order.
+
+    Each unique site is audited once (see _dedup_key) and its result is fanned
+    out to every industry row it appears in.
+
+    Args:
+        jobs: (industry, lead) pairs in the order rows should be written
+        geo: Geography string for the output rows
+        run_date: Run date stamp for the output rows
+        workers: Maximum number of leads audited at once (1 = serial)
+
+    Returns:
+        Output rows for every lead that audited successfully, in job order
+    """
+    # First occurrence of each site is the one that gets audited
+    unique_jobs: List[Tuple[str, Dict]] = []
+    job_slots: List[int] = []
+    slot_by_key: Dict[str, int] = {}
+    for industry, lead in jobs:
+        key = _dedup_key(lead)
+        if key is None or key not in slot_by_key:
+            if key is not None:
+                slot_by_key[key] = len(unique_jobs)
+            job_slots.append(len(unique_jobs))
+            unique_jobs.append((industry, lead))
+        else:
+            job_slots.append(slot_by_key[key])
+
+    if len(unique_jobs) < len(jobs):
+        print(f"♻️  {len(jobs) - len(unique_jobs)} duplicate leads across industries share an audit")
+
+    if workers <= 1:
+        results = [_safe_audit_site(job) for job in unique_jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audit") as pool:
+            # map() yields in submission order regardless of completion order
+            results = list(pool.map(_safe_audit_site, unique_jobs))
+
+    rows = []
+    for (industry, lead), slot in zip(jobs, job_slots):
+        if results[slot] is None:
+            continue
+        # Scoring is per lead too, so an audit it can't handle skips that row, not the run
+        try:
+            rows.append(_build_row(lead, industry, geo, run_date, results[slot]))
+        except Exception as e:
+            print(f"  ⚠️  Error processing lead {lead.get('name', 'unknown')}: {e}")
+    return rows
+
+
+def _safe_analyze(target: Tuple[str, str, str]) -> Dict:
+    """LLM analysis of one (website, business name, industry), isolating failures."""
+    website, business_name, industry = target
+    try:
+        with metrics.timer("llm"):
+            return llm_seo_analyzer.analyze_website_with_llm(website, business_name=business_name, industry=industry)
+    except Exception as e:
+        print(f"  ⚠️  LLM analysis failed for {business_name or website}: {e}")
+        return {}
+
+
+def _release_held_rows() -> List[Dict]:
+    """Rows held back by earlier batch-mode runs whose analyses have now arrived, filled in."""
+    released = []
+    for row, llm_data in llm_batch.release_rows():
+        row.update(_llm_columns(llm_data))
+        released.append(row)
+    if released:
+        print(f"📦 {len(released)} rows held for LLM batch results are ready")
+    return released
+
+
+def _run_llm_stage(rows: List[Dict], workers: int) -> int:
+    """Run the LLM sales analysis for every qualifying row concurrently, filling its LLM_* columns.
+
+    Runs after all audits so the slow LLM calls overlap each other instead of
+    stalling audit workers; the request and token budgets are enforced in
+    llm_seo_analyzer. Like the audits, each unique site (see _dedup_key) is
+    analyzed once, with the name and industry of its first row, and the
+    result is fanned out to every row for that site.
+
+    With LLM_MODE=batch the analyses go through a provider batch instead (see
+    modules/llm_batch.py). Rows whose batch hasn't ended are removed from
+    `rows` and held until their results arrive, and rows held by earlier runs
+    that are now ready are appended.
+
+    Args:
+        rows: Output rows from _run_audits (updated in place)
+        workers: Maximum number of analyses in flight
+
+    Returns:
+        Number of analyses run
+    """
+    batch = os.getenv("LLM_MODE", "live").lower() == "batch"
+
+    # Site key -> (website, business name, industry) of its first row
+    targets: Dict[str, Tuple[str, str, str]] = {}
+    site_rows: Dict[str, List[Dict]] = {}
+    for row in rows:
+        if row["Score"] >= LLM_MIN_SCORE and row["Website"]:
+            key = _dedup_key({"website": row["Website"]})
+            targets.setdefault(key, (row["Website"], row["BusinessName"], row["Industry"]))
+            site_rows.setdefault(key, []).append(row)
+    if not targets:
+        if batch:
+            rows.extend(_release_held_rows())
+        return 0
+
+    print(f"🤖 LLM analysis for {len(targets)} leads " + ("in batch mode" if batch else f"with {workers} worker(s)"))
+    if batch:
+        try:
+            with metrics.timer("llm"):
+                results = llm_batch.analyze_batch(list(targets.values()), [site_rows[key] for key in targets])
+        except Exception as e:
+            print(f"  ⚠️  LLM batch failed: {e}")
+            results = [{} for _ in targets]
+    elif workers <= 1:
+        results = [_safe_analyze(target) for target in targets.values()]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm") as pool:
+            results = list(pool.map(_safe_analyze, targets.values()))
+
+    held = set()
+    for key, llm_data in zip(targets, results):
+        for row in site_rows[key]:
+            if llm_data is None:
+                held.add(id(row))
+            else:
+                row.update(_llm_columns(llm_data))
+    if held:
+        rows[:] = [row for row in rows if id(row) not in held]
+        print(f"  ⏳ {len(held)} rows held until their LLM batch results arrive")
+    if batch:
+        rows.extend(_release_held_rows())
+    return len(targets)
+
+
+def run_pipeline(geo: str, industries_override: list = None, industries_add: list = None, workers: int = None):
     """Run the complete lead generation pipeline.
 
     Args:
         geo: Geography string (e.g., "Houston, TX")
         industries_override: If provided, skip discovery and use these industries
         industries_add: If provided, append these to discovered industries
+        workers: Concurrent lead audits (defaults to AUDIT_WORKERS env var)
+
+    Returns:
+        The output rows written by this run (empty if nothing was generated)
     """
     run_date = dt.datetime.now().strftime("%Y-%m-%d")
     print(f"[{run_date}] Starting run for geo: {geo}")
@@ -22,7 +256,15 @@ def run_pipeline(geo: str, industries_override: list = None, industries_add: lis
     # Validate input
     if not geo or not geo.strip():
         print("❌ Error: geo parameter cannot be empty")
-        return
+        return []
+
+    # Each URL is downloaded once per run and shared by the SEO and LLM stages
+    page_fetch.reset()
+    crawler.reset()
+    psi.reset()
+    cache.reset_stats()
+    metrics.reset()
+    llm_seo_analyzer.reset_usage()
 
     # Determine industries to process
     if industries_override:
@@ -30,15 +272,16 @@ def run_pipeline(geo: str, industries_override: list = None, industries_add: lis
         print(f"🎯 Using manual industries: {industries}")
     else:
         try:
-            industries = industry_discovery.discover_top_industries(geo)
+            with metrics.timer("discovery"):
+                industries = industry_discovery.discover_top_industries(geo)
             print(f"🔍 Discovered industries: {industries}")
 
             if not industries:
                 print("⚠️  No industries discovered, exiting")
-                return
+                return []
         except Exception as e:
             print(f"❌ Error discovering industries: {e}")
-            return
+            return []
 
         # Append additional industries if specified
         if industries_add:
@@ -46,74 +289,31 @@ def run_pipeline(geo: str, industries_override: list = None, industries_add: lis
             print(f"➕ Added manual industries: {industries_add}")
             print(f"📋 Final industry list: {industries}")
 
-    all_rows = []
+    # Enumerate leads per industry, then fan the audits out across a worker pool
+    jobs = []
     for industry in industries:
         try:
-            leads = lead_finder.find_leads(geo, industry, max_results=int(os.getenv("LEADS_PER_INDUSTRY", "30")))
+            with metrics.timer("enumeration"):
+                leads = lead_finder.find_leads(geo, industry, max_results=int(os.getenv("LEADS_PER_INDUSTRY", "30")))
             print(f"  Found {len(leads)} leads for {industry}")
-
-            for lead in leads:
-                try:
-                    audit = seo_checks.evaluate_site(lead.get("website"))
-                    score = scoring.score_lead(lead, audit)
-
-                    # Get LLM analysis for high-scoring leads (>= 60)
-                    llm_data = {}
-                    if score >= 60 and lead.get("website"):
-                        llm_analysis = llm_seo_analyzer.analyze_website_with_llm(
-                            lead.get("website"),
-                            business_name=lead.get("name", ""),
-                            industry=industry
-                        )
-                        llm_data = llm_analysis
-
-                    row = {
-                        "RunDate": run_date,
-                        "Geo": geo,
-                        "Industry": industry,
-                        "BusinessName": lead.get("name", ""),
-                        "Website": lead.get("website", ""),
-                        "Email": lead.get("email", ""),
-                        "Phone": lead.get("phone", ""),
-                        "City": lead.get("city", ""),
-                        "TechStack": audit.get("tech_stack", ""),
-                        "CoreWebVitals_LCP": audit.get("lcp", 0),
-                        "HasSchema": audit.get("has_schema", False),
-                        "HasFAQ": audit.get("has_faq", False),
-                        "HasOrg": audit.get("has_org", False),
-                        "MetaTitleOK": audit.get("meta_title_ok", False),
-                        "MetaDescOK": audit.get("meta_desc_ok", False),
-                        "ContentFreshMonths": audit.get("content_fresh_months", 0),
-                        "TrafficTrend_90d": audit.get("traffic_trend_90d", 0),
-                        "Issues": ", ".join(audit.get("issues", [])),
-                        "Score": score,
-                        "Notes": audit.get("notes", ""),
-                        "Source": lead.get("source", ""),
-                        # LLM fields
-                        "LLM_SEOScore": llm_data.get("llm_seo_score"),
-                        "LLM_CriticalIssues": llm_data.get("llm_critical_issues", []),
-                        "LLM_RevenueImpact": llm_data.get("llm_revenue_impact", ""),
-                        "LLM_Opportunities": llm_data.get("llm_opportunities", []),
-                        "LLM_ServicesOffered": llm_data.get("llm_services_offered", []),
-                        "LLM_USP": llm_data.get("llm_unique_selling_proposition", ""),
-                        "LLM_CTAQuality": llm_data.get("llm_call_to_action_quality", ""),
-                        "LLM_TargetKeywords": llm_data.get("llm_target_keywords", []),
-                        "LLM_MissingKeywords": llm_data.get("llm_missing_keywords", []),
-                        "LLM_ContentQuality": llm_data.get("llm_content_quality", ""),
-                        "LLM_QuickWins": llm_data.get("llm_quick_wins", []),
-                        "LLM_PitchAngle": llm_data.get("llm_pitch_angle", "")
-                    }
-                    all_rows.append(row)
-                except Exception as e:
-                    print(f"  ⚠️  Error processing lead {lead.get('name', 'unknown')}: {e}")
-                    continue
+            jobs.extend((industry, lead) for lead in leads)
         except Exception as e:
             print(f"  ⚠️  Error finding leads for {industry}: {e}")
             continue
 
+    # PageSpeed work deferred by earlier runs goes to the front of the PSI queue
+    if os.getenv("PSI_API_KEY"):
+        psi.drain_backlog(os.getenv("PSI_API_KEY"))
+
+    workers = workers or int(os.getenv("AUDIT_WORKERS", "8"))
+    print(f"⚙️  Auditing {len(jobs)} leads with {workers} worker(s)")
+    all_rows = _run_audits(jobs, geo, run_date, workers)
+    _run_llm_stage(all_rows, int(os.getenv("LLM_WORKERS", "8")))
+
     # Persist results
     if all_rows:
-        sheets_io.append_rows(all_rows)
+        with metrics.timer("persistence"):
+            sheets_io.append_rows(all_rows)
 
         # Alert hot leads
         hot_threshold = int(os.getenv("HOT_LEAD_THRESHOLD", "70"))
@@ -122,26 +322,33 @@ def run_pipeline(geo: str, industries_override: list = None, industries_add: lis
         # Generate sales intelligence report for hot leads
         if hot:
             print(f"\n📊 Generating sales intelligence report for {len(hot)} hot leads...")
-            try:
-                report_url = report_generator.generate_sales_report(hot, geo)
-                if report_url:
-                    print(f"✅ Sales report ready: {report_url}")
-            except Exception as e:
-                print(f"⚠️  Failed to generate sales report: {e}")
+            with metrics.timer("reporting"):
+                try:
+                    report_url = report_generator.generate_sales_report(hot, geo)
+                    if report_url:
+                        print(f"✅ Sales report ready: {report_url}")
+                except Exception as e:
+                    print(f"⚠️  Failed to generate sales report: {e}")
 
-            alerts.notify_hot_leads(hot)
+                alerts.notify_hot_leads(hot)
 
         print(f"✅ Done. Rows appended: {len(all_rows)} | Hot leads: {len(hot)}")
     else:
         print("⚠️  No leads generated, nothing to save")
 
-def schedule_weekly(geo: str):
+    psi.report()
+    cache.report()
+    llm_seo_analyzer.report_usage()
+    metrics.report()
+    return all_rows
+
+def schedule_weekly(geo: str, workers: int = None):
     tz = os.getenv("RUN_TZ", "America/Chicago")
     hour_local = int(os.getenv("RUN_HOUR_LOCAL", "9"))
     scheduler = BlockingScheduler(timezone=tz)
     # Sunday weekly
     trigger = CronTrigger(day_of_week="sun", hour=hour_local, minute=0)
-    scheduler.add_job(run_pipeline, trigger, args=[geo], id="weekly_job", replace_existing=True)
+    scheduler.add_job(run_pipeline, trigger, args=[geo], kwargs={"workers": workers}, id="weekly_job", replace_existing=True)
     print(f"Scheduled weekly run on Sundays at {hour_local}:00 ({tz}). Ctrl+C to stop.")
     scheduler.start()
 
@@ -156,8 +363,25 @@ if __name__ == "__main__":
                         help="Override auto-discovery with manual industries (comma-separated, e.g., 'dentists,plumbers,HVAC')")
     parser.add_argument("--add-industries", type=str,
                         help="Add industries to auto-discovered list (comma-separated)")
+    parser.add_argument("--workers", type=int,
+                        help="Number of leads to audit concurrently (default: AUDIT_WORKERS env var or 8)")
+    parser.add_argument("--collect-batch", action="store_true",
+                        help="Fetch finished LLM batch results (LLM_MODE=batch), save the rows held for them and exit")
     args = parser.parse_args()
 
+    if args.collect_batch:
+        counts = llm_batch.collect()
+        print(f"📦 LLM batches: {counts['collected']} analyses collected, {counts['failed']} failed, "
+              f"{counts['pending_batches']} batch(es) still pending")
+        released = _release_held_rows()
+        if released:
+            sheets_io.append_rows(released)
+            hot = [r for r in released if r["Score"] >= int(os.getenv("HOT_LEAD_THRESHOLD", "70"))]
+            if hot:
+                alerts.notify_hot_leads(hot)
+            print(f"✅ Rows appended: {len(released)} | Hot leads: {len(hot)}")
+        raise SystemExit(0)
+
     # Parse industry lists
     industries_override = None
     industries_add = None
@@ -169,6 +393,6 @@ if __name__ == "__main__":
         industries_add = [i.strip() for i in args.add_industries.split(",")]
 
     if args.once:
-        run_pipeline(args.geo, industries_override, industries_add)
+        run_pipeline(args.geo, industries_override, industries_add, workers=args.workers)
     else:
-        schedule_weekly(args.geo)
+        schedule_weekly(args.geo, workers=args.workers)
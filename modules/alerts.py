@@ -3,6 +3,8 @@ import json
 import requests
 from typing import List, Dict
 
+from modules import http_client
+
 def notify_hot_leads(rows: List[Dict]):
     """Send Slack notification for hot leads.
 
@@ -30,7 +32,7 @@ def notify_hot_leads(rows: List[Dict]):
     payload = {"text": "Hot SEO Leads", "blocks": blocks}
 
     try:
-        response = requests.post(url, data=json.dumps(payload), headers={"Content-Type": "application/json"}, timeout=10)
+        response = http_client.post(url, data=json.dumps(payload), headers={"Content-Type": "application/json"}, timeout=10)
         response.raise_for_status()
         print(f"✅ Slack notification sent for {len(rows[:10])} hot leads")
     except requests.exceptions.RequestException as e:
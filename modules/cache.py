@@ -0,0 +1,362 @@
+"""
+Persistent Response Cache
+Keeps external API responses and fetched HTML across runs so weekly re-runs of
+the same geo don't pay full latency and quota again for unchanged businesses.
+
+Backends (CACHE_BACKEND): "sqlite" (default, file at CACHE_PATH), "memory"
+(per-process, handy for tests) or "none" (disabled). Entries live in namespaces
+with their own TTLs (CACHE_TTL_DAYS_<NAMESPACE> overrides the defaults below),
+and the store is kept under CACHE_MAX_MB by evicting least-recently-used rows;
+namespaces listed in DEFAULT_MAX_ENTRIES are also capped at an entry count.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+try:
+    from modules import http_client, rate_limit
+except ImportError:
+    import http_client
+    import rate_limit
+
+DAY = 24 * 60 * 60
+
+# Default freshness per namespace, in days
+DEFAULT_TTL_DAYS = {
+    "psi": 14,
+    "html": 1,  # short, but stale pages are revalidated with ETag/Last-Modified
+    "places_textsearch": 14,
+    "places_details": 365,  # retention only; field freshness is PLACE_DETAILS_MAX_AGE_DAYS
+    "hunter": 30,
+    "serpapi": 14,
+    "robots": 7,
+    "freshness": 7,  # newest sitemap <lastmod> per domain
+    "llm_analysis": 30,  # keyed by content hash, so a changed page is a new entry anyway
+}
+
+# Entry caps per namespace on top of CACHE_MAX_MB (CACHE_MAX_ENTRIES_<NAMESPACE> overrides);
+# keeps a few large HTML pages from pushing out analyses that cost LLM tokens to rebuild
+DEFAULT_MAX_ENTRIES = {
+    "llm_analysis": 20000,
+}
+
+# Query parameters that carry credentials and must never end up in a cache key
+SECRET_PARAMS = {"key", "api_key", "apikey"}
+
+
+class MemoryBackend:
+    """In-process cache store (lost when the process exits)."""
+
+    def __init__(self):
+        self._entries: Dict[tuple, Dict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry:
+                entry["accessed_at"] = time.time()
+            return dict(entry) if entry else None
+
+    def put(self, namespace: str, key: str, value: Any, meta: Dict, expires_at: float):
+        now = time.time()
+        with self._lock:
+            self._entries[(namespace, key)] = {
+                "value": value, "meta": meta, "stored_at": now,
+                "expires_at": expires_at, "accessed_at": now
+            }
+
+    def touch(self, namespace: str, key: str, expires_at: float):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry:
+                entry["expires_at"] = expires_at
+
+    def trim(self, namespace: str, max_entries: int):
+        with self._lock:
+            keys = sorted((entry["accessed_at"], key) for (ns, key), entry in self._entries.items() if ns == namespace)
+            for _, key in keys[:max(0, len(keys) - max_entries)]:
+                del self._entries[(namespace, key)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """File-backed cache store with size-bounded LRU eviction."""
+
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                meta TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, meta, stored_at, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if not row:
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (time.time(), namespace, key)
+            )
+            self._conn.commit()
+        return {
+            "value": json.loads(row[0]),
+            "meta": json.loads(row[1]),
+            "stored_at": row[2],
+            "expires_at": row[3],
+        }
+
+    def put(self, namespace: str, key: str, value: Any, meta: Dict, expires_at: float):
+        value_json = json.dumps(value)
+        meta_json = json.dumps(meta)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, value_json, meta_json, len(value_json) + len(meta_json), now, expires_at, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, namespace: str, key: str, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET expires_at = ? WHERE namespace = ? AND key = ?",
+                (expires_at, namespace, key)
+            )
+            self._conn.commit()
+
+    def trim(self, namespace: str, max_entries: int):
+        """Drop a namespace's least-recently-used entries beyond max_entries."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM entries WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, namespace, max_entries)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used entries until the store fits in max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at").fetchall()
+        for namespace, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            total -= size
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_stats_lock = threading.Lock()
+
+
+def _get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            kind = os.getenv("CACHE_BACKEND", "sqlite").lower()
+            if kind == "none":
+                _backend = False
+            elif kind == "memory":
+                _backend = MemoryBackend()
+            else:
+                path = os.getenv("CACHE_PATH", "./cache/http_cache.sqlite")
+                max_bytes = int(float(os.getenv("CACHE_MAX_MB", "512")) * 1024 * 1024)
+                try:
+                    _backend = SQLiteBackend(path, max_bytes)
+                except Exception as e:
+                    print(f"⚠️  Could not open cache at {path}: {e}, using in-memory cache")
+                    _backend = MemoryBackend()
+        return _backend
+
+
+def _record(namespace: str, event: str):
+    with _stats_lock:
+        _stats[namespace][event] += 1
+
+
+def ttl_for(namespace: str) -> float:
+    """TTL in seconds for a namespace (CACHE_TTL_DAYS_<NAMESPACE> overrides the default)."""
+    days = os.getenv(f"CACHE_TTL_DAYS_{namespace.upper()}")
+    if days is None:
+        days = DEFAULT_TTL_DAYS.get(namespace, 7)
+    return float(days) * DAY
+
+
+def max_entries_for(namespace: str) -> Optional[int]:
+    """Entry cap for a namespace (CACHE_MAX_ENTRIES_<NAMESPACE> overrides the default), or None."""
+    cap = os.getenv(f"CACHE_MAX_ENTRIES_{namespace.upper()}")
+    if cap is None:
+        cap = DEFAULT_MAX_ENTRIES.get(namespace)
+    return int(cap) if cap is not None else None
+
+
+def make_key(url: str, params: Optional[Dict] = None) -> str:
+    """Build a stable cache key from a URL and its query params (credentials removed)."""
+    if not params:
+        return url
+    safe = sorted((k, str(v)) for k, v in params.items() if k not in SECRET_PARAMS)
+    return f"{url}?{urlencode(safe)}"
+
+
+def get(namespace: str, key: str, allow_stale: bool = False) -> Optional[Dict]:
+    """Look up a cache entry.
+
+    Args:
+        namespace: Cache namespace (e.g. "psi", "html")
+        key: Entry key (see make_key)
+        allow_stale: Return expired entries too (for conditional revalidation)
+
+    Returns:
+        Dict with "value", "meta", "fresh" or None if missing (or expired and not allow_stale)
+    """
+    backend = _get_backend()
+    if not backend:
+        return None
+
+    entry = backend.get(namespace, key)
+    if entry is None:
+        return None
+
+    entry["fresh"] = entry["expires_at"] > time.time()
+    if not entry["fresh"] and not allow_stale:
+        return None
+    return entry
+
+
+def put(namespace: str, key: str, value: Any, meta: Optional[Dict] = None, ttl: Optional[float] = None):
+    """Store a JSON-serializable value under namespace/key for ttl seconds."""
+    backend = _get_backend()
+    if not backend:
+        return
+    ttl = ttl_for(namespace) if ttl is None else ttl
+    try:
+        backend.put(namespace, key, value, meta or {}, time.time() + ttl)
+        _record(namespace, "stores")
+        max_entries = max_entries_for(namespace)
+        if max_entries is not None:
+            backend.trim(namespace, max_entries)
+    except Exception as e:
+        print(f"⚠️  Cache write failed for {namespace}: {e}")
+
+
+def touch(namespace: str, key: str, ttl: Optional[float] = None):
+    """Mark an entry fresh again (e.g. after a 304 Not Modified)."""
+    backend = _get_backend()
+    if not backend:
+        return
+    ttl = ttl_for(namespace) if ttl is None else ttl
+    backend.touch(namespace, key, time.time() + ttl)
+
+
+def record_hit(namespace: str):
+    _record(namespace, "hits")
+
+
+def record_miss(namespace: str):
+    _record(namespace, "misses")
+
+
+def record_revalidated(namespace: str):
+    _record(namespace, "revalidated")
+
+
+def cached_get_json(namespace: str, url: str, params: Optional[Dict] = None,
+                    cache_if: Optional[Callable[[Dict], bool]] = None,
+                    limiter: Optional[str] = None, **kwargs) -> Dict:
+    """GET a JSON API, serving from the cache while the entry is fresh.
+
+    Args:
+        namespace: Cache namespace, also selects the TTL
+        url: Endpoint URL
+        params: Query params (credentials are kept out of the cache key)
+        cache_if: Predicate on the decoded body; only matching responses are stored
+        limiter: rate_limit provider to wait on before a network request (cache hits are free)
+        **kwargs: Passed through to http_client.get (timeout, headers, ...)
+
+    Returns:
+        Decoded JSON body
+
+    Raises:
+        requests.exceptions.RequestException: On network errors or non-2xx responses
+    """
+    key = make_key(url, params)
+    entry = get(namespace, key)
+    if entry is not None:
+        record_hit(namespace)
+        return entry["value"]
+
+    record_miss(namespace)
+    if limiter:
+        rate_limit.acquire(limiter)
+    response = http_client.get(url, params=params, **kwargs)
+    response.raise_for_status()
+    data = response.json()
+
+    if cache_if is None or cache_if(data):
+        put(namespace, key, data)
+    return data
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters per namespace for the current run."""
+    with _stats_lock:
+        return {ns: dict(counts) for ns, counts in _stats.items()}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def report():
+    """Print cache hit/miss counters for the run."""
+    run_stats = stats()
+    if not run_stats:
+        return
+    print("🗄️  Cache summary:")
+    for namespace in sorted(run_stats):
+        counts = run_stats[namespace]
+        hits = counts.get("hits", 0) + counts.get("revalidated", 0)
+        lookups = hits + counts.get("misses", 0)
+        rate = f"{hits / lookups:.0%}" if lookups else "n/a"
+        print(f"   {namespace}: {counts.get('hits', 0)} hits, {counts.get('revalidated', 0)} revalidated, "
+              f"{counts.get('misses', 0)} misses ({rate} hit rate)")
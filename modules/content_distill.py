@@ -0,0 +1,251 @@
+"""
+Page Content Distillation
+Turns a page into the compact text the LLM analysis is given: the title, the
+meta description and the most informative blocks of the body that fit in a
+token budget (LLM_CONTENT_TOKEN_BUDGET).
+
+The blocks (headings, paragraphs, list items, buttons, addresses, ...) are
+collected by BlockCollector during html_signals' single html.parser pass over
+the page, so the audit and the LLM stage share one parse. distill() ranks
+them by kind, boosts calls to action and contact details, demotes blocks
+that are mostly link text (menus), dedupes, and packs them best-first into
+the budget; the kept blocks are emitted in page order. Token counts come
+from a regex approximation of BPE tokenizers, so no tokenizer package is
+needed.
+"""
+
+import os
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+# Elements whose text is never page content
+SKIPPED_TAGS = {"title", "script", "style", "nav", "footer", "noscript", "template", "svg", "select", "iframe"}
+
+# Elements that start a new text block, with their base rank
+BLOCK_WEIGHTS = {
+    "h1": 10, "h2": 8, "h3": 6, "h4": 5, "h5": 4, "h6": 4,
+    "address": 6, "li": 4, "dt": 4, "button": 4, "th": 3, "dd": 3, "p": 3, "blockquote": 2,
+    "td": 2, "figcaption": 2, "label": 1, "form": 1,
+    "body": 1, "main": 1, "article": 1, "section": 1, "header": 1, "aside": 1,
+    "div": 1, "ul": 1, "ol": 1, "dl": 1, "table": 1, "tr": 1,
+}
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+_CTA_RE = re.compile(
+    r"\b(call|contact|book|schedule|request|quote|estimate|consultation|appointment|get started|sign up"
+    r"|order|buy|shop|visit us)\b",
+    re.IGNORECASE,
+)
+_PHONE_RE = re.compile(r"(?:\+?1[\s.-]?)?\(?\b\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}\b")
+_EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b")
+_STREET_RE = re.compile(r"\b\d{1,6}\s+\w+(?:\s\w+)?\s+(?:st|street|ave|avenue|rd|road|blvd|dr|drive|ln|lane|way|pkwy|hwy|suite|ste)\b",
+                        re.IGNORECASE)
+
+# Word pieces of up to 6 letters, digit runs of up to 3 and single punctuation marks:
+# within ~10% of cl100k/Claude counts on English web copy
+_TOKEN_RE = re.compile(r"[^\W\d_]{1,6}|\d{1,3}|[^\w\s]|_")
+_DEDUPE_RE = re.compile(r"\W+")
+
+# Don't bother squeezing a truncated block into less room than this
+MIN_PARTIAL_TOKENS = 24
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM token count of `text`."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def token_budget() -> int:
+    """Content tokens per analysis (LLM_CONTENT_TOKEN_BUDGET)."""
+    return int(os.getenv("LLM_CONTENT_TOKEN_BUDGET", "600"))
+
+
+class BlockCollector:
+    """Splits a page's visible text into blocks, fed the events of an html.parser pass.
+
+    Call start/end/data from the parser's handle_starttag/handle_endtag/
+    handle_data (and end after start for self-closing tags), then close().
+    """
+
+    def __init__(self):
+        self.blocks: List[Dict] = []
+        self._skip_depth = 0
+        self._link_depth = 0
+        self._open_blocks: List[str] = []
+        self._parts: List[str] = []
+        self._link_chars = 0
+        self._contact = False
+
+    def _flush(self):
+        text = " ".join("".join(self._parts).split())
+        if text:
+            self.blocks.append({
+                "kind": self._open_blocks[-1] if self._open_blocks else "body",
+                "text": text,
+                "link_chars": min(self._link_chars, len(text)),
+                "contact": self._contact,
+                "order": len(self.blocks),
+            })
+        self._parts, self._link_chars, self._contact = [], 0, False
+
+    def start(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag in BLOCK_WEIGHTS:
+            self._flush()
+            self._open_blocks.append(tag)
+        elif tag == "a":
+            self._link_depth += 1
+            href = (dict(attrs).get("href") or "").lower()
+            if href.startswith(("tel:", "mailto:")):
+                self._contact = True
+        elif tag == "br":
+            self._parts.append(" ")
+
+    def end(self, tag: str):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if self._skip_depth:
+            return
+        if tag in BLOCK_WEIGHTS and tag in self._open_blocks:
+            self._flush()
+            # Also closes blocks left open inside it (<p> and <li> often are)
+            while self._open_blocks.pop() != tag:
+                pass
+        elif tag == "a":
+            self._link_depth = max(0, self._link_depth - 1)
+
+    def data(self, data: str):
+        if self._skip_depth:
+            return
+        self._parts.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def close(self) -> List[Dict]:
+        self._flush()
+        return self.blocks
+
+
+class _BlockParser(HTMLParser):
+    """Drives a BlockCollector on its own (for html_signals' tree-based extractor)."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.collector = BlockCollector()
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def collect_blocks(html: str) -> List[Dict]:
+    """Text blocks of a page in a pass of their own."""
+    parser = _BlockParser()
+    parser.feed(html)
+    parser.close()
+    return parser.collector.close()
+
+
+def _score(block: Dict) -> float:
+    """How much a block tells the LLM about the business."""
+    text, kind = block["text"], block["kind"]
+    score = float(BLOCK_WEIGHTS.get(kind, 1))
+    words = len(text.split())
+    if kind not in HEADINGS:
+        # Prose carries the service descriptions; one-word fragments rarely say anything
+        score += min(words, 60) / 30
+        if words < 3:
+            score -= 2
+    if block["link_chars"] > 0.6 * len(text):
+        score *= 0.4  # menus and link lists (CTA and contact links get their bonus below)
+    if _CTA_RE.search(text):
+        score += 4
+    if block["contact"] or kind == "address" or _PHONE_RE.search(text) or _EMAIL_RE.search(text) \
+            or _STREET_RE.search(text):
+        score += 5
+    return score
+
+
+def _render(block: Dict, text: str) -> str:
+    kind = block["kind"]
+    if kind == "h1":
+        return f"# {text}"
+    if kind in HEADINGS:
+        return f"## {text}"
+    if kind in ("li", "dt", "dd"):
+        return f"- {text}"
+    return text
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut text at a word boundary to roughly max_tokens."""
+    words, kept, used = text.split(), [], 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens - 1:
+            break
+        kept.append(word)
+        used += cost
+    return " ".join(kept) + " …"
+
+
+def pack(blocks: List[Dict], budget: int) -> List[str]:
+    """Dedupe and rank blocks, keep the best that fit in `budget` tokens, in page order."""
+    seen, candidates = set(), []
+    for block in blocks:
+        key = _DEDUPE_RE.sub(" ", block["text"].lower()).strip()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        candidates.append(block)
+
+    ranked = sorted(candidates, key=lambda b: (-_score(b), b["order"]))
+    kept, remaining = [], budget
+    for block in ranked:
+        if remaining < MIN_PARTIAL_TOKENS // 2:
+            break
+        line = _render(block, block["text"])
+        cost = estimate_tokens(line) + 1  # + newline
+        if cost <= remaining:
+            kept.append((block["order"], line))
+            remaining -= cost
+        elif remaining >= MIN_PARTIAL_TOKENS and block["kind"] not in HEADINGS:
+            line = _render(block, _truncate(block["text"], remaining - 4))
+            kept.append((block["order"], line))
+            remaining -= estimate_tokens(line) + 1
+    return [line for _, line in sorted(kept)]
+
+
+def distill(signals: Dict, budget: Optional[int] = None) -> Dict:
+    """Title, meta description and budgeted body content of a page.
+
+    Args:
+        signals: The page's html_signals (title, meta_description, content_blocks)
+        budget: Content token budget (defaults to LLM_CONTENT_TOKEN_BUDGET)
+
+    Returns:
+        Dict with title, meta_description (None when missing), content (one
+        block per line), tokens (estimated, content only), and blocks/kept counts
+    """
+    blocks = signals.get("content_blocks") or []
+    lines = pack(blocks, token_budget() if budget is None else budget)
+    content = "\n".join(lines)
+    return {
+        "title": " ".join((signals.get("title") or "").split()) or None,
+        "meta_description": " ".join((signals.get("meta_description") or "").split()) or None,
+        "content": content,
+        "tokens": estimate_tokens(content),
+        "blocks": len(blocks),
+        "kept": len(lines),
+    }
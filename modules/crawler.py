@@ -0,0 +1,227 @@
+"""
+Multi-Page Site Crawler
+Follows same-host links from a lead's homepage so schema, FAQ and freshness
+signals on service and location pages count towards the audit.
+
+Crawls run on asyncio: each site is walked breadth-first up to CRAWL_DEPTH
+link hops and CRAWL_MAX_PAGES pages (1 = homepage only, the default), with
+page downloads handed to worker threads through page_fetch so they share its
+pooled session, cache and download caps. Followed links must be allowed by
+the site's robots.txt.
+
+Every audit worker runs its own event loop (see crawl()), so the run-wide
+limits live outside asyncio: requests to one host are spaced at least
+CRAWL_DELAY seconds apart across every running crawl, and CRAWL_CONCURRENCY
+bounds the downloads in flight across all of them.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+try:
+    from modules import cache, html_signals, http_client, page_fetch
+except ImportError:
+    import cache
+    import html_signals
+    import http_client
+    import page_fetch
+
+# Links that never lead to an HTML page worth auditing
+SKIP_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".pdf", ".zip",
+    ".doc", ".docx", ".xls", ".xlsx", ".mp3", ".mp4", ".mov", ".avi", ".css", ".js", ".xml",
+)
+
+_host_next_slot: Dict[str, float] = {}
+_host_lock = threading.Lock()
+_robots: Dict[str, Optional[RobotFileParser]] = {}
+_robots_lock = threading.Lock()
+_downloads: Optional[threading.BoundedSemaphore] = None
+
+
+def max_pages() -> int:
+    return max(1, int(os.getenv("CRAWL_MAX_PAGES", "1")))
+
+
+def _max_depth() -> int:
+    return max(0, int(os.getenv("CRAWL_DEPTH", "1")))
+
+
+def _politeness_delay() -> float:
+    return float(os.getenv("CRAWL_DELAY", "1.0"))
+
+
+def _host(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def _same_site(host: str, other: str) -> bool:
+    """Same host, treating www.example.com and example.com as one site."""
+    return host.removeprefix("www.") == other.removeprefix("www.")
+
+
+def _normalize_link(base_url: str, href: str) -> Optional[str]:
+    """Resolve an href against its page and drop fragments; None if not crawlable."""
+    href = (href or "").strip()
+    if not href or href.startswith(("mailto:", "tel:", "javascript:", "#")):
+        return None
+    url, _ = urldefrag(urljoin(base_url, href))
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https"):
+        return None
+    if parsed.path.lower().endswith(SKIP_EXTENSIONS):
+        return None
+    return url
+
+
+async def _wait_for_host(host: str):
+    """Reserve the next request slot for a host, sleeping until it comes up."""
+    delay = _politeness_delay()
+    with _host_lock:
+        now = time.monotonic()
+        slot = max(now, _host_next_slot.get(host, 0.0))
+        _host_next_slot[host] = slot + delay
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+
+def _download_slots() -> threading.BoundedSemaphore:
+    """Run-wide cap on crawl downloads in flight (CRAWL_CONCURRENCY)."""
+    global _downloads
+    with _host_lock:
+        if _downloads is None:
+            _downloads = threading.BoundedSemaphore(max(1, int(os.getenv("CRAWL_CONCURRENCY", "32"))))
+        return _downloads
+
+
+def _load_robots(base_url: str) -> Optional[RobotFileParser]:
+    """Fetch and parse a site's robots.txt (cached); None means everything is allowed."""
+    parsed = urlparse(base_url)
+    robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+
+    entry = cache.get("robots", robots_url)
+    if entry is not None:
+        cache.record_hit("robots")
+        body = entry["value"]
+    else:
+        cache.record_miss("robots")
+        try:
+            response = http_client.get(robots_url, headers={"User-Agent": page_fetch.USER_AGENT}, timeout=10)
+            # A missing robots.txt allows everything; so does a server error, which
+            # is looser than the RFC but keeps one flaky host from stalling audits
+            body = response.text if response.status_code == 200 else ""
+            transient = response.status_code >= 500
+        except Exception as e:
+            print(f"    ⚠️  robots.txt unavailable for {parsed.netloc}: {e}")
+            body, transient = "", True
+        # Only an actual answer is kept across runs; after an outage the next run asks again
+        if not transient:
+            cache.put("robots", robots_url, body)
+
+    if not body:
+        return None
+    parser = RobotFileParser(robots_url)
+    parser.parse(body.splitlines())
+    return parser
+
+
+def robots_for(url: str) -> Optional[RobotFileParser]:
+    """Parsed robots.txt for a URL's host, loaded once per run (None if the site has none)."""
+    host = _host(url)
+    with _robots_lock:
+        if host in _robots:
+            return _robots[host]
+    parser = _load_robots(url)
+    with _robots_lock:
+        _robots[host] = parser
+    return parser
+
+
+def _fetch_and_extract(url: str, timeout: int) -> Tuple[page_fetch.Page, Dict]:
+    with _download_slots():
+        page = page_fetch.fetch_page(url, timeout=timeout)
+    return page, html_signals.extract_page_signals(page)
+
+
+async def crawl_site(url: str, pages: Optional[int] = None, depth: Optional[int] = None,
+                     timeout: int = 10) -> List[Dict]:
+    """Crawl one site breadth-first from its homepage.
+
+    The homepage is always fetched (as the single-page audit did); further pages
+    must be on the same host and allowed by robots.txt.
+
+    Args:
+        url: Homepage URL
+        pages: Page budget (defaults to CRAWL_MAX_PAGES)
+        depth: Maximum link hops from the homepage (defaults to CRAWL_DEPTH)
+        timeout: Per-page download timeout in seconds
+
+    Returns:
+        List of {"url", "depth", "page", "signals"} in crawl order, homepage
+        first. Failed follow-up pages are skipped; if the homepage fails its
+        exception is raised.
+    """
+    pages = max_pages() if pages is None else pages
+    depth = _max_depth() if depth is None else depth
+
+    home_host = _host(url)
+    robots = None
+    seen = {url}
+    queue = deque([(url, 0)])
+    results: List[Dict] = []
+
+    while queue and len(results) < pages:
+        # Fetch one BFS wave at a time, bounded by the remaining page budget
+        batch = [queue.popleft() for _ in range(min(len(queue), pages - len(results)))]
+
+        async def fetch(item):
+            page_url, page_depth = item
+            await _wait_for_host(_host(page_url))
+            return await asyncio.to_thread(_fetch_and_extract, page_url, timeout)
+
+        fetched = await asyncio.gather(*(fetch(item) for item in batch), return_exceptions=True)
+
+        for (page_url, page_depth), outcome in zip(batch, fetched):
+            if isinstance(outcome, BaseException):
+                if page_depth == 0:
+                    raise outcome
+                continue
+            page, signals = outcome
+            results.append({"url": page_url, "depth": page_depth, "page": page, "signals": signals})
+
+            if page_depth >= depth:
+                continue
+            if robots is None and pages > 1:
+                robots = await asyncio.to_thread(robots_for, url) or False
+            base = page.final_url or page_url
+            for href in signals.get("links", []):
+                link = _normalize_link(base, href)
+                if not link or link in seen or not _same_site(home_host, _host(link)):
+                    continue
+                seen.add(link)
+                if robots and not robots.can_fetch(page_fetch.USER_AGENT, link):
+                    continue
+                queue.append((link, page_depth + 1))
+
+    return results
+
+
+def crawl(url: str, pages: Optional[int] = None, depth: Optional[int] = None) -> List[Dict]:
+    """Synchronous crawl_site() for callers running in worker threads (one event loop per call)."""
+    return asyncio.run(crawl_site(url, pages=pages, depth=depth))
+
+
+def reset():
+    """Forget per-host politeness slots, parsed robots.txt files and the download cap."""
+    global _downloads
+    with _host_lock:
+        _host_next_slot.clear()
+        _downloads = None
+    with _robots_lock:
+        _robots.clear()
@@ -0,0 +1,153 @@
+"""
+Tech-Stack & Schema Fingerprinting
+Data-driven detection of the CMS / site builder and other technologies behind
+a page. Signatures live in fingerprints.json (override with FINGERPRINTS_PATH)
+and can match the HTML, script srcs, <meta name="generator">, response headers
+and cookie names.
+
+All literal patterns for a source are compiled into one prefix-trie regex, so a
+page is scanned once per source no matter how many signatures are loaded.
+"""
+
+import os
+import re
+import json
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+DEFAULT_SIGNATURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fingerprints.json")
+
+# Categories that can be reported as the site's primary tech_stack
+STACK_CATEGORIES = ("cms", "builder", "ecommerce")
+
+_COOKIE_NAME_RE = re.compile(r"(?:^|,)\s*([^=;,\s]+)=")
+
+
+def _trie_regex(patterns: Iterable[str]) -> str:
+    """Build a regex that matches any of `patterns`, sharing common prefixes."""
+    trie: Dict = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[""] = {}  # end-of-pattern marker
+
+    def render(node: Dict) -> str:
+        alternatives = []
+        optional = False
+        for char in sorted(node):
+            if char == "":
+                optional = True
+            else:
+                alternatives.append(re.escape(char) + render(node[char]))
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        if optional:
+            body = "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+class _LiteralMatcher:
+    """Finds which signatures' literal patterns occur in a text, in one scan."""
+
+    def __init__(self, pattern_names: Dict[str, Set[str]]):
+        self.pattern_names = pattern_names
+        # Lookahead so overlapping patterns that start inside another match are still seen
+        self.regex = re.compile("(?=(" + _trie_regex(pattern_names) + "))") if pattern_names else None
+
+    def match(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        if not self.regex or not text:
+            return found
+        for m in self.regex.finditer(text.lower()):
+            names = self.pattern_names.get(m.group(1))
+            if names:
+                found |= names
+        return found
+
+
+class FingerprintEngine:
+    """Compiled set of technology and schema signatures."""
+
+    def __init__(self, signatures: Dict):
+        self.technologies = {t["name"]: t for t in signatures.get("technologies", [])}
+
+        by_source: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.header_rules: Dict[str, List] = defaultdict(list)
+        for tech in self.technologies.values():
+            for source in ("html", "script_src", "meta_generator", "cookies"):
+                for pattern in tech.get(source, []):
+                    by_source[source][pattern.lower()].add(tech["name"])
+            for header, patterns in tech.get("headers", {}).items():
+                for pattern in patterns:
+                    self.header_rules[header.lower()].append((pattern.lower(), tech["name"]))
+
+        self.matchers = {source: _LiteralMatcher(dict(patterns)) for source, patterns in by_source.items()}
+
+        self.schema_groups: Dict[str, Set[str]] = {
+            group: set(types) for group, types in signatures.get("schema", {}).items()
+        }
+
+    def _match(self, source: str, text: str) -> Set[str]:
+        matcher = self.matchers.get(source)
+        return matcher.match(text) if matcher else set()
+
+    def detect(self, html: str = "", headers: Optional[Dict[str, str]] = None,
+               script_srcs: Iterable[str] = (), meta_generators: Iterable[str] = ()) -> Dict:
+        """Detect technologies from every available source.
+
+        Args:
+            html: Decoded page HTML
+            headers: Response headers (case-insensitive mapping or plain dict)
+            script_srcs: src attributes of <script> tags
+            meta_generators: content of <meta name="generator"> tags
+
+        Returns:
+            Dict with "technologies" (names, primary-stack candidates first) and
+            "tech_stack" (best cms/builder/ecommerce match, or "Custom")
+        """
+        found = self._match("html", html)
+        found |= self._match("script_src", "\n".join(script_srcs))
+        found |= self._match("meta_generator", "\n".join(meta_generators))
+
+        if headers:
+            lowered = {k.lower(): str(v).lower() for k, v in headers.items()}
+            for header, rules in self.header_rules.items():
+                value = lowered.get(header)
+                if value is None:
+                    continue
+                found |= {name for pattern, name in rules if pattern in value}
+            cookie_names = _COOKIE_NAME_RE.findall(lowered.get("set-cookie", ""))
+            found |= self._match("cookies", "\n".join(cookie_names))
+
+        ranked = sorted(found, key=lambda name: (-self.technologies[name].get("priority", 0), name))
+        stack = next((name for name in ranked
+                      if self.technologies[name].get("category") in STACK_CATEGORIES), "Custom")
+        return {"technologies": ranked, "tech_stack": stack}
+
+    def schema_flags(self, schema_types: Iterable[str]) -> Dict[str, bool]:
+        """Map detected schema.org types onto the signature file's groups (faq, organization, ...)."""
+        types = set(schema_types)
+        return {group: bool(types & members) for group, members in self.schema_groups.items()}
+
+
+_engine: Optional[FingerprintEngine] = None
+_engine_lock = threading.Lock()
+
+
+def signatures_path() -> str:
+    return os.getenv("FINGERPRINTS_PATH", DEFAULT_SIGNATURES_PATH)
+
+
+def get_engine() -> FingerprintEngine:
+    """Load and compile the signature file once per process."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            with open(signatures_path(), "r", encoding="utf-8") as f:
+                _engine = FingerprintEngine(json.load(f))
+        return _engine
@@ -0,0 +1,230 @@
+"""
+Content Freshness
+Estimates how long ago a site's content last changed from real modification
+dates instead of year strings in the HTML (usually a footer copyright):
+
+- dateModified in ld+json and article:modified_time-style <meta> tags
+- the Last-Modified header of fetched pages (ignored when it just echoes the
+  response Date, as dynamically rendered pages do)
+- <lastmod> entries of the site's sitemaps, found via robots.txt Sitemap:
+  lines or /sitemap.xml, parsed incrementally (sitemap indexes and gzipped
+  sitemaps included). The newest sitemap date is cached per domain.
+
+The newest page or header date wins. Sitemaps cost extra downloads per site,
+so they are only read when the fetched pages carry no date. Sites with no
+usable date keep the old default of 6 months.
+"""
+
+import os
+import zlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+try:
+    from modules import cache, crawler, http_client, page_fetch
+except ImportError:
+    import cache
+    import crawler
+    import http_client
+    import page_fetch
+
+DEFAULT_MONTHS = 6
+DAYS_PER_MONTH = 30.44
+
+# Last-Modified within this many seconds of Date means the page was rendered on request
+DYNAMIC_LAST_MODIFIED_SLACK = 60
+
+
+def _parse_date(value: str) -> Optional[datetime]:
+    """Parse an ISO 8601 / W3C datetime (as used by sitemaps and schema.org) to UTC."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = datetime.strptime(value[:10], "%Y-%m-%d")
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def header_last_modified(headers) -> Optional[datetime]:
+    """Last-Modified from response headers, unless it is just the time of the request."""
+    if not headers:
+        return None
+    last_modified = _parse_http_date(headers.get("Last-Modified"))
+    served = _parse_http_date(headers.get("Date"))
+    if last_modified and served and abs((served - last_modified).total_seconds()) <= DYNAMIC_LAST_MODIFIED_SLACK:
+        return None
+    return last_modified
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_sitemap(url: str) -> Tuple[Optional[datetime], List[Tuple[str, Optional[datetime]]]]:
+    """Stream one sitemap file.
+
+    Returns:
+        (newest <lastmod> of its URLs, [(child sitemap loc, lastmod)] if it is an index)
+    """
+    max_bytes = int(os.getenv("SITEMAP_MAX_BYTES", str(10 * 1024 * 1024)))
+    response = http_client.get(url, headers={"User-Agent": page_fetch.USER_AGENT}, timeout=15, stream=True)
+    try:
+        if not response.ok:
+            return None, []
+
+        parser = XMLPullParser(events=("start", "end"))
+        root = None
+        decompressor = None
+        newest: Optional[datetime] = None
+        children: List[Tuple[str, Optional[datetime]]] = []
+        loc = lastmod = None
+        read = 0
+
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            if not chunk:
+                continue
+            if read == 0 and chunk[:2] == b"\x1f\x8b":
+                # .xml.gz served as a file (requests only undoes Content-Encoding)
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            read += len(chunk)
+            parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+
+            for event, element in parser.read_events():
+                if event == "start":
+                    if root is None:
+                        root = element
+                    continue
+                name = _local_name(element.tag)
+                if name == "loc":
+                    loc = (element.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = _parse_date(element.text)
+                elif name in ("url", "sitemap"):
+                    if name == "sitemap" and loc:
+                        children.append((loc, lastmod))
+                    elif lastmod and (newest is None or lastmod > newest):
+                        newest = lastmod
+                    loc = lastmod = None
+                    # Drop the finished entry from <urlset>/<sitemapindex> so memory stays flat
+                    root.clear()
+
+            if read > max_bytes:
+                print(f"    ⚠️  Sitemap {url} exceeds {max_bytes} bytes, using entries read so far")
+                break
+        return newest, children
+    except (ParseError, zlib.error) as e:
+        print(f"    ⚠️  Could not parse sitemap {url}: {e}")
+        return None, []
+    finally:
+        response.close()
+
+
+def _sitemap_urls(site_url: str) -> List[str]:
+    robots = crawler.robots_for(site_url)
+    listed = robots.site_maps() if robots else None
+    if listed:
+        return list(listed)
+    parsed = urlparse(site_url)
+    return [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+
+
+def sitemap_last_modified(site_url: str) -> Optional[datetime]:
+    """Newest <lastmod> across a site's sitemaps, cached per domain.
+
+    For sitemap indexes only the SITEMAP_MAX_FILES most recently modified child
+    sitemaps are read.
+    """
+    domain = urlparse(site_url).netloc.lower().removeprefix("www.")
+    entry = cache.get("freshness", domain)
+    if entry is not None:
+        cache.record_hit("freshness")
+        return _parse_date(entry["value"]["sitemap_lastmod"] or "")
+    cache.record_miss("freshness")
+
+    max_files = int(os.getenv("SITEMAP_MAX_FILES", "5"))
+    newest: Optional[datetime] = None
+    pending = _sitemap_urls(site_url)
+    seen = set()
+
+    try:
+        while pending and len(seen) < max_files:
+            url = pending.pop(0)
+            if url in seen:
+                continue
+            seen.add(url)
+            found, children = _parse_sitemap(url)
+            if found and (newest is None or found > newest):
+                newest = found
+            if children:
+                # Newest children first; an index lastmod is already a good answer on its own
+                epoch = datetime.min.replace(tzinfo=timezone.utc)
+                children.sort(key=lambda child: child[1] or epoch, reverse=True)
+                for _, child_lastmod in children:
+                    if child_lastmod and (newest is None or child_lastmod > newest):
+                        newest = child_lastmod
+                pending.extend(loc for loc, _ in children)
+    except Exception as e:
+        print(f"    ⚠️  Sitemap lookup failed for {domain}: {e}")
+
+    cache.put("freshness", domain, {"sitemap_lastmod": newest.isoformat() if newest else None})
+    return newest
+
+
+def assess(site_url: str, pages: Iterable[Dict]) -> Dict:
+    """Estimate content age for a site.
+
+    Args:
+        site_url: Homepage URL
+        pages: crawler-style {"page", "signals"} dicts for the fetched pages
+
+    Returns:
+        Dict with "months" (content age), "source" (page_date, last_modified,
+        sitemap or default) and "last_modified" (ISO date or None)
+    """
+    now = datetime.now(timezone.utc)
+    candidates: List[Tuple[datetime, str]] = []
+
+    for item in pages:
+        for raw in item["signals"].get("modified_dates", []):
+            parsed = _parse_date(raw)
+            if parsed:
+                candidates.append((parsed, "page_date"))
+        header_date = header_last_modified(item["page"].headers)
+        if header_date:
+            candidates.append((header_date, "last_modified"))
+
+    # Sitemaps mean a robots.txt and up to SITEMAP_MAX_FILES downloads, so only when pages had no date
+    if not candidates and os.getenv("FRESHNESS_SITEMAPS", "1") != "0":
+        sitemap_date = sitemap_last_modified(site_url)
+        if sitemap_date:
+            candidates.append((sitemap_date, "sitemap"))
+
+    if not candidates:
+        return {"months": DEFAULT_MONTHS, "source": "default", "last_modified": None}
+
+    newest, source = max(candidates, key=lambda c: c[0])
+    newest = min(newest, now)  # future-dated lastmods count as "now"
+    months = int((now - newest).days / DAYS_PER_MONTH)
+    return {"months": months, "source": source, "last_modified": newest.date().isoformat()}
@@ -0,0 +1,221 @@
+"""
+HTML SEO Signal Extraction
+Pulls the handful of on-page signals the audit needs (title, meta description,
+schema markup, tech stack, modification dates, outgoing links) out of a page.
+
+extract_signals() walks the document once with html.parser callbacks and never
+builds a tree; the same pass collects the visible text blocks the LLM analysis
+is distilled from (content_distill). extract_signals_soup() is the original
+BeautifulSoup-based implementation, kept for HTML_EXTRACTOR=soup and as the
+benchmark baseline (its text blocks take a pass of their own).
+extract_page_signals() keeps the result on the page, so the audit, crawler
+and LLM stage share it. Tech stack and schema types are matched by the
+fingerprint engine.
+"""
+
+import os
+import re
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Set
+
+try:
+    from modules import content_distill, fingerprints
+except ImportError:
+    import content_distill
+    import fingerprints
+
+# "@type": "FAQPage" or "@type": ["LocalBusiness", "Plumber"] inside ld+json
+_LD_TYPE_RE = re.compile(r'"@type"\s*:\s*(\[[^\]]*\]|"[^"]*")')
+_QUOTED_RE = re.compile(r'"([^"]+)"')
+_LD_MODIFIED_RE = re.compile(r'"dateModified"\s*:\s*"([^"]+)"')
+
+# <meta> tags that carry a page's last modification time
+MODIFIED_META = {"article:modified_time", "og:updated_time", "datemodified", "last-modified"}
+
+
+def _schema_types(ld_json: Iterable[str], itemtypes: Iterable[str]) -> Set[str]:
+    """schema.org type names from ld+json @type values and microdata itemtype URLs."""
+    types: Set[str] = set()
+    for block in ld_json:
+        for value in _LD_TYPE_RE.findall(block):
+            types.update(_QUOTED_RE.findall(value))
+    for itemtype in itemtypes:
+        types.update((itemtype or "").split())
+    # "https://schema.org/FAQPage" / "schema:FAQPage" -> "FAQPage"
+    return {re.split(r"[/:#]", t.rstrip("/"))[-1] for t in types if t}
+
+
+def _build_signals(html: str, headers: Optional[Dict[str, str]], title: Optional[str],
+                   meta_description: Optional[str], itemtypes: List[str], ld_json: List[str],
+                   script_srcs: List[str], meta_generators: List[str], links: List[str],
+                   modified_meta: List[str], content_blocks: List[Dict]) -> Dict:
+    engine = fingerprints.get_engine()
+    tech = engine.detect(html, headers=headers, script_srcs=script_srcs, meta_generators=meta_generators)
+    schema_types = _schema_types(ld_json, itemtypes)
+    schema_flags = engine.schema_flags(schema_types)
+    modified_dates = modified_meta + [d for block in ld_json for d in _LD_MODIFIED_RE.findall(block)]
+
+    return {
+        "title": title,
+        "meta_description": meta_description,
+        "itemtypes": itemtypes,
+        "ld_json": ld_json,
+        "schema_types": sorted(schema_types),
+        "has_schema": bool(itemtypes) or bool(ld_json),
+        "has_faq": schema_flags.get("faq", False),
+        "has_org": schema_flags.get("organization", False),
+        "tech_stack": tech["tech_stack"],
+        "technologies": tech["technologies"],
+        "links": links,
+        "modified_dates": modified_dates,
+        "content_blocks": content_blocks,
+    }
+
+
+class _SignalParser(HTMLParser):
+    """Single-pass collector for the audit's on-page signals."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self.meta_description: Optional[str] = None
+        self.meta_generators: List[str] = []
+        self.itemtypes: List[str] = []
+        self.ld_json: List[str] = []
+        self.script_srcs: List[str] = []
+        self.links: List[str] = []
+        self.modified_meta: List[str] = []
+        self._in_title = False
+        self._title_parts: List[str] = []
+        self._in_ld_json = False
+        self._ld_parts: List[str] = []
+        self.blocks = content_distill.BlockCollector()
+
+    def handle_starttag(self, tag, attrs):
+        self.blocks.start(tag, attrs)
+        attr_map = dict(attrs)
+        if "itemtype" in attr_map:
+            self.itemtypes.append(attr_map["itemtype"] or "")
+
+        if tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "meta":
+            name = attr_map.get("name")
+            if name == "description" and self.meta_description is None:
+                self.meta_description = attr_map.get("content") or ""
+            elif name and name.lower() == "generator":
+                self.meta_generators.append(attr_map.get("content") or "")
+            key = (attr_map.get("property") or attr_map.get("itemprop") or name or "").lower()
+            if key in MODIFIED_META and attr_map.get("content"):
+                self.modified_meta.append(attr_map["content"])
+        elif tag == "a":
+            if attr_map.get("href"):
+                self.links.append(attr_map["href"])
+        elif tag == "script":
+            if attr_map.get("src"):
+                self.script_srcs.append(attr_map["src"])
+            if attr_map.get("type") == "application/ld+json":
+                self._in_ld_json = True
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.blocks.end(tag)
+        if tag == "title":
+            self._in_title = False
+            self.title = ""
+
+    def handle_endtag(self, tag):
+        self.blocks.end(tag)
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = "".join(self._title_parts)
+        elif tag == "script" and self._in_ld_json:
+            self._in_ld_json = False
+            self.ld_json.append("".join(self._ld_parts))
+            self._ld_parts = []
+
+    def handle_data(self, data):
+        self.blocks.data(data)
+        if self._in_title:
+            self._title_parts.append(data)
+        if self._in_ld_json:
+            self._ld_parts.append(data)
+
+
+def extract_signals(html: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+    """Collect on-page SEO signals in one streaming pass.
+
+    Args:
+        html: Decoded page HTML
+        headers: Response headers, used for header/cookie fingerprints
+
+    Returns:
+        Dict with title, meta_description, itemtypes, ld_json, schema_types,
+        has_schema, has_faq, has_org, tech_stack, technologies, links
+        (raw <a href> values), modified_dates (raw dateModified strings
+        from <meta> tags and ld+json) and content_blocks (visible text
+        blocks, see content_distill)
+    """
+    parser = _SignalParser()
+    parser.feed(html)
+    parser.close()
+
+    title = parser.title
+    if title is None and parser._in_title:
+        # Unterminated <title>: keep what was read
+        title = "".join(parser._title_parts)
+    if parser._in_ld_json and parser._ld_parts:
+        parser.ld_json.append("".join(parser._ld_parts))
+
+    return _build_signals(html, headers, title, parser.meta_description, parser.itemtypes,
+                          parser.ld_json, parser.script_srcs, parser.meta_generators, parser.links,
+                          parser.modified_meta, parser.blocks.close())
+
+
+def extract_signals_soup(soup, html: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+    """Collect the same signals from a BeautifulSoup tree.
+
+    Args:
+        soup: Parsed BeautifulSoup tree of the page
+        html: Decoded page HTML
+        headers: Response headers, used for header/cookie fingerprints
+
+    Returns:
+        Same shape as extract_signals()
+    """
+    title = soup.find("title")
+    meta_desc = soup.find("meta", attrs={"name": "description"})
+    generators = soup.find_all("meta", attrs={"name": re.compile("^generator$", re.IGNORECASE)})
+    modified_meta = []
+    for tag in soup.find_all("meta", content=True):
+        key = (tag.get("property") or tag.get("itemprop") or tag.get("name") or "").lower()
+        if key in MODIFIED_META and tag.get("content"):
+            modified_meta.append(tag["content"])
+
+    return _build_signals(
+        html,
+        headers,
+        title.text if title else None,
+        meta_desc.get("content", "") if meta_desc else None,
+        [tag.get("itemtype") for tag in soup.find_all(attrs={"itemtype": True})],
+        [tag.get_text() for tag in soup.find_all("script", type="application/ld+json")],
+        [tag.get("src") for tag in soup.find_all("script", src=True)],
+        [tag.get("content", "") for tag in generators],
+        [tag.get("href") for tag in soup.find_all("a", href=True)],
+        modified_meta,
+        content_distill.collect_blocks(html),
+    )
+
+
+def extract_page_signals(page) -> Dict:
+    """Extract signals from a fetched page_fetch.Page (once per page; later calls share the result).
+
+    Single streaming pass by default; HTML_EXTRACTOR=soup uses the tree-based extractor.
+    """
+    if page.signals is None:
+        # Concurrent first calls may both extract; either result is the same
+        if os.getenv("HTML_EXTRACTOR", "stream").lower() == "soup":
+            page.signals = extract_signals_soup(page.soup, page.html, headers=page.headers)
+        else:
+            page.signals = extract_signals(page.html, headers=page.headers)
+    return page.signals
@@ -0,0 +1,132 @@
+"""
+Shared HTTP Session
+One pooled requests.Session for every outbound call, so TLS handshakes are
+reused across the hundreds of Places, PSI, Hunter, DataForSEO and LLM calls in
+a run, and 429/5xx retries are handled in one place. Callers that pace 429s
+themselves (the LLM client) pass retry_429=False and get a twin session that
+hands 429s straight back.
+
+Tuning (env): HTTP_POOL_CONNECTIONS (hosts kept pooled), HTTP_POOL_MAXSIZE
+(max open connections per host), HTTP_RETRIES, HTTP_BACKOFF (seconds, doubled
+per retry) and HTTP_TIMEOUT (default timeout in seconds when a caller gives none).
+
+API hosts are resolved through api_url(): <PROVIDER>_BASE_URL points one
+provider elsewhere and MOCK_API_URL points all of them at a stand-in server
+(see benchmarks/mock_api_server.py).
+"""
+
+import os
+import threading
+import requests
+from typing import Dict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Transient statuses worth retrying; Retry-After is honored on 429/503
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Statuses that mean the request was turned away before any work was done. Only these
+# are retried for POSTs (DataForSEO task_post, LLM messages, batch submits): a 500/502/504
+# can come back after the request was accepted, and resending it can bill a duplicate task
+UNPROCESSED_STATUSES = (429, 503)
+
+# Production hosts per provider
+API_BASE_URLS = {
+    "google_places": "https://maps.googleapis.com",
+    "pagespeed": "https://www.googleapis.com",
+    "dataforseo": "https://api.dataforseo.com",
+    "serpapi": "https://serpapi.com",
+    "hunter": "https://api.hunter.io",
+    "anthropic": "https://api.anthropic.com",
+    "openai": "https://api.openai.com/v1",  # OPENAI_BASE_URL includes /v1, as in the OpenAI SDK
+}
+
+# Sessions by whether they retry 429s themselves (see request())
+_sessions: Dict[bool, requests.Session] = {}
+_session_lock = threading.Lock()
+
+
+class _Retry(Retry):
+    """urllib3 Retry that only resends non-idempotent requests on UNPROCESSED_STATUSES."""
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() not in Retry.DEFAULT_ALLOWED_METHODS and status_code not in UNPROCESSED_STATUSES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def _build_session(retry_429: bool = True) -> requests.Session:
+    retries = int(os.getenv("HTTP_RETRIES", "3"))
+    retry = _Retry(
+        total=retries,
+        connect=retries,
+        read=0,  # a read timeout already cost the full timeout; don't multiply it
+        status=retries,
+        status_forcelist=RETRY_STATUSES if retry_429 else tuple(s for s in RETRY_STATUSES if s != 429),
+        allowed_methods=None,  # POSTs too, but _Retry limits them to UNPROCESSED_STATUSES
+        backoff_factor=float(os.getenv("HTTP_BACKOFF", "0.5")),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the final response back so raise_for_status() behaves as before
+    )
+    adapter = HTTPAdapter(
+        pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "32")),
+        pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "10")),
+        pool_block=True,  # makes pool_maxsize a hard per-host connection cap
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(retry_429: bool = True) -> requests.Session:
+    """Return the process-wide pooled session (created on first use)."""
+    with _session_lock:
+        if retry_429 not in _sessions:
+            _sessions[retry_429] = _build_session(retry_429)
+        return _sessions[retry_429]
+
+
+def request(method: str, url: str, retry_429: bool = True, **kwargs) -> requests.Response:
+    """Send a request through the shared session, applying the default timeout.
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        retry_429: Retry 429s here (honoring Retry-After); pass False when the
+            caller has its own 429 handling, so it is the only retry layer
+        **kwargs: Same as requests.request
+
+    Returns:
+        The final response (after any retries)
+    """
+    kwargs.setdefault("timeout", float(os.getenv("HTTP_TIMEOUT", "15")))
+    return get_session(retry_429).request(method, url, **kwargs)
+
+
+def api_url(provider: str, path: str) -> str:
+    """Full URL of a provider endpoint, honoring <PROVIDER>_BASE_URL and MOCK_API_URL.
+
+    Args:
+        provider: Key of API_BASE_URLS (e.g. "google_places")
+        path: Endpoint path starting with "/"
+    """
+    base = os.getenv(f"{provider.upper()}_BASE_URL") or os.getenv("MOCK_API_URL") or API_BASE_URLS[provider]
+    return base.rstrip("/") + path
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def reset():
+    """Close pooled connections (the next call builds a fresh session)."""
+    with _session_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -1,8 +1,14 @@
 import os
-import requests
-from typing import List, Dict
+import json
+import time
+import threading
+from typing import List, Dict, Tuple
 import base64
 
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import cache, http_client, rate_limit, stubs
+
 # A default catalog of candidate industries to rank.
 CANDIDATE_INDUSTRIES = [
     "auto dealers", "law firms", "medspas", "dentists", "roofing contractors",
@@ -13,6 +19,10 @@ CANDIDATE_INDUSTRIES = [
     "orthodontists", "payroll services"
 ]
 
+# Persistent geo -> DataForSEO location index, so repeat runs skip the locations endpoint
+_location_index = None
+_location_lock = threading.Lock()
+
 def _serp_volume_proxy(geo: str, industry: str) -> float:
     """Get search volume/demand using DataForSEO or SerpAPI (with fallback to stub)."""
 
@@ -39,38 +49,36 @@ def _serp_volume_proxy(geo: str, industry: str) -> float:
     if not dataforseo_login and not serpapi_key:
         print(f"  ⚠️  No SERP API configured, using stub data")
 
-    seed = abs(hash((geo.lower(), industry.lower()))) % 1000
-    return 100 + (seed % 300)  # 100-400
+    return stubs.serp_volume(geo, industry)  # 100-400, stable across runs
 
 
-def _dataforseo_serp_analysis(geo: str, industry: str, login: str, password: str) -> float:
-    """Analyze SERP data using DataForSEO API."""
-
-    # Create basic auth header
+def _dataforseo_headers(login: str, password: str) -> Dict[str, str]:
+    """Basic auth headers for the DataForSEO API."""
     credentials = f"{login}:{password}"
     encoded = base64.b64encode(credentials.encode()).decode()
 
-    headers = {
+    return {
         "Authorization": f"Basic {encoded}",
         "Content-Type": "application/json"
     }
 
+
+def _dataforseo_serp_analysis(geo: str, industry: str, login: str, password: str) -> float:
+    """Analyze SERP data using DataForSEO API."""
+
+    headers = _dataforseo_headers(login, password)
+
     # Get location code for the geo
     location_code = _get_dataforseo_location_code(geo, headers)
 
     # DataForSEO SERP API endpoint
-    url = "https://api.dataforseo.com/v3/serp/google/organic/live/advanced"
+    url = http_client.api_url("dataforseo", "/v3/serp/google/organic/live/advanced")
 
     # Request payload
-    payload = [{
-        "keyword": f"{industry} near me",
-        "location_code": location_code,
-        "language_code": "en",
-        "device": "desktop",
-        "os": "windows"
-    }]
+    payload = [_dataforseo_task(industry, location_code)]
 
-    response = requests.post(url, json=payload, headers=headers, timeout=30)
+    rate_limit.acquire("dataforseo")
+    response = http_client.post(url, json=payload, headers=headers, timeout=30)
     response.raise_for_status()
     data = response.json()
 
@@ -82,11 +90,28 @@ def _dataforseo_serp_analysis(geo: str, industry: str, login: str, password: str
     if not tasks or not tasks[0].get("result"):
         raise Exception("No SERP results returned")
 
-    result = tasks[0]["result"][0]
+    return _score_dataforseo_result(tasks[0]["result"][0], geo, industry)
 
+
+def _dataforseo_task(industry: str, location_code: int, tag: str = None) -> Dict:
+    """Build one SERP task for an industry keyword."""
+    task = {
+        "keyword": f"{industry} near me",
+        "location_code": location_code,
+        "language_code": "en",
+        "device": "desktop",
+        "os": "windows"
+    }
+    if tag is not None:
+        task["tag"] = tag
+    return task
+
+
+def _score_dataforseo_result(result: Dict, geo: str, industry: str) -> float:
+    """Turn a DataForSEO SERP result into a demand score."""
     # Extract metrics
-    total_results = result.get("total_count", 0)
-    items = result.get("items", [])
+    total_results = result.get("total_count", 0) or 0
+    items = result.get("items") or []
 
     # Count ads and local results
     ads_count = sum(1 for item in items if item.get("type") == "paid")
@@ -102,9 +127,166 @@ def _dataforseo_serp_analysis(geo: str, industry: str, login: str, password: str
     return min(score, 1000)  # Cap at 1000
 
 
+def _dataforseo_batch_scores(pairs: List[Tuple[str, str]], login: str, password: str) -> Dict[Tuple[str, str], float]:
+    """Score many (geo, industry) pairs through DataForSEO's standard task queue.
+
+    Live SERP calls take a single task each, so bulk work goes through
+    task_post (up to DATAFORSEO_BATCH_SIZE tasks per request), then waits for
+    tasks_ready and collects each result with task_get. Slower to complete than
+    live mode, but far fewer requests up front and billed at the cheaper
+    standard-queue rate.
+
+    Args:
+        pairs: (geo, industry) pairs to score
+        login: DataForSEO login
+        password: DataForSEO password
+
+    Returns:
+        Scores for every pair that completed before DATAFORSEO_BATCH_TIMEOUT;
+        pairs that failed or timed out are left out for the caller to fall back on
+    """
+    headers = _dataforseo_headers(login, password)
+    base_url = http_client.api_url("dataforseo", "/v3/serp/google/organic")
+    batch_size = min(int(os.getenv("DATAFORSEO_BATCH_SIZE", "100")), 100)
+    timeout = float(os.getenv("DATAFORSEO_BATCH_TIMEOUT", "600"))
+    poll_interval = float(os.getenv("DATAFORSEO_POLL_INTERVAL", "10"))
+
+    tasks = []
+    for i, (geo, industry) in enumerate(pairs):
+        try:
+            location_code = _get_dataforseo_location_code(geo, headers)
+        except Exception as e:
+            print(f"  ⚠️  DataForSEO location error for {geo}: {e}")
+            continue
+        tasks.append(_dataforseo_task(industry, location_code, tag=str(i)))
+
+    # Submit: one POST per chunk of tasks
+    pending: Dict[str, Tuple[str, str]] = {}
+    for start in range(0, len(tasks), batch_size):
+        chunk = tasks[start:start + batch_size]
+        rate_limit.acquire("dataforseo")
+        response = http_client.post(f"{base_url}/task_post", json=chunk, headers=headers, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status_code") != 20000:
+            raise Exception(f"DataForSEO task_post error: {data.get('status_message')}")
+        for task in data.get("tasks", []):
+            if task.get("status_code") == 20100:  # Task Created
+                pending[task["id"]] = pairs[int(task["data"]["tag"])]
+            else:
+                print(f"  ⚠️  DataForSEO rejected task: {task.get('status_message')}")
+
+    print(f"  📤 DataForSEO: queued {len(pending)} SERP tasks in {-(-len(tasks) // batch_size)} request(s)")
+
+    # Collect: poll tasks_ready, then fetch each finished task
+    scores: Dict[Tuple[str, str], float] = {}
+    deadline = time.time() + timeout
+    while pending and time.time() < deadline:
+        rate_limit.acquire("dataforseo")
+        response = http_client.get(f"{base_url}/tasks_ready", headers=headers, timeout=30)
+        response.raise_for_status()
+        ready_tasks = response.json().get("tasks") or [{}]
+        ready_ids = [t["id"] for t in ready_tasks[0].get("result") or [] if t.get("id") in pending]
+
+        for task_id in ready_ids:
+            geo, industry = pending.pop(task_id)
+            try:
+                rate_limit.acquire("dataforseo")
+                response = http_client.get(f"{base_url}/task_get/advanced/{task_id}", headers=headers, timeout=30)
+                response.raise_for_status()
+                task = (response.json().get("tasks") or [{}])[0]
+                if task.get("status_code") != 20000 or not task.get("result"):
+                    raise Exception(task.get("status_message", "No SERP results returned"))
+                scores[(geo, industry)] = _score_dataforseo_result(task["result"][0], geo, industry)
+            except Exception as e:
+                print(f"  ⚠️  DataForSEO task_get error for {industry} in {geo}: {e}")
+
+        if pending:
+            time.sleep(poll_interval)
+
+    if pending:
+        print(f"  ⚠️  DataForSEO: {len(pending)} tasks not ready after {timeout:.0f}s")
+
+    return scores
+
+
+def _location_index_path() -> str:
+    return os.getenv("DATAFORSEO_LOCATIONS_PATH", "./cache/dataforseo_locations.json")
+
+
+def _load_location_index() -> Dict[str, Dict]:
+    """Load the on-disk geo -> DataForSEO location index (once per process)."""
+    global _location_index
+    if _location_index is None:
+        _location_index = {}
+        path = _location_index_path()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    _location_index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️  Could not read location index {path}: {e}")
+    return _location_index
+
+
+def _save_location_index():
+    path = _location_index_path()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_location_index, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  ⚠️  Could not save location index {path}: {e}")
+
+
+def preload_dataforseo_locations(login: str, password: str, country: str = "us") -> int:
+    """Fill the location index from DataForSEO's full locations list for a country.
+
+    Args:
+        login: DataForSEO login
+        password: DataForSEO password
+        country: ISO country code to load (e.g. "us")
+
+    Returns:
+        Number of city locations indexed
+    """
+    url = http_client.api_url("dataforseo", f"/v3/serp/google/locations/{country.lower()}")
+    rate_limit.acquire("dataforseo")
+    response = http_client.get(url, headers=_dataforseo_headers(login, password), timeout=60)
+    response.raise_for_status()
+    data = response.json()
+
+    if data.get("status_code") != 20000:
+        raise Exception(f"Location list failed: {data.get('status_message')}")
+
+    count = 0
+    with _location_lock:
+        index = _load_location_index()
+        for location in data["tasks"][0].get("result") or []:
+            if location.get("location_type") != "City":
+                continue
+            # "Houston,Texas,United States" -> "houston"
+            city_key = location["location_name"].split(",")[0].strip().lower()
+            # Keep the first entry per city name, matching the lazy lookup's "most relevant first"
+            index.setdefault(city_key, {
+                "location_code": location["location_code"],
+                "location_name": location["location_name"]
+            })
+            count += 1
+        _save_location_index()
+
+    print(f"  📍 Indexed {count} DataForSEO locations for {country.upper()}")
+    return count
+
+
 def _get_dataforseo_location_code(geo: str, headers: dict) -> int:
     """Get DataForSEO location code for a geography string.
 
+    Served from the persistent location index when possible; unknown cities are
+    looked up once and added to it.
+
     Args:
         geo: Geography string like "Houston, TX" or "Austin, Texas"
         headers: Auth headers for DataForSEO API
@@ -114,24 +296,34 @@ def _get_dataforseo_location_code(geo: str, headers: dict) -> int:
     """
     # Extract city name (first part before comma)
     city = geo.split(',')[0].strip()
+    city_key = city.lower()
 
-    url = "https://api.dataforseo.com/v3/serp/google/locations"
-    payload = [{"location_name": city}]
+    with _location_lock:
+        index = _load_location_index()
+        if city_key in index:
+            return index[city_key]["location_code"]
 
-    response = requests.post(url, json=payload, headers=headers, timeout=15)
-    response.raise_for_status()
-    data = response.json()
+        url = http_client.api_url("dataforseo", "/v3/serp/google/locations")
+        payload = [{"location_name": city}]
 
-    if data.get("status_code") != 20000:
-        raise Exception(f"Location lookup failed: {data.get('status_message')}")
+        rate_limit.acquire("dataforseo")
+        response = http_client.post(url, json=payload, headers=headers, timeout=15)
+        response.raise_for_status()
+        data = response.json()
 
-    results = data["tasks"][0].get("result", [])
-    if not results:
-        raise Exception(f"No location found for: {geo}")
+        if data.get("status_code") != 20000:
+            raise Exception(f"Location lookup failed: {data.get('status_message')}")
 
-    # Return first result (usually the most relevant)
-    location_code = results[0]["location_code"]
-    location_name = results[0]["location_name"]
+        results = data["tasks"][0].get("result", [])
+        if not results:
+            raise Exception(f"No location found for: {geo}")
+
+        # Return first result (usually the most relevant)
+        location_code = results[0]["location_code"]
+        location_name = results[0]["location_name"]
+
+        index[city_key] = {"location_code": location_code, "location_name": location_name}
+        _save_location_index()
 
     print(f"  📍 Using location: {location_name} (code: {location_code})")
 
@@ -149,9 +341,8 @@ def _serpapi_analysis(geo: str, industry: str, api_key: str) -> float:
         "num": 10
     }
 
-    response = requests.get("https://serpapi.com/search", params=params, timeout=15)
-    response.raise_for_status()
-    data = response.json()
+    data = cache.cached_get_json("serpapi", http_client.api_url("serpapi", "/search"), params=params, timeout=15,
+                                 cache_if=lambda d: "error" not in d, limiter="serpapi")
 
     # Extract demand signals
     total_results = data.get("search_information", {}).get("total_results", 0)
@@ -192,12 +383,67 @@ def discover_top_industries(geo: str, k: int = None) -> List[str]:
     if k <= 0:
         raise ValueError(f"k must be positive, got {k}")
 
-    scores: Dict[str, float] = {}
-    for ind in CANDIDATE_INDUSTRIES:
-        demand = _serp_volume_proxy(geo, ind)
-        penalty = _site_quality_penalty(geo, ind)
-        score = demand * penalty
-        scores[ind] = score
+    scores = _score_industries([geo])[geo]
 
     ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
     return [name for name, _ in ranked[:k]]
+
+
+def discover_top_industries_bulk(geos: List[str], k: int = None) -> Dict[str, List[str]]:
+    """Discover top industries for several geographies in one pass.
+
+    With DATAFORSEO_MODE=batch this queues every geo x industry SERP task
+    together, which is the cheap way to refresh rankings across many markets.
+
+    Args:
+        geos: Geography strings (e.g., ["Houston, TX", "Austin, TX"])
+        k: Number of industries per geo (defaults to MAX_INDUSTRIES env var)
+
+    Returns:
+        Mapping of geo to its ranked industry names
+    """
+    geos = [g for g in geos if g and g.strip()]
+    if not geos:
+        raise ValueError("geos must contain at least one non-empty geo")
+
+    k = k or int(os.getenv("MAX_INDUSTRIES", "5"))
+    if k <= 0:
+        raise ValueError(f"k must be positive, got {k}")
+
+    ranked = {}
+    for geo, scores in _score_industries(geos).items():
+        ordered = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        ranked[geo] = [name for name, _ in ordered[:k]]
+    return ranked
+
+
+def _score_industries(geos: List[str]) -> Dict[str, Dict[str, float]]:
+    """Score every candidate industry for each geo (demand x quality penalty)."""
+    demand: Dict[Tuple[str, str], float] = {}
+
+    # Batch mode: queue all SERP tasks at once; anything it misses falls back below
+    login = os.getenv("DATAFORSEO_LOGIN")
+    password = os.getenv("DATAFORSEO_PASSWORD")
+    if login and password and os.getenv("DATAFORSEO_MODE", "live").lower() == "batch":
+        pairs = [(geo, ind) for geo in geos for ind in CANDIDATE_INDUSTRIES]
+        try:
+            demand = _dataforseo_batch_scores(pairs, login, password)
+        except Exception as e:
+            print(f"  ⚠️  DataForSEO batch error: {e}, scoring industries one by one")
+
+    # Everything else is scored concurrently; each pair still walks its own
+    # DataForSEO -> SerpAPI -> stub chain, paced by the per-provider limiters
+    remaining = [(geo, ind) for geo in geos for ind in CANDIDATE_INDUSTRIES if (geo, ind) not in demand]
+    if remaining:
+        workers = max(1, int(os.getenv("DISCOVERY_WORKERS", "10")))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="discovery") as pool:
+            for pair, value in zip(remaining, pool.map(lambda p: _serp_volume_proxy(*p), remaining)):
+                demand[pair] = value
+
+    scores: Dict[str, Dict[str, float]] = {}
+    for geo in geos:
+        scores[geo] = {}
+        for ind in CANDIDATE_INDUSTRIES:
+            penalty = _site_quality_penalty(geo, ind)
+            scores[geo][ind] = demand[(geo, ind)] * penalty
+    return scores
@@ -1,11 +1,16 @@
 import os
+import time
 import requests
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from urllib.parse import urlparse
 
+from modules import cache, http_client, rate_limit, stubs
+
 # Stubs for lead enumeration (directories, SERPs, GBPs). Replace with real integrations.
 def _fake_directory_search(geo: str, industry: str, max_results: int) -> List[Dict]:
     """Generate fake business listings for testing."""
+    stubs.simulate_latency("places_search", geo, industry)
     seeds = []
     # Handle edge case where geo might not have comma
     city = geo.split(",")[0].strip() if "," in geo else geo.strip()
@@ -22,6 +27,152 @@ def _fake_directory_search(geo: str, industry: str, max_results: int) -> List[Di
     return seeds
 
 
+PLACES_TEXTSEARCH_PATH = "/maps/api/place/textsearch/json"
+PLACES_DETAILS_PATH = "/maps/api/place/details/json"
+PLACES_DETAILS_FIELDS = "name,website,formatted_phone_number,formatted_address"
+
+# Text Search returns at most 60 results: 3 pages of 20 (PLACES_MAX_PAGES raises it for mock load tests)
+MAX_TEXTSEARCH_PAGES = 3
+
+
+def _places_text_search(query: str, api_key: str, max_results: int) -> Tuple[str, List[Dict]]:
+    """Run a Places Text Search, following next_page_token until max_results.
+
+    The assembled result list is cached rather than single pages, since page
+    tokens expire and can't be replayed from the cache.
+
+    Returns:
+        (status of the first page, places found)
+    """
+    textsearch_url = http_client.api_url("google_places", PLACES_TEXTSEARCH_PATH)
+    cache_key = cache.make_key(textsearch_url, {"query": query})
+    cached = cache.get("places_textsearch", cache_key)
+    if cached and (cached["value"]["complete"] or len(cached["value"]["places"]) >= max_results):
+        cache.record_hit("places_textsearch")
+        return "OK", cached["value"]["places"][:max_results]
+    cache.record_miss("places_textsearch")
+
+    token_delay = float(os.getenv("PLACES_PAGE_TOKEN_DELAY", "2"))
+    params = {"query": query, "key": api_key}
+    places: List[Dict] = []
+    complete = False
+    status = None
+
+    for page in range(int(os.getenv("PLACES_MAX_PAGES", MAX_TEXTSEARCH_PAGES))):
+        # A fresh next_page_token isn't valid for a couple of seconds; until then
+        # Places answers INVALID_REQUEST, so retry a few times before giving up
+        for attempt in range(3):
+            rate_limit.acquire("google_places")
+            response = http_client.get(textsearch_url, params=params, timeout=15)
+            response.raise_for_status()
+            data = response.json()
+            if page == 0 or data.get("status") != "INVALID_REQUEST":
+                break
+            time.sleep(token_delay)
+
+        page_status = data.get("status")
+        if page == 0:
+            status = page_status
+            if page_status != "OK":
+                return status, []
+        elif page_status != "OK":
+            print(f"  ⚠️  Google Places page {page + 1} error: {page_status}, keeping {len(places)} results")
+            break
+
+        places.extend(data.get("results", []))
+        token = data.get("next_page_token")
+        if not token:
+            complete = True
+            break
+        if len(places) >= max_results:
+            break
+
+        time.sleep(token_delay)
+        params = {"pagetoken": token, "key": api_key}
+    else:
+        complete = True
+
+    cache.put("places_textsearch", cache_key, {"places": places, "complete": complete})
+    return status, places[:max_results]
+
+
+def _field_max_age(field: str) -> float:
+    """Max age in seconds before a stored Place Details field is re-queried."""
+    days = os.getenv(f"PLACE_DETAILS_MAX_AGE_DAYS_{field.upper()}", os.getenv("PLACE_DETAILS_MAX_AGE_DAYS", "30"))
+    return float(days) * cache.DAY
+
+
+def _place_details(place_id: str, api_key: str, fields: str = PLACES_DETAILS_FIELDS) -> Optional[Dict]:
+    """Get Place Details, only re-querying fields that are missing or stale.
+
+    Every field is stored per place_id with its own fetch time, so a repeat run
+    only pays for Details when something in the `fields` mask has aged past
+    PLACE_DETAILS_MAX_AGE_DAYS (PLACE_DETAILS_MAX_AGE_DAYS_<FIELD> per field),
+    and then asks for just those fields.
+
+    Returns:
+        Field name -> value for every requested field (None if Places has no
+        value), or None if the place could not be fetched
+    """
+    wanted = fields.split(",")
+    entry = cache.get("places_details", place_id)
+    stored = entry["value"] if entry else {}
+
+    now = time.time()
+    stale = [f for f in wanted if f not in stored or now - stored[f]["fetched_at"] > _field_max_age(f)]
+
+    if stale:
+        cache.record_miss("places_details")
+        details_params = {
+            "place_id": place_id,
+            "fields": ",".join(stale),
+            "key": api_key
+        }
+        rate_limit.acquire("google_places")
+        response = http_client.get(http_client.api_url("google_places", PLACES_DETAILS_PATH),
+                                   params=details_params, timeout=10)
+        response.raise_for_status()
+        details_data = response.json()
+
+        if details_data.get("status") != "OK":
+            return None
+
+        result = details_data.get("result", {})
+        for field in stale:
+            # Remember absent fields too (e.g. no website) so they aren't re-asked every run
+            stored[field] = {"value": result.get(field), "fetched_at": now}
+        cache.put("places_details", place_id, stored)
+    else:
+        cache.record_hit("places_details")
+
+    return {f: stored[f]["value"] for f in wanted}
+
+
+def _place_details_lead(place: Dict, api_key: str, geo: str) -> Optional[Dict]:
+    """Fetch Place Details for a Text Search result and turn it into a lead."""
+    place_id = place.get("place_id")
+
+    try:
+        # Get place details for website, phone, etc.
+        details = _place_details(place_id, api_key)
+        if details is None:
+            return None
+
+        return {
+            "name": details.get("name") or place.get("name", "Unknown"),
+            "website": details.get("website") or "",
+            "phone": details.get("formatted_phone_number") or "",
+            "address": details.get("formatted_address") or "",
+            "city": geo.split(",")[0].strip() if "," in geo else geo.strip(),
+            "email": "",  # Will be filled by Hunter.io
+            "place_id": place_id,
+            "source": "google_places"
+        }
+    except Exception as e:
+        print(f"  ⚠️  Error getting details for {place.get('name')}: {e}")
+        return None
+
+
 def _google_places_search(geo: str, industry: str, max_results: int) -> List[Dict]:
     """Find real businesses using Google Places API (with fallback to stub)."""
     api_key = os.getenv("GOOGLE_PLACES_API_KEY")
@@ -31,57 +182,20 @@ def _google_places_search(geo: str, industry: str, max_results: int) -> List[Dic
         return _fake_directory_search(geo, industry, max_results)
 
     try:
-        # Text search for businesses
-        url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-        params = {
-            "query": f"{industry} in {geo}",
-            "key": api_key
-        }
+        # Text search for businesses (paginated)
+        status, places = _places_text_search(f"{industry} in {geo}", api_key, max_results)
 
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-
-        if data.get("status") != "OK":
-            print(f"  ⚠️  Google Places API error: {data.get('status')}, using stub data")
+        if status != "OK":
+            print(f"  ⚠️  Google Places API error: {status}, using stub data")
             return _fake_directory_search(geo, industry, max_results)
 
-        leads = []
-        places = data.get("results", [])[:max_results]
-
         print(f"  🗺️  Google Places: Found {len(places)} businesses for {industry}")
 
-        for place in places:
-            place_id = place.get("place_id")
-
-            # Get place details for website, phone, etc.
-            details_url = "https://maps.googleapis.com/maps/api/place/details/json"
-            details_params = {
-                "place_id": place_id,
-                "fields": "name,website,formatted_phone_number,formatted_address",
-                "key": api_key
-            }
-
-            try:
-                details_response = requests.get(details_url, params=details_params, timeout=10)
-                details_response.raise_for_status()
-                details_data = details_response.json()
-
-                if details_data.get("status") == "OK":
-                    details = details_data.get("result", {})
-
-                    leads.append({
-                        "name": details.get("name", place.get("name", "Unknown")),
-                        "website": details.get("website", ""),
-                        "phone": details.get("formatted_phone_number", ""),
-                        "address": details.get("formatted_address", ""),
-                        "city": geo.split(",")[0].strip() if "," in geo else geo.strip(),
-                        "email": "",  # Will be filled by Hunter.io
-                        "source": "google_places"
-                    })
-            except Exception as e:
-                print(f"  ⚠️  Error getting details for {place.get('name')}: {e}")
-                continue
+        # Place Details concurrently; map() keeps the search ranking order
+        workers = max(1, int(os.getenv("PLACES_DETAILS_WORKERS", "8")))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="places") as pool:
+            details = pool.map(lambda place: _place_details_lead(place, api_key, geo), places)
+            leads = [lead for lead in details if lead is not None]
 
         if not leads:
             print(f"  ⚠️  No leads found via Google Places, using stub data")
@@ -105,16 +219,14 @@ def _find_email_hunter(domain: str, company_name: str) -> str:
         return ""
 
     try:
-        url = "https://api.hunter.io/v2/domain-search"
+        url = http_client.api_url("hunter", "/v2/domain-search")
         params = {
             "domain": domain,
             "api_key": api_key,
             "limit": 1
         }
 
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = cache.cached_get_json("hunter", url, params=params, timeout=10)
 
         emails = data.get("data", {}).get("emails", [])
         if emails:
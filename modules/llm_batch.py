@@ -0,0 +1,429 @@
+"""
+LLM Batch Mode
+Runs the LLM stage through a provider batch API instead of live calls
+(LLM_MODE=batch): roughly half the price and outside the per-minute budgets,
+at the cost of results arriving minutes to hours later, which suits the weekly
+scheduled run.
+
+Every qualifying lead's request is written as one {"custom_id", "params"} line
+of a JSONL batch file under LLM_BATCH_DIR and submitted; custom_id is the
+lead's llm_analysis cache key. The stage then polls for up to LLM_BATCH_WAIT
+seconds. Finished results go into the analysis cache and fill the rows right
+away if the batch ends in time. Rows whose analysis is still pending are held
+back in LLM_BATCH_DIR/held_rows.json instead of being written with a
+placeholder, and release_rows() hands them back, filled in, once their batch
+has ended (on the next batch-mode run or `python main.py --collect-batch`).
+Submitted batches are tracked in LLM_BATCH_DIR/pending.json and their
+requests are never resubmitted.
+
+Backends (LLM_BATCH_PROVIDER): "anthropic" (Message Batches API), "openai"
+(Batch API) or "local", a file-based stand-in answering from modules/stubs.py
+so the whole flow runs offline. The default is the first provider with a key.
+"""
+
+import os
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from modules import cache, http_client, llm_seo_analyzer, stubs
+except ImportError:
+    import cache
+    import http_client
+    import llm_seo_analyzer
+    import stubs
+
+NAMESPACE = "llm_analysis"
+LOCAL_MODEL = "local-stub"
+
+
+def _batch_dir() -> str:
+    return os.getenv("LLM_BATCH_DIR", "./cache/llm_batches")
+
+
+def _read_lines(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class AnthropicBatches:
+    """Anthropic Message Batches API."""
+
+    wire_format = "anthropic"
+
+    @property
+    def model(self) -> str:
+        return llm_seo_analyzer.model_for("anthropic")
+
+    def submit(self, path: str) -> str:
+        response = http_client.post(
+            http_client.api_url("anthropic", "/v1/messages/batches"),
+            headers=llm_seo_analyzer.auth_headers("anthropic"),
+            json={"requests": _read_lines(path)},
+            timeout=300
+        )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def _batch(self, batch_id: str) -> Dict:
+        response = http_client.get(
+            http_client.api_url("anthropic", f"/v1/messages/batches/{batch_id}"),
+            headers=llm_seo_analyzer.auth_headers("anthropic"),
+            timeout=30
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def status(self, batch_id: str) -> str:
+        # Canceled and expired batches also end with processing_status "ended"
+        return "ended" if self._batch(batch_id).get("processing_status") == "ended" else "pending"
+
+    def results(self, batch_id: str) -> Dict[str, Optional[str]]:
+        response = http_client.get(self._batch(batch_id)["results_url"],
+                                   headers=llm_seo_analyzer.auth_headers("anthropic"), timeout=300, stream=True)
+        response.raise_for_status()
+        results = {}
+        for line in response.iter_lines():
+            if not line:
+                continue
+            item = json.loads(line)
+            result = item.get("result") or {}
+            if result.get("type") == "succeeded":
+                llm_seo_analyzer.record_usage("anthropic", result["message"].get("usage") or {})
+                results[item["custom_id"]] = llm_seo_analyzer.response_text("anthropic", result["message"])
+            else:
+                results[item["custom_id"]] = None
+        return results
+
+
+class OpenAIBatches:
+    """OpenAI Batch API (JSONL upload to /files, then /batches)."""
+
+    wire_format = "openai"
+
+    @property
+    def model(self) -> str:
+        return llm_seo_analyzer.model_for("openai")
+
+    def submit(self, path: str) -> str:
+        lines = [json.dumps({"custom_id": item["custom_id"], "method": "POST",
+                             "url": "/v1/chat/completions", "body": item["params"]})
+                 for item in _read_lines(path)]
+        upload = http_client.post(
+            http_client.api_url("openai", "/files"),
+            headers={"Authorization": llm_seo_analyzer.auth_headers("openai")["Authorization"]},
+            data={"purpose": "batch"},
+            files={"file": (os.path.basename(path), "\n".join(lines).encode("utf-8"))},
+            timeout=300
+        )
+        upload.raise_for_status()
+        response = http_client.post(
+            http_client.api_url("openai", "/batches"),
+            headers=llm_seo_analyzer.auth_headers("openai"),
+            json={"input_file_id": upload.json()["id"], "endpoint": "/v1/chat/completions",
+                  "completion_window": "24h"},
+            timeout=60
+        )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def _batch(self, batch_id: str) -> Dict:
+        response = http_client.get(http_client.api_url("openai", f"/batches/{batch_id}"),
+                                   headers=llm_seo_analyzer.auth_headers("openai"), timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def status(self, batch_id: str) -> str:
+        status = self._batch(batch_id).get("status")
+        if status == "failed":
+            return "failed"
+        # Expired and cancelled batches keep whatever finished in their output file
+        return "ended" if status in ("completed", "expired", "cancelled") else "pending"
+
+    def results(self, batch_id: str) -> Dict[str, Optional[str]]:
+        output_file_id = self._batch(batch_id).get("output_file_id")
+        if not output_file_id:
+            return {}
+        response = http_client.get(http_client.api_url("openai", f"/files/{output_file_id}/content"),
+                                   headers=llm_seo_analyzer.auth_headers("openai"), timeout=300, stream=True)
+        response.raise_for_status()
+        results = {}
+        for line in response.iter_lines():
+            if not line:
+                continue
+            item = json.loads(line)
+            reply = item.get("response") or {}
+            if reply.get("status_code") == 200:
+                body = reply.get("body") or {}
+                llm_seo_analyzer.record_usage("openai", body.get("usage") or {})
+                results[item["custom_id"]] = llm_seo_analyzer.response_text("openai", body)
+            else:
+                results[item["custom_id"]] = None
+        return results
+
+
+class LocalBatches:
+    """File-based stand-in: a batch ends LLM_LOCAL_BATCH_DELAY seconds after submission."""
+
+    wire_format = "anthropic"
+    model = LOCAL_MODEL
+
+    def _record_path(self, batch_id: str) -> str:
+        return os.path.join(_batch_dir(), "local", f"{batch_id}.json")
+
+    def submit(self, path: str) -> str:
+        batch_id = f"local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.dirname(self._record_path(batch_id)), exist_ok=True)
+        with open(self._record_path(batch_id), "w", encoding="utf-8") as f:
+            json.dump({"path": path, "submitted_at": time.time()}, f)
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        with open(self._record_path(batch_id), "r", encoding="utf-8") as f:
+            submitted_at = json.load(f)["submitted_at"]
+        delay = float(os.getenv("LLM_LOCAL_BATCH_DELAY", "0"))
+        return "ended" if time.time() - submitted_at >= delay else "pending"
+
+    def results(self, batch_id: str) -> Dict[str, Optional[str]]:
+        with open(self._record_path(batch_id), "r", encoding="utf-8") as f:
+            path = json.load(f)["path"]
+        return {item["custom_id"]: json.dumps(stubs.llm_analysis(item["custom_id"])) for item in _read_lines(path)}
+
+
+BACKENDS = {
+    "anthropic": AnthropicBatches,
+    "openai": OpenAIBatches,
+    "local": LocalBatches,
+}
+
+
+def _provider() -> Optional[str]:
+    provider = os.getenv("LLM_BATCH_PROVIDER", "").lower()
+    if provider:
+        return provider if provider in BACKENDS else None
+    configured = llm_seo_analyzer.configured_providers()
+    return configured[0] if configured else None
+
+
+def _pending_path() -> str:
+    return os.path.join(_batch_dir(), "pending.json")
+
+
+def _load_pending() -> Dict[str, Dict]:
+    try:
+        with open(_pending_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_pending(pending: Dict[str, Dict]):
+    os.makedirs(_batch_dir(), exist_ok=True)
+    tmp_path = _pending_path() + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pending, f, indent=2)
+    os.replace(tmp_path, _pending_path())
+
+
+def _held_path() -> str:
+    return os.path.join(_batch_dir(), "held_rows.json")
+
+
+def _load_held() -> List[Dict]:
+    try:
+        with open(_held_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _save_held(held: List[Dict]):
+    os.makedirs(_batch_dir(), exist_ok=True)
+    tmp_path = _held_path() + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(held, f, indent=2)
+    os.replace(tmp_path, _held_path())
+
+
+def release_rows() -> List[Tuple[Dict, Dict]]:
+    """Held rows whose batch has ended, removed from the hold.
+
+    Returns:
+        (row, llm_* fields) per released row; the fields say "Could not
+        analyze" when the request failed
+    """
+    held = _load_held()
+    if not held:
+        return []
+    still_pending = pending_ids()
+    released, kept = [], []
+    for item in held:
+        if item["key"] in still_pending:
+            kept.append(item)
+            continue
+        entry = cache.get(NAMESPACE, item["key"])
+        fields = (llm_seo_analyzer.analysis_fields(entry["value"]) if entry is not None
+                  else llm_seo_analyzer.unanalyzed("Could not analyze"))
+        released.append((item["row"], fields))
+    if released:
+        _save_held(kept)
+    return released
+
+
+def pending_ids() -> set:
+    """custom_ids (analysis cache keys) of every submitted, uncollected request."""
+    return {cid for batch in _load_pending().values() for cid in batch["custom_ids"]}
+
+
+def collect() -> Dict[str, int]:
+    """Store the results of every finished pending batch in the analysis cache.
+
+    Returns:
+        Counts of analyses collected, failed requests and batches still pending
+    """
+    pending = _load_pending()
+    counts = {"collected": 0, "failed": 0, "pending_batches": 0}
+    for batch_id, batch in list(pending.items()):
+        backend = BACKENDS[batch["provider"]]()
+        try:
+            status = backend.status(batch_id)
+            if status == "pending":
+                counts["pending_batches"] += 1
+                continue
+            results = backend.results(batch_id) if status == "ended" else {}
+        except Exception as e:
+            print(f"  ⚠️  Could not check LLM batch {batch_id}: {e}")
+            counts["pending_batches"] += 1
+            continue
+
+        for custom_id in batch["custom_ids"]:
+            text = results.get(custom_id)
+            try:
+                result = llm_seo_analyzer.parse_analysis(text) if text else None
+            except ValueError:
+                result = None
+            if isinstance(result, dict):
+                cache.put(NAMESPACE, custom_id, result, meta={"model": batch["model"], "batch_id": batch_id,
+                                                              "prompt_version": llm_seo_analyzer.PROMPT_VERSION})
+                counts["collected"] += 1
+            else:
+                counts["failed"] += 1
+        # Failed requests aren't cached, so the next run submits them again
+        del pending[batch_id]
+        print(f"  📦 LLM batch {batch_id} ({batch['provider']}) {status}")
+
+    if counts["collected"] or counts["failed"]:
+        _save_pending(pending)
+    return counts
+
+
+def _submit(backend, provider: str, lines: List[Dict]) -> List[str]:
+    """Write lines to JSONL batch files (LLM_BATCH_MAX_REQUESTS per batch) and submit them."""
+    os.makedirs(_batch_dir(), exist_ok=True)
+    max_requests = int(os.getenv("LLM_BATCH_MAX_REQUESTS", "10000"))
+    pending = _load_pending()
+    submitted = []
+    for start in range(0, len(lines), max_requests):
+        chunk = lines[start:start + max_requests]
+        path = os.path.join(_batch_dir(), f"{time.strftime('%Y%m%d_%H%M%S')}_{provider}_{start // max_requests}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for line in chunk:
+                f.write(json.dumps(line) + "\n")
+        try:
+            batch_id = backend.submit(path)
+        except Exception as e:
+            print(f"  ⚠️  LLM batch submission failed ({provider}): {e}")
+            continue
+        pending[batch_id] = {"provider": provider, "model": backend.model, "path": path,
+                             "submitted_at": time.time(), "custom_ids": [line["custom_id"] for line in chunk]}
+        submitted.append(batch_id)
+    _save_pending(pending)
+    return submitted
+
+
+def analyze_batch(targets: List[Tuple[str, str, str]],
+                  held_rows: Optional[List[List[Dict]]] = None) -> List[Optional[Dict]]:
+    """Batch-mode counterpart of analyze_website_with_llm for many leads at once.
+
+    Args:
+        targets: (website, business_name, industry) per lead
+        held_rows: Output rows per target; the rows of targets whose batch
+            hasn't finished are held back until release_rows() returns them
+
+    Returns:
+        llm_* fields per target, in order. Targets whose batch hasn't
+        finished get None when their rows were held, placeholder fields
+        otherwise
+    """
+    provider = _provider()
+    if provider is None:
+        return [llm_seo_analyzer.unanalyzed("No LLM configured") for _ in targets]
+    backend = BACKENDS[provider]()
+
+    # Finished batches from earlier runs land in the cache before anything is looked up
+    collect()
+
+    # Pages are usually still in the run's page cache from the audits
+    workers = int(os.getenv("LLM_WORKERS", "8"))
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="llm") as pool:
+        contents = list(pool.map(lambda target: llm_seo_analyzer.extract_page_content(target[0]), targets))
+
+    keys: List[Optional[str]] = []
+    lines: Dict[str, Dict] = {}
+    already_pending = pending_ids()
+    cached = 0
+    for (website, business_name, industry), content in zip(targets, contents):
+        if not content:
+            keys.append(None)
+            continue
+        key = llm_seo_analyzer.analysis_cache_key(backend.model, content, business_name, industry)
+        keys.append(key)
+        if cache.get(NAMESPACE, key) is not None:
+            cache.record_hit(NAMESPACE)
+            cached += 1
+        elif key not in already_pending and key not in lines:
+            cache.record_miss(NAMESPACE)
+            params = llm_seo_analyzer.build_payload(backend.wire_format, content, website, business_name, industry)
+            params["model"] = backend.model
+            lines[key] = {"custom_id": key, "params": params}
+
+    print(f"📦 LLM batch ({provider}): {cached} cached, {len(lines)} to submit, "
+          f"{sum(1 for k in keys if k in already_pending)} awaiting earlier batches")
+    if lines:
+        submitted = _submit(backend, provider, list(lines.values()))
+        if submitted:
+            print(f"  📦 Submitted {', '.join(submitted)}")
+
+    # Wait for our requests, collecting into the cache as batches end
+    outstanding = {k for k in keys if k is not None} & pending_ids()
+    deadline = time.monotonic() + float(os.getenv("LLM_BATCH_WAIT", "1800"))
+    poll = float(os.getenv("LLM_BATCH_POLL", "30"))
+    while outstanding:
+        collect()
+        outstanding &= pending_ids()
+        if not outstanding or time.monotonic() + poll > deadline:
+            break
+        time.sleep(poll)
+    if outstanding:
+        print(f"  ⏳ {len(outstanding)} analyses still pending; their rows are saved once a later run "
+              f"(or --collect-batch) collects them")
+
+    still_pending = pending_ids()
+    results, hold = [], []
+    for index, key in enumerate(keys):
+        entry = cache.get(NAMESPACE, key) if key else None
+        if entry is not None:
+            results.append(llm_seo_analyzer.analysis_fields(entry["value"]))
+        elif key in still_pending and held_rows is not None:
+            hold.extend({"key": key, "row": row} for row in held_rows[index])
+            results.append(None)
+        elif key in still_pending:
+            results.append(llm_seo_analyzer.unanalyzed("Analysis pending (batch)"))
+        else:
+            results.append(llm_seo_analyzer.unanalyzed("Could not analyze"))
+    if hold:
+        _save_held(_load_held() + hold)
+    return results
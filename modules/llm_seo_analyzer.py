@@ -1,74 +1,187 @@
 """
 LLM-Powered SEO Analysis
 Replaces expensive Ahrefs with AI-powered content analysis using Claude or GPT-4.
+
+Analyses are cached (namespace "llm_analysis") under a hash of the model,
+PROMPT_VERSION and the exact prompt inputs, so a site whose extracted content
+hasn't changed since the last run is never sent to the LLM again.
+
+Calls are safe to run concurrently (main.py's LLM stage does): each one waits
+for its provider's requests/minute and tokens/minute budget in rate_limit, and
+a 429 pauses every caller for the provider's retry-after.
 """
 
 import os
 import json
+import time
+import hashlib
+import threading
+import email.utils
 import requests
-from typing import Dict, Optional
-from bs4 import BeautifulSoup
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+try:
+    from modules import cache, content_distill, html_signals, http_client, page_fetch, rate_limit
+except ImportError:
+    # Allow running this file directly (see __main__ below)
+    import cache
+    import content_distill
+    import html_signals
+    import http_client
+    import page_fetch
+    import rate_limit
+
+# Model per provider, overridden with ANTHROPIC_MODEL / OPENAI_MODEL
+DEFAULT_MODELS = {"anthropic": "claude-3-haiku-20240307", "openai": "gpt-3.5-turbo"}
+MODEL_ENV = {"anthropic": "ANTHROPIC_MODEL", "openai": "OPENAI_MODEL"}
+
+# Bump whenever a prompt below changes so analyses cached from the old prompt are not reused
+PROMPT_VERSION = "2"
+
+MAX_OUTPUT_TOKENS = 2048
+
+# Token usage per provider for the current run (see record_usage)
+_usage: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_usage_lock = threading.Lock()
+
+
+def model_for(provider: str) -> str:
+    """Model used for a provider's analyses."""
+    return os.getenv(MODEL_ENV[provider], DEFAULT_MODELS[provider])
+
 
+def extract_page_content(url: str) -> Optional[str]:
+    """Title, meta description and the page's most informative text within the token budget.
 
-def _extract_page_content(url: str) -> Optional[str]:
-    """Extract text content from a webpage."""
+    Shares the run's fetch and HTML parse with seo_checks; see content_distill
+    for how blocks are ranked and packed into LLM_CONTENT_TOKEN_BUDGET.
+    """
     try:
-        response = requests.get(url, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (compatible; SEOBot/1.0)"
-        })
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer"]):
-            script.decompose()
-        
-        # Get text
-        text = soup.get_text()
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Get meta info
-        title = soup.find('title')
-        title_text = title.string if title else "No title"
-        
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        desc_text = meta_desc.get('content', 'No description') if meta_desc else 'No description'
-        
-        # Limit content length (LLMs have token limits)
-        content_preview = text[:3000] if len(text) > 3000 else text
-        
+        page = page_fetch.fetch_page(url, timeout=10)
+        distilled = content_distill.distill(html_signals.extract_page_signals(page))
+
         return f"""
-TITLE: {title_text}
-META DESCRIPTION: {desc_text}
-CONTENT PREVIEW: {content_preview}
+TITLE: {distilled['title'] or 'No title'}
+META DESCRIPTION: {distilled['meta_description'] or 'No description'}
+KEY CONTENT:
+{distilled['content']}
 """
     except Exception as e:
         print(f"    ⚠️  Error extracting content from {url}: {e}")
         return None
 
 
-def _analyze_with_claude(content: str, url: str, business_name: str = "", industry: str = "") -> Optional[Dict]:
-    """Analyze website content using Claude API for sales intelligence."""
-    api_key = os.getenv("ANTHROPIC_API_KEY")
+def _retry_after(response: requests.Response, default: float = 30.0) -> float:
+    """Seconds the provider asked us to wait (retry-after-ms, retry-after seconds or HTTP date)."""
+    try:
+        if response.headers.get("retry-after-ms"):
+            return float(response.headers["retry-after-ms"]) / 1000
+        value = response.headers.get("retry-after")
+        if value:
+            if value.replace(".", "", 1).isdigit():
+                return float(value)
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return default
+
+
+def record_usage(provider: str, usage: Dict) -> Dict[str, int]:
+    """Add one response's usage to the run totals, split into uncached input, cache reads/writes and output."""
+    if provider == "anthropic":
+        split = {
+            "input": usage.get("input_tokens") or 0,
+            "cache_read": usage.get("cache_read_input_tokens") or 0,
+            "cache_write": usage.get("cache_creation_input_tokens") or 0,
+            "output": usage.get("output_tokens") or 0,
+        }
+    else:
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        split = {
+            "input": (usage.get("prompt_tokens") or 0) - cached,
+            "cache_read": cached,
+            "cache_write": 0,
+            "output": usage.get("completion_tokens") or 0,
+        }
+    with _usage_lock:
+        totals = _usage[provider]
+        totals["responses"] += 1
+        for name, tokens in split.items():
+            totals[name] += tokens
+    return split
 
-    if not api_key:
-        return None
 
-    try:
-        prompt = f"""You are an expert SEO consultant analyzing a local business website to create a sales pitch.
+def usage_stats() -> Dict[str, Dict[str, int]]:
+    """Token totals per provider for the current run."""
+    with _usage_lock:
+        return {provider: dict(totals) for provider, totals in _usage.items()}
 
-Business: {business_name}
-Industry: {industry}
-Website: {url}
 
-{content}
+def reset_usage():
+    with _usage_lock:
+        _usage.clear()
+
 
-Analyze this website and provide a JSON response with the following fields:
+def report_usage():
+    """Print the run's LLM token usage with its cached/uncached input split."""
+    for provider, totals in sorted(usage_stats().items()):
+        prompt = totals["input"] + totals["cache_read"] + totals["cache_write"]
+        cached = f"{totals['cache_read'] / prompt:.0%}" if prompt else "n/a"
+        print(f"🤖 LLM tokens ({provider}): {totals['responses']} responses | input {prompt} "
+              f"({totals['cache_read']} cache reads, {totals['cache_write']} cache writes, "
+              f"{totals['input']} uncached; {cached} from cache) | output {totals['output']}")
+
+
+def _post_llm(provider: str, url: str, headers: Dict, payload: Dict) -> requests.Response:
+    """POST an LLM request inside the provider's request and token budgets.
+
+    The estimate (prompt plus max_tokens, as the providers count it up front)
+    is charged before sending and the unused part refunded from the response's
+    usage, which is also added to the run's token accounting. 429s come
+    straight back from the HTTP client (this loop is the only layer retrying
+    them): each one refunds its charge, pauses the provider for everyone and
+    is retried, up to LLM_MAX_ATTEMPTS times (default 4).
+    """
+    max_attempts = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+    estimate = (content_distill.estimate_tokens(json.dumps([payload.get("system"), payload["messages"]]))
+                + payload.get("max_tokens", MAX_OUTPUT_TOKENS))
+    for attempt in range(max_attempts):
+        rate_limit.acquire(provider)
+        rate_limit.acquire_tokens(provider, estimate)
+        response = http_client.post(url, headers=headers, json=payload, timeout=45, retry_429=False)
+        if response.status_code != 429:
+            break
+        # A rejected request used none of its tokens; don't let it drain the shared budget
+        rate_limit.refund_tokens(provider, estimate)
+        wait = _retry_after(response)
+        print(f"    ⏳ {provider}: rate limited, pausing {wait:.0f}s (attempt {attempt + 1}/{max_attempts})")
+        rate_limit.pause(provider, wait)
+
+    if response.ok:
+        try:
+            usage = response.json().get("usage")
+        except ValueError:
+            usage = None
+        if usage:
+            split = record_usage(provider, usage)
+            # Anthropic doesn't count cache reads against input tokens/minute; OpenAI does
+            used = split["input"] + split["cache_write"] + split["output"]
+            if provider != "anthropic":
+                used += split["cache_read"]
+            rate_limit.refund_tokens(provider, estimate - used)
+    return response
+
+
+# Fixed instructions, identical for every lead, sent ahead of the per-lead message so
+# providers can reuse the processed prefix. Claude's block is marked cache_control, but
+# caching is best-effort: Anthropic only caches a prefix that reaches the model's minimum
+# (1024 tokens, 2048 for Haiku). These instructions are shorter than that, so the marker
+# is a no-op until the model and prefix size qualify; it costs nothing when they don't.
+# OpenAI caches prefixes of 1024+ tokens automatically.
+CLAUDE_INSTRUCTIONS = """You are an expert SEO consultant analyzing a local business website to create a sales pitch.
+
+Each message gives you the business, its industry, its website and the content extracted from that website. Analyze the website and provide a JSON response with the following fields:
 
 1. "seo_score" (0-100): Overall SEO quality score
 2. "critical_issues" (array of strings): Top 3-5 SPECIFIC technical issues (e.g., "22 second load time on mobile", "Missing local business schema markup")
@@ -85,40 +198,111 @@ Analyze this website and provide a JSON response with the following fields:
 
 Be SPECIFIC with numbers, examples, and actionable insights. Think like a sales consultant, not just an SEO auditor."""
 
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json"
-            },
-            json={
-                "model": "claude-3-haiku-20240307",
-                "max_tokens": 2048,
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ]
-            },
-            timeout=45
-        )
+OPENAI_INSTRUCTIONS = """You are an SEO sales consultant. Always respond with valid JSON.
 
-        response.raise_for_status()
-        data = response.json()
+Each message gives you a local business, its industry, its website and the content extracted from that website. Analyze the website and provide a JSON response with the following fields:
+
+1. "seo_score" (0-100): Overall SEO quality score
+2. "critical_issues" (array of strings): Top 3-5 SPECIFIC technical issues
+3. "revenue_impact" (string): Estimated monthly revenue loss from these issues
+4. "opportunities" (array of strings): Top 3-5 specific improvements with business impact
+5. "services_offered" (array of strings): What services does this business offer?
+6. "unique_selling_proposition" (string): What makes them different?
+7. "call_to_action_quality" (string): "Strong", "Weak", or "Missing"
+8. "target_keywords" (array of strings): What keywords are they targeting?
+9. "missing_keywords" (array of strings): Important local keywords they're missing
+10. "content_quality" (string): Brief assessment
+11. "quick_wins" (array of strings): 3-4 things we can fix in first 2 weeks
+12. "pitch_angle" (string): Best angle to approach them
+
+Be SPECIFIC with numbers and actionable insights."""
+
+
+def _lead_message(content: str, url: str, business_name: str = "", industry: str = "") -> str:
+    """The per-lead part of the prompt, appended after the shared instructions."""
+    return f"""Business: {business_name}
+Industry: {industry}
+Website: {url}
+
+{content}
+
+Analyze this website and respond with the JSON described above."""
+
+
+def auth_headers(provider: str) -> Dict:
+    """Request headers (with credentials) for a provider's API."""
+    if provider == "anthropic":
+        return {
+            "x-api-key": os.getenv("ANTHROPIC_API_KEY", ""),
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        }
+    return {
+        "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}",
+        "Content-Type": "application/json"
+    }
+
+
+def build_payload(provider: str, content: str, url: str, business_name: str = "", industry: str = "") -> Dict:
+    """Request body for one analysis (also the params of a batch request, see llm_batch)."""
+    if provider == "anthropic":
+        return {
+            "model": model_for("anthropic"),
+            "max_tokens": MAX_OUTPUT_TOKENS,
+            "system": [
+                {"type": "text", "text": CLAUDE_INSTRUCTIONS, "cache_control": {"type": "ephemeral"}}
+            ],
+            "messages": [
+                {"role": "user", "content": _lead_message(content, url, business_name, industry)}
+            ]
+        }
+    return {
+        "model": model_for("openai"),
+        "messages": [
+            {"role": "system", "content": OPENAI_INSTRUCTIONS},
+            {"role": "user", "content": _lead_message(content, url, business_name, industry)}
+        ],
+        "temperature": 0.3,
+        "max_tokens": MAX_OUTPUT_TOKENS
+    }
 
-        # Extract the text content
-        content_text = data.get("content", [{}])[0].get("text", "{}")
 
-        # Parse JSON from response
-        content_text = content_text.strip()
-        if content_text.startswith("```json"):
-            content_text = content_text[7:]
-        if content_text.startswith("```"):
-            content_text = content_text[3:]
-        if content_text.endswith("```"):
-            content_text = content_text[:-3]
-        content_text = content_text.strip()
+def response_text(provider: str, data: Dict) -> str:
+    """The model's reply from a Messages (anthropic) or Chat Completions (openai) response body."""
+    if provider == "anthropic":
+        return data.get("content", [{}])[0].get("text", "{}")
+    return data.get("choices", [{}])[0].get("message", {}).get("content", "{}")
 
-        result = json.loads(content_text)
+
+def parse_analysis(content_text: str) -> Dict:
+    """Decode the model's JSON reply, tolerating a ```json fence around it."""
+    content_text = content_text.strip()
+    if content_text.startswith("```json"):
+        content_text = content_text[7:]
+    if content_text.startswith("```"):
+        content_text = content_text[3:]
+    if content_text.endswith("```"):
+        content_text = content_text[:-3]
+    content_text = content_text.strip()
+
+    return json.loads(content_text)
+
+
+def _analyze_with_claude(content: str, url: str, business_name: str = "", industry: str = "") -> Optional[Dict]:
+    """Analyze website content using Claude API for sales intelligence."""
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        return None
+
+    try:
+        response = _post_llm(
+            "anthropic",
+            http_client.api_url("anthropic", "/v1/messages"),
+            headers=auth_headers("anthropic"),
+            payload=build_payload("anthropic", content, url, business_name, industry)
+        )
+
+        response.raise_for_status()
+        result = parse_analysis(response_text("anthropic", response.json()))
 
         print(f"    🤖 Claude: SEO Score={result.get('seo_score')}/100, Revenue Impact={result.get('revenue_impact', 'N/A')}")
 
@@ -131,80 +315,91 @@ Be SPECIFIC with numbers, examples, and actionable insights. Think like a sales
 
 def _analyze_with_openai(content: str, url: str, business_name: str = "", industry: str = "") -> Optional[Dict]:
     """Analyze website content using OpenAI GPT API for sales intelligence."""
-    api_key = os.getenv("OPENAI_API_KEY")
-
-    if not api_key:
+    if not os.getenv("OPENAI_API_KEY"):
         return None
 
     try:
-        prompt = f"""You are an expert SEO consultant analyzing a local business website to create a sales pitch.
+        response = _post_llm(
+            "openai",
+            http_client.api_url("openai", "/chat/completions"),
+            headers=auth_headers("openai"),
+            payload=build_payload("openai", content, url, business_name, industry)
+        )
 
-Business: {business_name}
-Industry: {industry}
-Website: {url}
+        response.raise_for_status()
+        result = parse_analysis(response_text("openai", response.json()))
 
-{content}
+        print(f"    🤖 GPT: SEO Score={result.get('seo_score')}/100")
 
-Analyze this website and provide a JSON response with the following fields:
+        return result
 
-1. "seo_score" (0-100): Overall SEO quality score
-2. "critical_issues" (array of strings): Top 3-5 SPECIFIC technical issues
-3. "revenue_impact" (string): Estimated monthly revenue loss from these issues
-4. "opportunities" (array of strings): Top 3-5 specific improvements with business impact
-5. "services_offered" (array of strings): What services does this business offer?
-6. "unique_selling_proposition" (string): What makes them different?
-7. "call_to_action_quality" (string): "Strong", "Weak", or "Missing"
-8. "target_keywords" (array of strings): What keywords are they targeting?
-9. "missing_keywords" (array of strings): Important local keywords they're missing
-10. "content_quality" (string): Brief assessment
-11. "quick_wins" (array of strings): 3-4 things we can fix in first 2 weeks
-12. "pitch_angle" (string): Best angle to approach them
+    except Exception as e:
+        print(f"    ⚠️  OpenAI API error: {e}")
+        return None
 
-Be SPECIFIC with numbers and actionable insights."""
 
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "gpt-3.5-turbo",
-                "messages": [
-                    {"role": "system", "content": "You are an SEO sales consultant. Always respond with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.3,
-                "max_tokens": 2048
-            },
-            timeout=45
-        )
+def analysis_cache_key(model: str, content: str, business_name: str = "", industry: str = "") -> str:
+    """Cache key for one analysis: sha256 of the model, prompt version and prompt inputs."""
+    material = json.dumps([model, PROMPT_VERSION, content, business_name, industry])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
 
-        response.raise_for_status()
-        data = response.json()
 
-        # Extract the text content
-        content_text = data.get("choices", [{}])[0].get("message", {}).get("content", "{}")
+def _cached_analysis(analyze: Callable, model: str, content: str, url: str,
+                     business_name: str = "", industry: str = "") -> Optional[Dict]:
+    """Run one provider's analysis unless the same model already answered this exact input."""
+    key = analysis_cache_key(model, content, business_name, industry)
+    entry = cache.get("llm_analysis", key)
+    if entry is not None:
+        cache.record_hit("llm_analysis")
+        print(f"    🤖 LLM: Unchanged content, reusing cached {model} analysis")
+        return entry["value"]
 
-        # Parse JSON from response
-        content_text = content_text.strip()
-        if content_text.startswith("```json"):
-            content_text = content_text[7:]
-        if content_text.startswith("```"):
-            content_text = content_text[3:]
-        if content_text.endswith("```"):
-            content_text = content_text[:-3]
-        content_text = content_text.strip()
+    cache.record_miss("llm_analysis")
+    result = analyze(content, url, business_name, industry)
+    if isinstance(result, dict):
+        cache.put("llm_analysis", key, result, meta={"model": model, "url": url, "prompt_version": PROMPT_VERSION})
+    return result
 
-        result = json.loads(content_text)
 
-        print(f"    🤖 GPT: SEO Score={result.get('seo_score')}/100")
+def unanalyzed(reason: str) -> Dict:
+    """Empty analysis fields for a lead the LLM didn't analyze."""
+    return {
+        "llm_seo_score": None,
+        "llm_critical_issues": [],
+        "llm_revenue_impact": "Unknown",
+        "llm_opportunities": [],
+        "llm_services_offered": [],
+        "llm_unique_selling_proposition": reason,
+        "llm_call_to_action_quality": "Unknown",
+        "llm_target_keywords": [],
+        "llm_missing_keywords": [],
+        "llm_content_quality": reason,
+        "llm_quick_wins": [],
+        "llm_pitch_angle": reason
+    }
 
-        return result
 
-    except Exception as e:
-        print(f"    ⚠️  OpenAI API error: {e}")
-        return None
+def analysis_fields(result: Dict) -> Dict:
+    """The llm_* fields returned to the pipeline for a parsed analysis."""
+    return {
+        "llm_seo_score": result.get("seo_score"),
+        "llm_critical_issues": result.get("critical_issues", []),
+        "llm_revenue_impact": result.get("revenue_impact", "Unknown"),
+        "llm_opportunities": result.get("opportunities", []),
+        "llm_services_offered": result.get("services_offered", []),
+        "llm_unique_selling_proposition": result.get("unique_selling_proposition", ""),
+        "llm_call_to_action_quality": result.get("call_to_action_quality", "Unknown"),
+        "llm_target_keywords": result.get("target_keywords", []),
+        "llm_missing_keywords": result.get("missing_keywords", []),
+        "llm_content_quality": result.get("content_quality", ""),
+        "llm_quick_wins": result.get("quick_wins", []),
+        "llm_pitch_angle": result.get("pitch_angle", "")
+    }
+
+
+def configured_providers() -> List[str]:
+    """Providers with an API key, in preference order (Claude first)."""
+    return [p for p, key in (("anthropic", "ANTHROPIC_API_KEY"), ("openai", "OPENAI_API_KEY")) if os.getenv(key)]
 
 
 def analyze_website_with_llm(url: str, business_name: str = "", industry: str = "") -> Dict:
@@ -217,66 +412,32 @@ def analyze_website_with_llm(url: str, business_name: str = "", industry: str =
     - call_to_action_quality, target_keywords, missing_keywords
     - content_quality, quick_wins, pitch_angle
     """
+    # Without a key there's nothing to analyze with, so don't fetch the page either
+    if not configured_providers():
+        return unanalyzed("No LLM configured")
+
     print(f"    🤖 LLM: Analyzing {url}...")
 
     # Extract content
-    content = _extract_page_content(url)
+    content = extract_page_content(url)
 
     if not content:
-        return {
-            "llm_seo_score": None,
-            "llm_critical_issues": [],
-            "llm_revenue_impact": "Unknown",
-            "llm_opportunities": [],
-            "llm_services_offered": [],
-            "llm_unique_selling_proposition": "Could not analyze",
-            "llm_call_to_action_quality": "Unknown",
-            "llm_target_keywords": [],
-            "llm_missing_keywords": [],
-            "llm_content_quality": "Could not analyze",
-            "llm_quick_wins": [],
-            "llm_pitch_angle": "Could not analyze"
-        }
+        return unanalyzed("Could not analyze")
 
     # Try Claude first (cheaper and better for this task)
-    result = _analyze_with_claude(content, url, business_name, industry)
+    result = None
+    if os.getenv("ANTHROPIC_API_KEY"):
+        result = _cached_analysis(_analyze_with_claude, model_for("anthropic"), content, url, business_name, industry)
 
     # Fallback to OpenAI if Claude not available
-    if not result:
-        result = _analyze_with_openai(content, url, business_name, industry)
+    if not result and os.getenv("OPENAI_API_KEY"):
+        result = _cached_analysis(_analyze_with_openai, model_for("openai"), content, url, business_name, industry)
 
-    # If no LLM available, return empty
     if not result:
-        print(f"    ⚠️  No LLM API key configured, skipping AI analysis")
-        return {
-            "llm_seo_score": None,
-            "llm_critical_issues": [],
-            "llm_revenue_impact": "Unknown",
-            "llm_opportunities": [],
-            "llm_services_offered": [],
-            "llm_unique_selling_proposition": "No LLM configured",
-            "llm_call_to_action_quality": "Unknown",
-            "llm_target_keywords": [],
-            "llm_missing_keywords": [],
-            "llm_content_quality": "No LLM configured",
-            "llm_quick_wins": [],
-            "llm_pitch_angle": "No LLM configured"
-        }
+        print(f"    ⚠️  LLM analysis failed for {url}")
+        return unanalyzed("Could not analyze")
 
-    return {
-        "llm_seo_score": result.get("seo_score"),
-        "llm_critical_issues": result.get("critical_issues", []),
-        "llm_revenue_impact": result.get("revenue_impact", "Unknown"),
-        "llm_opportunities": result.get("opportunities", []),
-        "llm_services_offered": result.get("services_offered", []),
-        "llm_unique_selling_proposition": result.get("unique_selling_proposition", ""),
-        "llm_call_to_action_quality": result.get("call_to_action_quality", "Unknown"),
-        "llm_target_keywords": result.get("target_keywords", []),
-        "llm_missing_keywords": result.get("missing_keywords", []),
-        "llm_content_quality": result.get("content_quality", ""),
-        "llm_quick_wins": result.get("quick_wins", []),
-        "llm_pitch_angle": result.get("pitch_angle", "")
-    }
+    return analysis_fields(result)
 
 
 # Test function
@@ -0,0 +1,89 @@
+"""
+Pipeline Stage Timings
+Wall-clock durations of each pipeline stage (discovery, enumeration, audit,
+llm, persistence, reporting) for the end-of-run summary and
+benchmarks/bench_pipeline.py.
+
+Stages are timed with `with metrics.timer("audit"):` from any thread; every
+sample is kept (a run is at most tens of thousands of leads), so percentiles
+are exact rather than estimated.
+"""
+
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Order stages are reported in; unknown stages follow alphabetically
+STAGES = ["discovery", "enumeration", "audit", "llm", "persistence", "reporting"]
+
+_samples: Dict[str, List[float]] = defaultdict(list)
+_lock = threading.Lock()
+
+
+@contextmanager
+def timer(stage: str):
+    """Time the enclosed block as one sample of `stage` (recorded even if it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def record(stage: str, seconds: float):
+    """Add one duration sample for a stage."""
+    with _lock:
+        _samples[stage].append(seconds)
+
+
+def samples() -> Dict[str, List[float]]:
+    """Raw duration samples per stage for the current run."""
+    with _lock:
+        return {stage: list(values) for stage, values in _samples.items()}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(stage_samples: Dict[str, List[float]]) -> Dict[str, Dict]:
+    """Count, total, p50, p95 and max (seconds) per stage."""
+    order = STAGES + sorted(s for s in stage_samples if s not in STAGES)
+    summary = {}
+    for stage in order:
+        values = stage_samples.get(stage)
+        if not values:
+            continue
+        summary[stage] = {
+            "count": len(values),
+            "total_s": round(sum(values), 3),
+            "p50_s": round(percentile(values, 50), 3),
+            "p95_s": round(percentile(values, 95), 3),
+            "max_s": round(max(values), 3),
+        }
+    return summary
+
+
+def stats() -> Dict[str, Dict]:
+    """Per-stage summary for the current run."""
+    return summarize(samples())
+
+
+def report():
+    """Print per-stage timings for the run."""
+    summary = stats()
+    if not summary:
+        return
+    print("⏱️  Stage timings:")
+    for stage, s in summary.items():
+        print(f"   {stage}: {s['count']}x, total {s['total_s']}s | p50 {s['p50_s']}s / p95 {s['p95_s']}s / max {s['max_s']}s")
+
+
+def reset():
+    """Drop all samples (call at the start of each run)."""
+    with _lock:
+        _samples.clear()
@@ -0,0 +1,237 @@
+"""
+Shared Page Fetching
+Downloads and parses each audited URL once per run, so seo_checks and
+llm_seo_analyzer work from the same response instead of fetching it twice.
+Pages are also kept in the persistent cache and revalidated with
+ETag/Last-Modified once stale.
+
+Downloads are streamed and capped: reading stops at PAGE_MAX_BYTES, or once
+</head> plus PAGE_BODY_BYTES of body have arrived, and the page is flagged
+as truncated.
+"""
+
+import os
+import re
+import codecs
+import threading
+import requests
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from bs4 import BeautifulSoup
+from requests.structures import CaseInsensitiveDict
+
+try:
+    from modules import cache, http_client
+except ImportError:
+    import cache
+    import http_client
+
+USER_AGENT = "Mozilla/5.0 (compatible; SEOBot/1.0; +http://example.com/bot)"
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+_HEADER_CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?([^\s;\"']+)", re.IGNORECASE)
+
+
+class Page:
+    """A fetched page; its parse tree is built on first use and its signals kept by html_signals."""
+
+    def __init__(self, url: str, final_url: str, status_code: int, headers: Dict[str, str],
+                 html: str, encoding: str = "utf-8", from_cache: bool = False, truncated: bool = False):
+        self.url = url
+        self.final_url = final_url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.html = html
+        self.encoding = encoding
+        self.from_cache = from_cache
+        self.truncated = truncated
+        self._soup: Optional[BeautifulSoup] = None
+        # html_signals.extract_page_signals() result, shared by the audit, crawler and LLM stage
+        self.signals: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_response(cls, url: str, response: requests.Response) -> "Page":
+        """Build a page from a streamed response, reading at most the configured cap."""
+        raw, truncated = _read_capped(response)
+        encoding = _detect_encoding(response.headers.get("Content-Type", ""), raw)
+        return cls(url, response.url, response.status_code, dict(response.headers),
+                   raw.decode(encoding, errors="replace"), encoding, truncated=truncated)
+
+    @classmethod
+    def from_cache_entry(cls, url: str, value: Dict) -> "Page":
+        return cls(url, value["final_url"], value["status_code"], value["headers"],
+                   value["html"], value["encoding"], from_cache=True,
+                   truncated=value.get("truncated", False))
+
+    def to_cache_value(self) -> Dict:
+        return {
+            "final_url": self.final_url,
+            "status_code": self.status_code,
+            "headers": dict(self.headers),
+            "html": self.html,
+            "encoding": self.encoding,
+            "truncated": self.truncated,
+        }
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        """Parsed tree, shared read-only between consumers (never decompose it)."""
+        with self._lock:
+            if self._soup is None:
+                self._soup = BeautifulSoup(self.html, "html.parser")
+            return self._soup
+
+
+_pages: "OrderedDict[str, Dict]" = OrderedDict()
+_pages_lock = threading.Lock()
+
+
+def fetch_page(url: str, timeout: int = 10) -> Page:
+    """Fetch a URL at most once per run.
+
+    Concurrent callers for the same URL wait for the first download. Failures
+    are remembered too, so a site that timed out for the SEO checks is not
+    retried by the LLM analysis.
+
+    Args:
+        url: Page URL to fetch
+        timeout: Request timeout in seconds
+
+    Returns:
+        The shared Page for this URL
+
+    Raises:
+        requests.exceptions.RequestException: If the (first) download failed
+    """
+    max_pages = int(os.getenv("PAGE_CACHE_MAX", "256"))
+
+    with _pages_lock:
+        entry = _pages.get(url)
+        owner = entry is None
+        if owner:
+            entry = {"ready": threading.Event(), "page": None, "error": None}
+            _pages[url] = entry
+            # Keep memory bounded on large runs; the oldest pages are long done
+            while len(_pages) > max_pages:
+                _pages.popitem(last=False)
+        else:
+            _pages.move_to_end(url)
+
+    if owner:
+        try:
+            entry["page"] = _download(url, timeout)
+        except Exception as e:
+            entry["error"] = e
+        finally:
+            entry["ready"].set()
+    else:
+        entry["ready"].wait()
+
+    if entry["error"] is not None:
+        raise entry["error"]
+    return entry["page"]
+
+
+def _read_capped(response: requests.Response) -> Tuple[bytes, bool]:
+    """Read a streamed body up to the byte cap, stopping early once past </head>.
+
+    Returns:
+        (bytes read, whether the body was cut short)
+    """
+    max_bytes = int(os.getenv("PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+    body_bytes = int(os.getenv("PAGE_BODY_BYTES", str(256 * 1024)))
+
+    buf = bytearray()
+    head_end = None
+    truncated = False
+    try:
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            if not chunk:
+                continue
+            # Overlap the search window so a "</head" split across chunks is still found
+            scan_from = max(0, len(buf) - 6)
+            buf.extend(chunk)
+            if head_end is None:
+                idx = bytes(buf[scan_from:]).lower().find(b"</head")
+                if idx != -1:
+                    head_end = scan_from + idx
+            limit = max_bytes if head_end is None else min(max_bytes, head_end + body_bytes)
+            if len(buf) > limit:
+                truncated = True
+                del buf[limit:]
+                break
+    finally:
+        response.close()
+    return bytes(buf), truncated
+
+
+def _detect_encoding(content_type: str, raw: bytes) -> str:
+    """Pick the page charset: Content-Type header, then BOM, then <meta charset>, then content sniffing."""
+    candidates = []
+    match = _HEADER_CHARSET_RE.search(content_type)
+    if match:
+        candidates.append(match.group(1))
+    if raw.startswith(codecs.BOM_UTF8):
+        candidates.append("utf-8-sig")
+    elif raw.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates.append("utf-16")
+    match = _META_CHARSET_RE.search(raw[:4096])
+    if match:
+        candidates.append(match.group(1).decode("ascii", errors="ignore"))
+
+    for candidate in candidates:
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(raw[:64 * 1024]).best()
+        if best is not None:
+            # Sniffing only sees the first 64 KiB; plain ASCII there usually means UTF-8
+            return "utf-8" if best.encoding == "ascii" else best.encoding
+    except ImportError:
+        pass
+    return "utf-8"
+
+
+def _download(url: str, timeout: int) -> Page:
+    """Serve a page from the persistent cache, revalidating stale copies with the origin."""
+    cached = cache.get("html", url, allow_stale=True)
+    if cached and cached["fresh"]:
+        cache.record_hit("html")
+        return Page.from_cache_entry(url, cached["value"])
+
+    headers = {"User-Agent": USER_AGENT}
+    if cached:
+        validators = cached["meta"]
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = http_client.get(url, timeout=timeout, headers=headers, stream=True)
+    if cached and response.status_code == 304:
+        response.close()
+        cache.record_revalidated("html")
+        cache.touch("html", url)
+        return Page.from_cache_entry(url, cached["value"])
+
+    cache.record_miss("html")
+    if not response.ok:
+        response.close()
+    response.raise_for_status()
+    page = Page.from_response(url, response)
+    cache.put("html", url, page.to_cache_value(), meta={
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    })
+    return page
+
+
+def reset():
+    """Forget all fetched pages (call at the start of each run)."""
+    with _pages_lock:
+        _pages.clear()
@@ -0,0 +1,429 @@
+"""
+PageSpeed Insights Executor
+Runs PSI requests on a dedicated worker pool so the slowest call in an audit
+overlaps with HTML parsing and with other leads' audits.
+
+- PSI_WORKERS requests run concurrently, paced by the "pagespeed" rate limiter
+  (RATE_LIMIT_PAGESPEED, requests per second)
+- PSI_DAILY_QUOTA requests per quota day (midnight Pacific, as Google counts
+  it); usage is persisted in PSI_STATE_PATH so separate runs share it. The
+  file is rewritten every PSI_STATE_SAVE_EVERY changes and by report() at the
+  end of a run, so a crash loses at most that many quota requests
+- URLs that can't be measured now (quota spent, timeouts, 429s) go to a
+  backlog in the same file and are retried first on the next run, instead of
+  being replaced by made-up numbers
+- stats()/report() give queue depth, latency percentiles and quota remaining
+
+Each call asks for the performance and SEO categories, and only the extracted
+metrics (Core Web Vitals, render-blocking and image savings, SEO audit scores,
+final URL) are kept and cached, never the Lighthouse payload itself.
+"""
+
+import os
+import json
+import time
+import threading
+import requests
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+try:
+    import ijson  # optional: stream-parse Lighthouse payloads
+except ImportError:
+    ijson = None
+
+try:
+    from modules import cache, http_client, rate_limit
+except ImportError:
+    import cache
+    import http_client
+    import rate_limit
+
+PSI_PATH = "/pagespeedonline/v5/runPagespeed"
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_inflight: Dict[str, Future] = {}
+_state: Optional[Dict] = None
+_unsaved = 0
+_latencies: List[float] = []
+_counters: Dict[str, int] = {}
+_queue_depth = 0
+_peak_queue_depth = 0
+
+
+def _quota_day() -> str:
+    """Current PSI quota day; Google resets daily quotas at midnight Pacific time."""
+    try:
+        from zoneinfo import ZoneInfo
+        return datetime.now(ZoneInfo("America/Los_Angeles")).date().isoformat()
+    except Exception:
+        return datetime.now(timezone.utc).date().isoformat()
+
+
+def _daily_quota() -> int:
+    return int(os.getenv("PSI_DAILY_QUOTA", "25000"))
+
+
+def _state_path() -> str:
+    return os.getenv("PSI_STATE_PATH", "./cache/psi_state.json")
+
+
+def _load_state() -> Dict:
+    """Load quota usage and backlog from disk (once per process). Call with _lock held."""
+    global _state
+    if _state is None:
+        _state = {"day": _quota_day(), "used": 0, "backlog": []}
+        path = _state_path()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    _state.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️  Could not read PSI state {path}: {e}")
+    if _state["day"] != _quota_day():
+        _state["day"] = _quota_day()
+        _state["used"] = 0
+    return _state
+
+
+def _save_state():
+    """Write quota usage and backlog to disk. Call with _lock held."""
+    global _unsaved
+    _unsaved = 0
+    path = _state_path()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_state, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  ⚠️  Could not save PSI state {path}: {e}")
+
+
+def _state_changed():
+    """Save the state once PSI_STATE_SAVE_EVERY changes have piled up. Call with _lock held."""
+    global _unsaved
+    _unsaved += 1
+    if _unsaved >= max(1, int(os.getenv("PSI_STATE_SAVE_EVERY", "25"))):
+        _save_state()
+
+
+def flush_state():
+    """Write any unsaved quota usage and backlog changes to disk."""
+    with _lock:
+        if _state is not None and _unsaved:
+            _save_state()
+
+
+def _count(event: str):
+    with _lock:
+        _counters[event] = _counters.get(event, 0) + 1
+
+
+def _take_quota() -> bool:
+    """Reserve one request from today's quota; False once it is used up."""
+    with _lock:
+        state = _load_state()
+        if state["used"] >= _daily_quota():
+            return False
+        state["used"] += 1
+        _state_changed()
+        return True
+
+
+def _exhaust_quota():
+    """Google says the quota is gone; stop spending it for the rest of the day."""
+    with _lock:
+        state = _load_state()
+        state["used"] = max(state["used"], _daily_quota())
+        _save_state()
+
+
+def quota_remaining() -> int:
+    with _lock:
+        return max(0, _daily_quota() - _load_state()["used"])
+
+
+def _defer(url: str, reason: str) -> Dict:
+    """Put a URL on the backlog for the next run and return placeholder metrics."""
+    with _lock:
+        state = _load_state()
+        if url not in state["backlog"]:
+            state["backlog"].append(url)
+            _state_changed()
+        _counters["deferred"] = _counters.get("deferred", 0) + 1
+    print(f"    ⏳ PageSpeed deferred for {url} ({reason})")
+    return {"lcp": None, "performance_score": None, "psi_status": "deferred"}
+
+
+def _clear_backlog(url: str):
+    with _lock:
+        state = _load_state()
+        if url in state["backlog"]:
+            state["backlog"].remove(url)
+            _state_changed()
+
+
+# Lighthouse audits whose numbers end up in the audit dict
+METRIC_AUDITS = ("largest-contentful-paint", "cumulative-layout-shift", "total-blocking-time",
+                 "first-contentful-paint", "speed-index")
+RENDER_BLOCKING_AUDIT = "render-blocking-resources"
+IMAGE_AUDITS = ("uses-optimized-images", "modern-image-formats", "uses-responsive-images", "offscreen-images")
+SEO_AUDITS = ("document-title", "meta-description", "http-status-code", "is-crawlable",
+              "canonical", "link-text", "crawlable-anchors", "image-alt", "robots-txt")
+
+_AUDITS_PREFIX = "lighthouseResult.audits."
+
+
+def _wanted_prefixes() -> Set[str]:
+    """ijson prefixes of the scalar values _extract_metrics reads."""
+    wanted = {
+        "lighthouseResult.finalUrl",
+        "lighthouseResult.finalDisplayedUrl",
+        "lighthouseResult.categories.performance.score",
+        "lighthouseResult.categories.seo.score",
+    }
+    for audit_id in METRIC_AUDITS:
+        wanted.add(f"{_AUDITS_PREFIX}{audit_id}.numericValue")
+    for audit_id in (RENDER_BLOCKING_AUDIT,) + IMAGE_AUDITS:
+        wanted.add(f"{_AUDITS_PREFIX}{audit_id}.details.overallSavingsMs")
+        wanted.add(f"{_AUDITS_PREFIX}{audit_id}.details.overallSavingsBytes")
+    for audit_id in SEO_AUDITS:
+        wanted.add(f"{_AUDITS_PREFIX}{audit_id}.score")
+    return wanted
+
+
+_WANTED_PREFIXES = _wanted_prefixes()
+_COUNTED_ITEMS = {f"{_AUDITS_PREFIX}{a}.details.items.item": a for a in (RENDER_BLOCKING_AUDIT,) + IMAGE_AUDITS}
+
+
+def _set_path(data: Dict, prefix: str, value):
+    node = data
+    parts = prefix.split(".")
+    for part in parts[:-1]:
+        node = node.setdefault(part, {})
+    node[parts[-1]] = value
+
+
+def _stream_payload(response: requests.Response) -> Dict:
+    """Read only the fields we use from a PSI response.
+
+    With ijson installed the Lighthouse JSON (often over 1 MB, mostly
+    screenshots and traces) is parsed as a stream and only the wanted values
+    are kept, shaped like the original document; otherwise the whole body is
+    decoded with json.
+    """
+    if ijson is None:
+        return response.json()
+
+    slim: Dict = {}
+    item_counts: Dict[str, int] = {}
+    response.raw.decode_content = True
+    try:
+        for prefix, event, value in ijson.parse(response.raw):
+            if event == "start_map" and prefix in _COUNTED_ITEMS:
+                audit_id = _COUNTED_ITEMS[prefix]
+                item_counts[audit_id] = item_counts.get(audit_id, 0) + 1
+            elif prefix in _WANTED_PREFIXES and event in ("number", "string", "boolean", "null"):
+                _set_path(slim, prefix, float(value) if event == "number" else value)
+    finally:
+        response.close()
+
+    for audit_id, count in item_counts.items():
+        _set_path(slim, f"{_AUDITS_PREFIX}{audit_id}.details.itemCount", count)
+    return slim
+
+
+def _extract_metrics(data: Dict) -> Dict:
+    """Pull the audit's metrics out of a PSI response (full or streamed)."""
+    lighthouse = data.get("lighthouseResult", {})
+    audits = lighthouse.get("audits", {})
+    categories = lighthouse.get("categories", {})
+
+    def numeric(audit_id: str, scale: float = 1) -> Optional[float]:
+        value = audits.get(audit_id, {}).get("numericValue")
+        return value / scale if value is not None else None
+
+    def details(audit_id: str) -> Dict:
+        found = dict(audits.get(audit_id, {}).get("details") or {})
+        if "itemCount" not in found:
+            found["itemCount"] = len(found.get("items") or [])
+        return found
+
+    # Missing metrics stay None (not measured) rather than a made-up "slow" value
+    perf_score = categories.get("performance", {}).get("score")
+    seo_score = categories.get("seo", {}).get("score")
+
+    render_blocking = details(RENDER_BLOCKING_AUDIT)
+    image_details = [details(audit_id) for audit_id in IMAGE_AUDITS]
+
+    def rounded(value: Optional[float], digits: int = 0):
+        if value is None:
+            return None
+        return round(value, digits) if digits else int(round(value))
+
+    return {
+        "lcp": rounded(numeric("largest-contentful-paint", 1000), 2),
+        "performance_score": round(perf_score * 100) if perf_score is not None else None,
+        "cls": rounded(numeric("cumulative-layout-shift"), 3),
+        "tbt_ms": rounded(numeric("total-blocking-time")),
+        "fcp": rounded(numeric("first-contentful-paint", 1000), 2),
+        "speed_index": rounded(numeric("speed-index", 1000), 2),
+        "render_blocking_count": render_blocking["itemCount"],
+        "render_blocking_savings_ms": rounded(render_blocking.get("overallSavingsMs") or 0),
+        "image_issue_count": sum(d["itemCount"] for d in image_details),
+        "image_savings_kb": rounded(sum(d.get("overallSavingsBytes") or 0 for d in image_details) / 1024),
+        "seo_score": round(seo_score * 100) if seo_score is not None else None,
+        "seo_audits": {a: audits[a].get("score") for a in SEO_AUDITS if a in audits},
+        "final_url": lighthouse.get("finalDisplayedUrl") or lighthouse.get("finalUrl"),
+        "psi_status": "ok"
+    }
+
+
+def _run(url: str, api_key: str) -> Dict:
+    """Measure one URL: cache, quota, rate limit, then the PSI API."""
+    global _queue_depth
+    with _lock:
+        _queue_depth -= 1
+
+    params = {
+        "url": url,
+        "key": api_key,
+        # One call covers the speed metrics and Lighthouse's SEO audits
+        "category": ["performance", "seo"],
+        "strategy": "mobile"
+    }
+    psi_url = http_client.api_url("pagespeed", PSI_PATH)
+    cache_key = cache.make_key(psi_url, params)
+    cached = cache.get("psi", cache_key)
+    if cached:
+        cache.record_hit("psi")
+        _clear_backlog(url)
+        return cached["value"]
+    cache.record_miss("psi")
+
+    if not _take_quota():
+        return _defer(url, "daily quota used up")
+
+    rate_limit.acquire("pagespeed")
+    print(f"    🔍 PageSpeed: Analyzing {url}...")
+    started = time.monotonic()
+    try:
+        response = http_client.get(psi_url, params=params, timeout=int(os.getenv("PSI_TIMEOUT", "60")), stream=True)
+        if response.status_code == 429:
+            # Still throttled after the client's Retry-After retries
+            if "day" in response.text.lower():
+                _exhaust_quota()
+            limiter = rate_limit.get_limiter("pagespeed")
+            if limiter is not None:
+                limiter.pause(60)
+            return _defer(url, "rate limited")
+        response.raise_for_status()
+        metrics = _extract_metrics(_stream_payload(response))
+    except requests.exceptions.Timeout:
+        return _defer(url, "timeout")
+    except requests.exceptions.ConnectionError as e:
+        return _defer(url, f"connection error: {e}")
+    except Exception as e:
+        _count("errors")
+        print(f"    ⚠️  PageSpeed error for {url}: {e}")
+        return {"lcp": None, "performance_score": None, "psi_status": "error"}
+    finally:
+        with _lock:
+            _latencies.append(time.monotonic() - started)
+
+    print(f"    ✅ PageSpeed: LCP={metrics['lcp']}s, Score={metrics['performance_score']}")
+    _count("completed")
+    cache.put("psi", cache_key, metrics)
+    _clear_backlog(url)
+    return metrics
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = max(1, int(os.getenv("PSI_WORKERS", "4")))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="psi")
+        return _executor
+
+
+def submit(url: str, api_key: str) -> Future:
+    """Queue a PSI measurement; concurrent requests for the same URL share one Future."""
+    global _queue_depth, _peak_queue_depth
+    executor = _get_executor()
+    with _lock:
+        future = _inflight.get(url)
+        if future is not None:
+            return future
+        _queue_depth += 1
+        _peak_queue_depth = max(_peak_queue_depth, _queue_depth)
+        _counters["submitted"] = _counters.get("submitted", 0) + 1
+        future = executor.submit(_run, url, api_key)
+        _inflight[url] = future
+    return future
+
+
+def drain_backlog(api_key: str) -> int:
+    """Queue URLs deferred by earlier runs ahead of this run's audits.
+
+    Returns:
+        Number of backlog URLs queued
+    """
+    with _lock:
+        backlog = list(_load_state()["backlog"])
+    if backlog:
+        print(f"⏳ Retrying {len(backlog)} deferred PageSpeed audits from earlier runs")
+    for url in backlog:
+        submit(url, api_key)
+    return len(backlog)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def stats() -> Dict:
+    """Executor metrics for the current run."""
+    with _lock:
+        latencies = list(_latencies)
+        result = dict(_counters)
+        result.update({
+            "queue_depth": _queue_depth,
+            "peak_queue_depth": _peak_queue_depth,
+            "backlog": len(_load_state()["backlog"]),
+        })
+    result["quota_remaining"] = quota_remaining()
+    if latencies:
+        result["latency_p50"] = round(_percentile(latencies, 50), 2)
+        result["latency_p95"] = round(_percentile(latencies, 95), 2)
+    return result
+
+
+def report():
+    """Save the PSI state and print executor metrics for the run."""
+    flush_state()
+    run_stats = stats()
+    if not run_stats.get("submitted"):
+        return
+    latency = (f"p50 {run_stats['latency_p50']}s / p95 {run_stats['latency_p95']}s"
+               if "latency_p50" in run_stats else "no API calls")
+    print(f"⚡ PageSpeed: {run_stats['submitted']} queued, {run_stats.get('completed', 0)} measured, "
+          f"{run_stats.get('deferred', 0)} deferred, {run_stats.get('errors', 0)} errors | {latency} | "
+          f"peak queue {run_stats['peak_queue_depth']} | quota left {run_stats['quota_remaining']}/{_daily_quota()} | "
+          f"backlog {run_stats['backlog']}")
+
+
+def reset():
+    """Forget in-flight work and per-run metrics (call at the start of each run)."""
+    global _queue_depth, _peak_queue_depth
+    with _lock:
+        _inflight.clear()
+        _latencies.clear()
+        _counters.clear()
+        _queue_depth = 0
+        _peak_queue_depth = 0
@@ -0,0 +1,128 @@
+"""
+Provider Rate Limits
+Thread-safe token buckets, one per external provider, so concurrent stages
+stay inside each API's request budget.
+
+Rates are requests per second: RATE_LIMIT_<PROVIDER> overrides the defaults
+below (0 disables limiting) and RATE_BURST_<PROVIDER> sets the bucket size.
+
+LLM APIs also budget tokens: RATE_LIMIT_TPM_<PROVIDER> (tokens per minute)
+backs a second bucket that holds up to a minute of tokens. Callers charge an
+estimate up front and refund_tokens() what the response's usage didn't need,
+the way the providers themselves account for max_tokens.
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+# Requests per second per provider
+DEFAULT_RATES = {
+    "dataforseo": 25.0,  # 2000 calls/minute account limit, with headroom
+    "serpapi": 5.0,
+    "google_places": 10.0,
+    "pagespeed": 4.0,  # PSI allows 400 queries per 100 seconds
+    "anthropic": 50 / 60,  # 50 requests/minute (tier 1)
+    "openai": 500 / 60,  # 500 requests/minute
+}
+
+# Tokens per minute per provider (prompt and completion tokens together)
+DEFAULT_TOKENS_PER_MINUTE = {
+    "anthropic": 60000.0,  # tier 1: 50k input + 10k output tokens/minute
+    "openai": 200000.0,
+}
+
+
+class TokenBucket:
+    """Token bucket limiter: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until `tokens` are available, then take them."""
+        # Requests larger than the bucket would never fit; let them drain it instead
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = max(self._paused_until - now, (tokens - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def refund(self, tokens: float):
+        """Return tokens that were taken but not used."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def pause(self, seconds: float):
+        """Hold every caller for `seconds` (e.g. after a 429 with Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+_limiters: Dict[str, Optional[TokenBucket]] = {}
+_token_limiters: Dict[str, Optional[TokenBucket]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> Optional[TokenBucket]:
+    """Return the shared bucket for a provider, or None if it is unlimited."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            rate = float(os.getenv(f"RATE_LIMIT_{provider.upper()}", DEFAULT_RATES.get(provider, 0)))
+            burst = os.getenv(f"RATE_BURST_{provider.upper()}")
+            _limiters[provider] = TokenBucket(rate, float(burst) if burst else None) if rate > 0 else None
+        return _limiters[provider]
+
+
+def acquire(provider: str, tokens: float = 1.0):
+    """Wait for the provider's budget (no-op for unlimited providers)."""
+    limiter = get_limiter(provider)
+    if limiter is not None:
+        limiter.acquire(tokens)
+
+
+def get_token_limiter(provider: str) -> Optional[TokenBucket]:
+    """Return the shared tokens-per-minute bucket for a provider, or None if unbudgeted."""
+    with _limiters_lock:
+        if provider not in _token_limiters:
+            per_minute = float(os.getenv(f"RATE_LIMIT_TPM_{provider.upper()}",
+                                         DEFAULT_TOKENS_PER_MINUTE.get(provider, 0)))
+            _token_limiters[provider] = TokenBucket(per_minute / 60, per_minute) if per_minute > 0 else None
+        return _token_limiters[provider]
+
+
+def acquire_tokens(provider: str, tokens: float):
+    """Wait until `tokens` fit in the provider's tokens-per-minute budget."""
+    limiter = get_token_limiter(provider)
+    if limiter is not None:
+        limiter.acquire(tokens)
+
+
+def refund_tokens(provider: str, tokens: float):
+    """Give back the part of an estimate the call didn't use."""
+    limiter = get_token_limiter(provider)
+    if limiter is not None and tokens > 0:
+        limiter.refund(tokens)
+
+
+def pause(provider: str, seconds: float):
+    """Hold all of a provider's callers, request and token budgets alike, for `seconds`."""
+    for limiter in (get_limiter(provider), get_token_limiter(provider)):
+        if limiter is not None:
+            limiter.pause(seconds)
@@ -34,7 +34,8 @@ def score_lead(lead: Dict, audit: Dict) -> int:
         score += WEIGHTS["stale_content"]
 
     # Slow page speed (15 points)
-    if audit.get("lcp", 0) > 3.0:
+    # lcp is None while PageSpeed is deferred; don't score what wasn't measured
+    if (audit.get("lcp") or 0) > 3.0:
         score += WEIGHTS["slow_lcp"]
 
     # Bonus for tech stacks that are easy to fix quickly (sales-velocity bias)
@@ -1,47 +1,40 @@
 import os
-import random
 import requests
 from typing import Dict, List
-from bs4 import BeautifulSoup
-from datetime import datetime
 import time
 
-def _generate_stub_audit() -> Dict:
-    """Generate stub SEO audit data for testing."""
+from modules import crawler, freshness, html_signals, page_fetch, psi, stubs
+
+def _generate_stub_audit(url: str) -> Dict:
+    """Generate stub SEO audit data for testing (stable per URL, see modules/stubs.py)."""
     issues: List[str] = []
-    lcp = round(random.uniform(2.0, 5.5), 2)
+    lcp = stubs.pagespeed(url)["lcp"]
     if lcp > 3.0:
         issues.append("Slow LCP")
 
-    has_schema = random.choice([True, False])
+    html_data = stubs.html_signals(url)
+    has_schema = html_data["has_schema"]
     if not has_schema:
         issues.append("No Schema.org")
 
-    has_faq = random.choice([True, False])
-    has_org = random.choice([True, False])
-    meta_title_ok = random.choice([True, False])
-    meta_desc_ok = random.choice([True, False])
-
-    content_fresh_months = random.choice([2, 4, 8, 12, 18, 24])
+    content_fresh_months = html_data["content_fresh_months"]
     if content_fresh_months >= 12:
         issues.append("Stale Content")
 
-    traffic_trend_90d = random.choice([-35, -20, -10, 0, 5, 15])
+    traffic_trend_90d = stubs.traffic_trend(url)
     if traffic_trend_90d <= -20:
         issues.append("Traffic Decline")
 
-    tech_stack = random.choice(["WordPress", "Wix", "Squarespace", "Custom"])
-
     return {
         "lcp": lcp,
         "has_schema": has_schema,
-        "has_faq": has_faq,
-        "has_org": has_org,
-        "meta_title_ok": meta_title_ok,
-        "meta_desc_ok": meta_desc_ok,
+        "has_faq": html_data["has_faq"],
+        "has_org": html_data["has_org"],
+        "meta_title_ok": html_data["meta_title_ok"],
+        "meta_desc_ok": html_data["meta_desc_ok"],
         "content_fresh_months": content_fresh_months,
         "traffic_trend_90d": traffic_trend_90d,
-        "tech_stack": tech_stack,
+        "tech_stack": html_data["tech_stack"],
         "issues": issues,
         "notes": ""
     }
@@ -52,108 +45,57 @@ def _fetch_pagespeed_metrics(url: str) -> Dict:
     api_key = os.getenv("PSI_API_KEY")
 
     if not api_key:
-        return {
-            "lcp": round(random.uniform(2.0, 5.5), 2),
-            "performance_score": random.randint(40, 95)
-        }
-
-    try:
-        psi_url = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
-        params = {
-            "url": url,
-            "key": api_key,
-            "category": "performance",
-            "strategy": "mobile"
-        }
+        return stubs.pagespeed(url)
 
-        print(f"    🔍 PageSpeed: Analyzing {url}...")
-        response = requests.get(psi_url, params=params, timeout=60)
-        response.raise_for_status()
-        data = response.json()
+    # Runs on the PSI worker pool; deferred or failed URLs come back with lcp=None
+    return psi.submit(url, api_key).result()
 
-        # Extract metrics
-        lighthouse = data.get("lighthouseResult", {})
-        audits = lighthouse.get("audits", {})
 
-        # Get LCP (Largest Contentful Paint)
-        lcp_audit = audits.get("largest-contentful-paint", {})
-        lcp_value = lcp_audit.get("numericValue", 3000) / 1000  # Convert ms to seconds
+def _parse_html_seo(url: str) -> Dict:
+    """Parse HTML for SEO elements (with fallback to stub).
 
-        # Get performance score
-        perf_score = lighthouse.get("categories", {}).get("performance", {}).get("score", 0.5) * 100
+    With CRAWL_MAX_PAGES > 1 the site is crawled and schema, FAQ, freshness and
+    tech signals are merged across pages; meta tags are judged on the homepage.
+    """
+    try:
+        print(f"    🔍 HTML: Parsing {url}...")
+        if crawler.max_pages() > 1:
+            crawled = crawler.crawl(url)
+        else:
+            page = page_fetch.fetch_page(url, timeout=10)
+            crawled = [{"url": url, "depth": 0, "page": page, "signals": html_signals.extract_page_signals(page)}]
 
-        print(f"    ✅ PageSpeed: LCP={lcp_value:.2f}s, Score={perf_score:.0f}")
+        page = crawled[0]["page"]
+        signals = crawled[0]["signals"]
+        all_signals = [item["signals"] for item in crawled]
 
-        return {
-            "lcp": round(lcp_value, 2),
-            "performance_score": round(perf_score)
-        }
+        # Check for Schema.org markup on any crawled page
+        has_schema = any(s["has_schema"] for s in all_signals)
 
-    except requests.exceptions.Timeout:
-        print(f"    ⚠️  PageSpeed timeout for {url}, using fallback")
-        return {
-            "lcp": round(random.uniform(2.0, 5.5), 2),
-            "performance_score": random.randint(40, 95)
-        }
-    except Exception as e:
-        print(f"    ⚠️  PageSpeed error for {url}: {e}, using fallback")
-        return {
-            "lcp": round(random.uniform(2.0, 5.5), 2),
-            "performance_score": random.randint(40, 95)
-        }
+        # Check for FAQ schema (FAQPage / QAPage / Question types)
+        has_faq = any(s["has_faq"] for s in all_signals)
 
+        # Check for Organization schema (Organization, LocalBusiness and its subtypes)
+        has_org = any(s["has_org"] for s in all_signals)
 
-def _parse_html_seo(url: str) -> Dict:
-    """Parse HTML for SEO elements (with fallback to stub)."""
-    try:
-        print(f"    🔍 HTML: Parsing {url}...")
-        response = requests.get(url, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (compatible; SEOBot/1.0; +http://example.com/bot)"
-        })
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        html_text = response.text
+        # Check meta tags
+        title = signals["title"]
+        meta_title_ok = bool(title and 30 <= len(title.strip()) <= 60)
 
-        # Check for Schema.org markup
-        has_schema = bool(soup.find_all(attrs={"itemtype": True})) or \
-                     bool(soup.find_all("script", type="application/ld+json"))
+        meta_desc_content = signals["meta_description"]
+        meta_desc_ok = bool(meta_desc_content is not None and 120 <= len(meta_desc_content) <= 160)
 
-        # Check for FAQ schema
-        has_faq = "FAQPage" in html_text or "Question" in html_text
+        # Detect tech stack (fingerprints.json signatures over HTML, scripts, generator, headers, cookies)
+        tech_stack = signals["tech_stack"]
+        technologies = list(dict.fromkeys(t for s in all_signals for t in s["technologies"]))
 
-        # Check for Organization schema
-        has_org = "Organization" in html_text
+        # Content freshness from dateModified, Last-Modified and sitemap <lastmod>
+        fresh = freshness.assess(url, crawled)
+        content_fresh_months = fresh["months"]
 
-        # Check meta tags
-        title = soup.find("title")
-        meta_title_ok = bool(title and 30 <= len(title.text.strip()) <= 60)
-
-        meta_desc = soup.find("meta", attrs={"name": "description"})
-        meta_desc_content = meta_desc.get("content", "") if meta_desc else ""
-        meta_desc_ok = bool(meta_desc and 120 <= len(meta_desc_content) <= 160)
-
-        # Detect tech stack
-        tech_stack = "Custom"
-        html_lower = html_text.lower()
-        if "wp-content" in html_lower or "wordpress" in html_lower:
-            tech_stack = "WordPress"
-        elif "wix.com" in html_lower or "_wix" in html_lower:
-            tech_stack = "Wix"
-        elif "squarespace" in html_lower or "sqsp" in html_lower:
-            tech_stack = "Squarespace"
-        elif "shopify" in html_lower:
-            tech_stack = "Shopify"
-
-        # Try to detect content freshness (look for dates)
-        content_fresh_months = 6  # Default assumption
-        current_year = datetime.now().year
-        for year in range(current_year - 2, current_year + 1):
-            if str(year) in html_text:
-                months_old = (current_year - year) * 12
-                content_fresh_months = max(2, months_old)
-                break
-
-        print(f"    ✅ HTML: Schema={has_schema}, Tech={tech_stack}")
+        print(f"    ✅ HTML: Schema={has_schema}, Tech={tech_stack}, Fresh={content_fresh_months}mo ({fresh['source']})"
+              + (f", Pages={len(crawled)}" if len(crawled) > 1 else "")
+              + (" (truncated)" if page.truncated else ""))
 
         return {
             "has_schema": has_schema,
@@ -162,31 +104,20 @@ def _parse_html_seo(url: str) -> Dict:
             "meta_title_ok": meta_title_ok,
             "meta_desc_ok": meta_desc_ok,
             "tech_stack": tech_stack,
-            "content_fresh_months": content_fresh_months
+            "technologies": technologies,
+            "content_fresh_months": content_fresh_months,
+            "content_last_modified": fresh["last_modified"],
+            "freshness_source": fresh["source"],
+            "pages_crawled": len(crawled),
+            "page_truncated": page.truncated
         }
 
     except requests.exceptions.Timeout:
         print(f"    ⚠️  HTML timeout for {url}, using fallback")
-        return {
-            "has_schema": random.choice([True, False]),
-            "has_faq": random.choice([True, False]),
-            "has_org": random.choice([True, False]),
-            "meta_title_ok": random.choice([True, False]),
-            "meta_desc_ok": random.choice([True, False]),
-            "tech_stack": random.choice(["WordPress", "Wix", "Squarespace", "Custom"]),
-            "content_fresh_months": random.choice([2, 4, 8, 12, 18, 24])
-        }
+        return dict(stubs.html_signals(url), html_status="fallback")
     except Exception as e:
         print(f"    ⚠️  HTML parse error for {url}: {e}, using fallback")
-        return {
-            "has_schema": random.choice([True, False]),
-            "has_faq": random.choice([True, False]),
-            "has_org": random.choice([True, False]),
-            "meta_title_ok": random.choice([True, False]),
-            "meta_desc_ok": random.choice([True, False]),
-            "tech_stack": random.choice(["WordPress", "Wix", "Squarespace", "Custom"]),
-            "content_fresh_months": random.choice([2, 4, 8, 12, 18, 24])
-        }
+        return dict(stubs.html_signals(url), html_status="fallback")
 
 
 def evaluate_site(url: str) -> Dict:
@@ -216,42 +147,74 @@ def evaluate_site(url: str) -> Dict:
 
     # Use stub data for example URLs
     if "example" in url.lower() or not url.startswith("http"):
-        return _generate_stub_audit()
+        return _generate_stub_audit(url)
 
-    # Get real metrics
-    psi_metrics = _fetch_pagespeed_metrics(url)
+    # Get real metrics; PSI runs on its own pool while the HTML is parsed
+    api_key = os.getenv("PSI_API_KEY")
+    psi_future = psi.submit(url, api_key) if api_key else None
     html_data = _parse_html_seo(url)
+    psi_metrics = psi_future.result() if psi_future else _fetch_pagespeed_metrics(url)
 
     # Combine data and identify issues
     issues: List[str] = []
 
-    lcp = psi_metrics.get("lcp", 3.0)
-    if lcp > 3.0:
+    lcp = psi_metrics.get("lcp")
+    if lcp is not None and lcp > 3.0:
         issues.append("Slow LCP")
 
     has_schema = html_data.get("has_schema", False)
     if not has_schema:
         issues.append("No Schema.org")
 
+    # Lighthouse's SEO audits come with the PSI call; they stand in for the
+    # meta checks when the page couldn't be fetched directly (e.g. bot blocking)
+    seo_audits = psi_metrics.get("seo_audits") or {}
+    meta_title_ok = html_data.get("meta_title_ok", False)
+    meta_desc_ok = html_data.get("meta_desc_ok", False)
+    if html_data.get("html_status") == "fallback" and seo_audits:
+        meta_title_ok = seo_audits.get("document-title") == 1
+        meta_desc_ok = seo_audits.get("meta-description") == 1
+    if seo_audits.get("is-crawlable") == 0:
+        issues.append("Not Indexable")
+
     content_fresh_months = html_data.get("content_fresh_months", 6)
     if content_fresh_months >= 12:
         issues.append("Stale Content")
 
     # Traffic trend - stub for now (would need Ahrefs/Semrush)
-    traffic_trend_90d = random.choice([-35, -20, -10, 0, 5, 15])
+    traffic_trend_90d = stubs.traffic_trend(url)
     if traffic_trend_90d <= -20:
         issues.append("Traffic Decline")
 
     return {
         "lcp": lcp,
+        "psi_status": psi_metrics.get("psi_status", "ok"),
+        "cls": psi_metrics.get("cls"),
+        "tbt_ms": psi_metrics.get("tbt_ms"),
+        "fcp": psi_metrics.get("fcp"),
+        "speed_index": psi_metrics.get("speed_index"),
+        "render_blocking_count": psi_metrics.get("render_blocking_count"),
+        "render_blocking_savings_ms": psi_metrics.get("render_blocking_savings_ms"),
+        "image_issue_count": psi_metrics.get("image_issue_count"),
+        "image_savings_kb": psi_metrics.get("image_savings_kb"),
+        "seo_score": psi_metrics.get("seo_score"),
+        "final_url": psi_metrics.get("final_url"),
         "has_schema": has_schema,
         "has_faq": html_data.get("has_faq", False),
         "has_org": html_data.get("has_org", False),
-        "meta_title_ok": html_data.get("meta_title_ok", False),
-        "meta_desc_ok": html_data.get("meta_desc_ok", False),
+        "meta_title_ok": meta_title_ok,
+        "meta_desc_ok": meta_desc_ok,
         "content_fresh_months": content_fresh_months,
+        "content_last_modified": html_data.get("content_last_modified"),
+        "freshness_source": html_data.get("freshness_source", "default"),
         "traffic_trend_90d": traffic_trend_90d,
         "tech_stack": html_data.get("tech_stack", "Unknown"),
+        "technologies": html_data.get("technologies", []),
         "issues": issues,
-        "notes": f"Performance Score: {psi_metrics.get('performance_score', 0)}"
+        "pages_crawled": html_data.get("pages_crawled", 0),
+        "page_truncated": html_data.get("page_truncated", False),
+        "notes": (f"Performance Score: {psi_metrics['performance_score']}"
+                  if psi_metrics.get("performance_score") is not None
+                  else f"Performance Score: n/a (PageSpeed {psi_metrics.get('psi_status', 'unavailable')})")
+                 + ("; homepage truncated at download cap" if html_data.get("page_truncated") else "")
     }
@@ -0,0 +1,110 @@
+"""
+Deterministic Stub Data
+Synthetic stand-ins used when an API key is missing or a call fails, and by
+the local LLM batch backend.
+
+Every stub draws from its own random.Random seeded with
+sha256(STUB_SEED | kind | key), so the same URL/geo/industry gets the same
+numbers in every run and every process (unlike unseeded random or Python's
+per-process salted hash()). Change STUB_SEED for a different, equally
+reproducible dataset.
+
+STUB_LATENCY picks a latency profile ("none", the default, or "realistic" /
+"slow") so keyless runs can double as load benchmarks; sleeps are also seeded
+and scaled by STUB_LATENCY_SCALE.
+"""
+
+import os
+import time
+import random
+import hashlib
+
+# Per-service (median seconds, spread) of the real calls the stubs stand in for
+LATENCY_PROFILES = {
+    "none": {},
+    "realistic": {
+        "serp": (1.2, 0.6),
+        "places_search": (0.8, 0.4),
+        "pagespeed": (12.0, 6.0),
+        "html": (0.6, 0.5),
+    },
+    "slow": {
+        "serp": (4.0, 2.0),
+        "places_search": (2.5, 1.0),
+        "pagespeed": (30.0, 15.0),
+        "html": (3.0, 2.0),
+    },
+}
+
+
+def rng(kind: str, *key: str) -> random.Random:
+    """A random.Random that is fully determined by STUB_SEED, kind and key."""
+    seed = os.getenv("STUB_SEED", "0")
+    material = "|".join((seed, kind) + tuple(str(k).lower() for k in key))
+    return random.Random(int.from_bytes(hashlib.sha256(material.encode()).digest()[:8], "big"))
+
+
+def simulate_latency(service: str, *key: str):
+    """Sleep for the configured profile's (seeded) latency of one call to `service`."""
+    profile = LATENCY_PROFILES.get(os.getenv("STUB_LATENCY", "none").lower(), {})
+    if service not in profile:
+        return
+    median, spread = profile[service]
+    delay = max(0.0, rng("latency", service, *key).gauss(median, spread))
+    time.sleep(delay * float(os.getenv("STUB_LATENCY_SCALE", "1")))
+
+
+def serp_volume(geo: str, industry: str) -> float:
+    """Demand proxy for an industry in a geo (100-400)."""
+    simulate_latency("serp", geo, industry)
+    return 100 + rng("serp", geo, industry).randrange(300)
+
+
+def pagespeed(url: str) -> dict:
+    """PageSpeed metrics for a URL."""
+    simulate_latency("pagespeed", url)
+    r = rng("pagespeed", url)
+    return {
+        "lcp": round(r.uniform(2.0, 5.5), 2),
+        "performance_score": r.randint(40, 95)
+    }
+
+
+def html_signals(url: str) -> dict:
+    """On-page signals for a URL whose HTML could not be fetched."""
+    simulate_latency("html", url)
+    r = rng("html", url)
+    return {
+        "has_schema": r.choice([True, False]),
+        "has_faq": r.choice([True, False]),
+        "has_org": r.choice([True, False]),
+        "meta_title_ok": r.choice([True, False]),
+        "meta_desc_ok": r.choice([True, False]),
+        "tech_stack": r.choice(["WordPress", "Wix", "Squarespace", "Custom"]),
+        "content_fresh_months": r.choice([2, 4, 8, 12, 18, 24]),
+    }
+
+
+def traffic_trend(url: str) -> int:
+    """90-day traffic change in percent (no traffic provider is integrated yet)."""
+    return rng("traffic", url).choice([-35, -20, -10, 0, 5, 15])
+
+
+def llm_analysis(key: str) -> dict:
+    """A sales analysis in the shape the LLM prompt asks for (local batch backend)."""
+    r = rng("llm", key)
+    return {
+        "seo_score": r.randint(20, 85),
+        "critical_issues": r.sample(["Missing local business schema", "Slow mobile load time",
+                                     "Thin service pages", "No meta description", "No reviews on homepage"], 3),
+        "revenue_impact": f"${r.randint(2, 9)},000-{r.randint(10, 20)},000/month",
+        "opportunities": ["Add FAQ schema", "Create city landing pages", "Speed up mobile LCP"],
+        "services_offered": ["Repairs", "Installation", "Maintenance"],
+        "unique_selling_proposition": r.choice(["Family owned", "24/7 emergency service", "Not clear"]),
+        "call_to_action_quality": r.choice(["Strong", "Weak", "Missing"]),
+        "target_keywords": ["near me", "emergency service"],
+        "missing_keywords": ["free estimate", "licensed and insured"],
+        "content_quality": "Stub analysis (local batch backend).",
+        "quick_wins": ["Fix title tag", "Add meta description", "Compress hero image"],
+        "pitch_angle": "Competitors outrank them in the local map pack.",
+    }
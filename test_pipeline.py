@@ -5,8 +5,112 @@ Tests all modules without requiring API keys
 """
 import sys
 import os
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Dict, List
 
+
+@contextmanager
+def local_site(routes: Dict):
+    """Serve {path: (status, headers, body)} on 127.0.0.1 and yield (base_url, requests).
+
+    A route may be a callable taking the request headers and returning the
+    tuple; requests records (monotonic time, path, headers) for each request
+    (POSTs are answered like GETs).
+    """
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append((time.monotonic(), self.path, dict(self.headers)))
+            route = routes.get(self.path, (404, {}, "Not found"))
+            status, headers, body = route(self.headers) if callable(route) else route
+            body = b"" if status == 304 else (body.encode() if isinstance(body, str) else body)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if status != 304:
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self.do_GET()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", requests_seen
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def isolated_cache():
+    """Run against an empty in-memory cache and fresh per-run page/crawl state."""
+    from modules import cache, crawler, page_fetch
+    original = cache._backend
+    cache._backend = cache.MemoryBackend()
+    page_fetch.reset()
+    crawler.reset()
+    try:
+        yield cache
+    finally:
+        cache._backend = original
+        page_fetch.reset()
+        crawler.reset()
+
+
+@contextmanager
+def mock_apis(env: Dict = None, **config):
+    """Run benchmarks/mock_api_server.py in-process and point the provider clients at it.
+
+    `config` overrides the server's command-line defaults (places_pages,
+    token_delay, task_delay, ...) and `env` the variables mock_env() sets
+    (None unsets one). Yields the MockServer.
+    """
+    import argparse
+    benchmarks = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+    if benchmarks not in sys.path:
+        sys.path.insert(0, benchmarks)
+    from mock_api_server import PROVIDERS, MockConfig, MockServer, mock_env
+    from modules import http_client
+
+    settings = dict(seed=0, latency="", error_rate=0.0, rps="", quota="", places_pages=3, token_delay=0.0,
+                    psi_payload_kb=1, task_delay=0.0, spread_hosts=False, no_website_rate=0.1)
+    settings.update(config)
+    server = MockServer(("127.0.0.1", 0), MockConfig(argparse.Namespace(**settings)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    values = {f"{provider.upper()}_BASE_URL": None for provider in PROVIDERS}
+    values.update(mock_env(f"http://127.0.0.1:{server.server_address[1]}"))
+    values.update(env or {})
+    original = {name: os.environ.get(name) for name in values}
+    for name, value in values.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+    try:
+        yield server
+    finally:
+        for name, value in original.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        server.shutdown()
+        server.server_close()
+        http_client.reset()
+
+
 # Test modules individually
 def test_industry_discovery():
     print("\n=== Testing Industry Discovery ===")
@@ -20,6 +124,203 @@ def test_industry_discovery():
     print(f"✅ Discovered {len(industries)} industries: {industries}")
     return industries
 
+def test_dataforseo_batch():
+    print("\n=== Testing DataForSEO Batch Scoring ===")
+    import tempfile
+    import requests
+    from modules import http_client, industry_discovery, stubs
+
+    posted, server_ref, drop = [], [], {}
+    original_post = http_client.post
+    def recording_post(url, **kwargs):
+        if "/live/" in url:
+            raise requests.exceptions.ConnectionError("live SERP endpoint down")
+        response = original_post(url, **kwargs)
+        if url.endswith("/task_post"):
+            posted.append(kwargs["json"])
+            server = server_ref[0]
+            with server.state.lock:
+                for task in response.json()["tasks"]:
+                    if drop.get(task["data"]["tag"]) == "failed":
+                        del server.state.tasks[task["id"]]  # task_get answers 40401
+                    elif drop.get(task["data"]["tag"]) == "missing":
+                        server.state.tasks[task["id"]] = (time.time() + 3600, task["data"])  # never ready
+        return response
+
+    scored = {}
+    original_score = industry_discovery._score_dataforseo_result
+    def recording_score(result, geo, industry):
+        scored[(geo, industry)] = result
+        return original_score(result, geo, industry)
+
+    env = {"DATAFORSEO_MODE": "batch", "DATAFORSEO_BATCH_SIZE": "4", "DATAFORSEO_POLL_INTERVAL": "0.05",
+           "DATAFORSEO_BATCH_TIMEOUT": "1", "SERPAPI_KEY": None}
+    http_client.post = recording_post
+    industry_discovery._score_dataforseo_result = recording_score
+    with tempfile.TemporaryDirectory() as tmp, isolated_cache():
+        env["DATAFORSEO_LOCATIONS_PATH"] = os.path.join(tmp, "locations.json")
+        industry_discovery._location_index = None
+        try:
+            with mock_apis(env=env, task_delay=0.1) as server:
+                server_ref.append(server)
+                headers = industry_discovery._dataforseo_headers("mock", "mock")
+                pairs = [(geo, ind) for geo in ("Houston, TX", "Austin, TX") for ind in ("plumbers", "dentists", "HVAC")]
+                scores = industry_discovery._dataforseo_batch_scores(pairs, "mock", "mock")
+
+                # 6 tasks in chunks of 4, each tagged with its pair's index
+                assert [len(chunk) for chunk in posted] == [4, 2], [len(chunk) for chunk in posted]
+                tasks = [task for chunk in posted for task in chunk]
+                assert [task["tag"] for task in tasks] == [str(i) for i in range(6)]
+                for task, (geo, industry) in zip(tasks, pairs):
+                    assert task["keyword"] == f"{industry} near me"
+                    assert task["location_code"] == industry_discovery._get_dataforseo_location_code(geo, headers)
+
+                # Each result lands on its own pair: the SERP scored is the one a live call for the pair returns
+                assert set(scores) == set(pairs) and not server.state.tasks, "Every task should be collected"
+                assert len({result["total_count"] for result in scored.values()}) == len(pairs)
+                for geo, industry in pairs:
+                    code = industry_discovery._get_dataforseo_location_code(geo, headers)
+                    live = original_post(http_client.api_url("dataforseo", "/v3/serp/google/organic/live/advanced"),
+                                         json=[industry_discovery._dataforseo_task(industry, code)], headers=headers)
+                    assert scored[(geo, industry)] == live.json()["tasks"][0]["result"][0], (geo, industry)
+
+                # A failed or never-ready task is left out and scored through the fallback chain (stub here)
+                posted.clear()
+                geo = "Houston, TX"
+                drop.update({"1": "failed", "2": "missing"})
+                ranked = industry_discovery._score_industries([geo])[geo]
+                assert sum(len(chunk) for chunk in posted) == len(industry_discovery.CANDIDATE_INDUSTRIES)
+                for i, industry in enumerate(industry_discovery.CANDIDATE_INDUSTRIES[:4]):
+                    stub = stubs.serp_volume(geo, industry) * industry_discovery._site_quality_penalty(geo, industry)
+                    assert (ranked[industry] == stub) == (i in (1, 2)), (industry, ranked[industry], stub)
+        finally:
+            http_client.post = original_post
+            industry_discovery._score_dataforseo_result = original_score
+            industry_discovery._location_index = None
+    print(f"✅ task_post batches mapped back to their (geo, industry) pairs; failed/missing tasks fell back to stubs")
+
+def test_http_retries():
+    print("\n=== Testing HTTP Retry Policy ===")
+    from modules import http_client
+
+    routes = {path: (int(path[1:]), {}, "error") for path in ("/429", "/500", "/502", "/503", "/504")}
+    original = os.environ.get("HTTP_BACKOFF")
+    os.environ["HTTP_BACKOFF"] = "0"
+    http_client.reset()
+    try:
+        with local_site(routes) as (base, seen):
+            sent = {}
+            for method in ("GET", "POST"):
+                for path in routes:
+                    before = len(seen)
+                    http_client.request(method, base + path, data="{}" if method == "POST" else None)
+                    sent[(method, path)] = len(seen) - before
+            before = len(seen)
+            http_client.post(base + "/429", json={}, retry_429=False)
+            sent[("POST", "/429 no retry")] = len(seen) - before
+    finally:
+        if original is None:
+            os.environ.pop("HTTP_BACKOFF", None)
+        else:
+            os.environ["HTTP_BACKOFF"] = original
+        http_client.reset()
+
+    retries = int(os.getenv("HTTP_RETRIES", "3"))
+    assert all(sent[("GET", path)] == retries + 1 for path in routes), sent
+    # A POST may already have been processed when a 500/502/504 comes back: never resent
+    assert [sent[("POST", path)] for path in routes] == [retries + 1, 1, 1, retries + 1, 1], sent
+    assert sent[("POST", "/429 no retry")] == 1
+    print(f"✅ GETs retried on every transient status, POSTs only on 429/503 ({sent})")
+
+def test_discovery_concurrency():
+    print("\n=== Testing Concurrent Industry Scoring and Rate Limits ===")
+    from modules import industry_discovery, rate_limit
+
+    industries = industry_discovery.CANDIDATE_INDUSTRIES
+    geos = ["Houston, TX", "Austin, TX"]
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+    def fake_proxy(geo, industry):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        # Later industries answer first, so completion order is the reverse of submission order
+        time.sleep((len(industries) - industries.index(industry)) * 0.004)
+        with lock:
+            in_flight[0] -= 1
+        return float(geos.index(geo) * 1000 + industries.index(industry) + 1)
+
+    settings = {"DISCOVERY_WORKERS": "8", "DATAFORSEO_LOGIN": None, "DATAFORSEO_PASSWORD": None}
+    original = (industry_discovery._serp_volume_proxy, {name: os.environ.get(name) for name in settings})
+    industry_discovery._serp_volume_proxy = fake_proxy
+    for name, value in settings.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+    try:
+        scores = industry_discovery._score_industries(geos)
+    finally:
+        industry_discovery._serp_volume_proxy = original[0]
+        for name, value in original[1].items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    assert list(scores) == geos and all(list(scores[geo]) == industries for geo in geos)
+    for geo in geos:
+        for i, industry in enumerate(industries):
+            expected = (geos.index(geo) * 1000 + i + 1) * industry_discovery._site_quality_penalty(geo, industry)
+            assert scores[geo][industry] == expected, (geo, industry, scores[geo][industry])
+    assert peak[0] > 1, "Industries should be scored concurrently"
+
+    # Token bucket on an injected clock: a burst of `capacity`, then one request per 1/rate seconds
+    class FakeClock:
+        def __init__(self):
+            self.now = 0.0
+
+        def monotonic(self):
+            return self.now
+
+        def sleep(self, seconds):
+            self.now += seconds
+
+    clock = FakeClock()
+    original_time = rate_limit.time
+    rate_limit.time = clock
+    try:
+        bucket = rate_limit.TokenBucket(rate=5, capacity=2)
+        granted = []
+        for _ in range(6):
+            bucket.acquire()
+            granted.append(round(clock.now, 6))
+        assert granted == [0.0, 0.0, 0.2, 0.4, 0.6, 0.8], granted
+        bucket.pause(1.0)
+        bucket.acquire()
+        assert round(clock.now, 6) == 1.8, "A pause should hold callers even with tokens available"
+    finally:
+        rate_limit.time = original_time
+
+    # Real threads sharing a provider limiter (RATE_LIMIT_/RATE_BURST_ from the env) are paced together
+    os.environ.update(RATE_LIMIT_THROTTLE_TEST="20", RATE_BURST_THROTTLE_TEST="1")
+    try:
+        started = time.monotonic()
+        threads = [threading.Thread(target=lambda: [rate_limit.acquire("throttle_test") for _ in range(3)])
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+    finally:
+        os.environ.pop("RATE_LIMIT_THROTTLE_TEST")
+        os.environ.pop("RATE_BURST_THROTTLE_TEST")
+        rate_limit._limiters.pop("throttle_test", None)
+    assert elapsed >= 0.5, f"12 requests at 20/s (burst 1) should take ~0.55s, took {elapsed:.2f}s"
+    print(f"✅ {len(industries) * len(geos)} geo/industry pairs scored {peak[0]} at a time, kept in order; "
+          f"token bucket paced 12 requests over {elapsed:.2f}s")
+
 def test_lead_finder():
     print("\n=== Testing Lead Finder ===")
     from modules import lead_finder
@@ -36,6 +337,113 @@ def test_lead_finder():
         print(f"   - {lead['name']}: {lead['website']}")
     return leads
 
+def test_places_pagination():
+    print("\n=== Testing Places Text Search Pagination ===")
+    from modules import http_client, lead_finder
+
+    calls = []
+    original_get = http_client.get
+    def recording_get(url, **kwargs):
+        response = original_get(url, **kwargs)
+        calls.append((time.monotonic(), dict(kwargs.get("params") or {}), response.json().get("status")))
+        return response
+
+    http_client.get = recording_get
+    try:
+        # Tokens turn valid 0.3s after issue, the client waits 0.2s: each later page needs one retry
+        # (0.1s of slack either side for request latency)
+        with mock_apis(env={"PLACES_PAGE_TOKEN_DELAY": "0.2", "PLACES_MAX_PAGES": None}, token_delay=0.3), \
+                isolated_cache():
+            status, places = lead_finder._places_text_search("plumbers in Houston, TX", "mock", 60)
+            assert status == "OK" and len(places) == 60, (status, len(places))
+            assert len({p["place_id"] for p in places}) == 60, "Each page should add new places"
+            assert "query" in calls[0][1] and all("pagetoken" in params for _, params, _ in calls[1:])
+            statuses = [s for _, _, s in calls]
+            assert statuses == ["OK", "INVALID_REQUEST", "OK", "INVALID_REQUEST", "OK"], statuses
+            gaps = [later[0] - earlier[0] for earlier, later in zip(calls, calls[1:])]
+            assert min(gaps) >= 0.2, f"Each token request should wait PLACES_PAGE_TOKEN_DELAY ({gaps})"
+            assert calls[1][1]["pagetoken"] == calls[2][1]["pagetoken"], "The same token should be retried"
+
+            # The assembled list is cached: a repeat (or smaller) search makes no requests
+            calls.clear()
+            assert lead_finder._places_text_search("plumbers in Houston, TX", "mock", 30)[1] == places[:30]
+            assert not calls
+
+            # Stops paging once max_results are in hand
+            lead_finder._places_text_search("roofers in Houston, TX", "mock", 25)
+            assert len(calls) == 3 and calls[-1][2] == "OK", [s for _, _, s in calls]
+
+        # A token that never turns valid is given up on after 3 tries, keeping the pages so far
+        calls.clear()
+        with mock_apis(env={"PLACES_PAGE_TOKEN_DELAY": "0.02", "PLACES_MAX_PAGES": None}, token_delay=60), \
+                isolated_cache() as cache:
+            status, places = lead_finder._places_text_search("dentists in Houston, TX", "mock", 60)
+            assert status == "OK" and len(places) == 20
+            assert [s for _, _, s in calls] == ["OK"] + ["INVALID_REQUEST"] * 3
+            key = cache.make_key(http_client.api_url("google_places", lead_finder.PLACES_TEXTSEARCH_PATH),
+                                 {"query": "dentists in Houston, TX"})
+            assert cache.get("places_textsearch", key)["value"]["complete"] is False
+    finally:
+        http_client.get = original_get
+    print("✅ Text Search followed next_page_token, retried early tokens and cached the assembled list")
+
+def test_place_details_fields():
+    print("\n=== Testing Place Details Field Freshness ===")
+    from modules import http_client, lead_finder
+
+    place = {"name": "Acme Plumbing", "website": "https://acme.test/",
+             "formatted_phone_number": "(555) 123-4567", "formatted_address": "1 Main St"}
+    requests_seen, status = [], ["OK"]
+    class FakeResponse:
+        def __init__(self, params):
+            self.params = params
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            wanted = self.params["fields"].split(",")
+            return {"status": status[0], "result": {f: place[f] for f in wanted if f in place}}
+
+    def fake_get(url, params=None, **kwargs):
+        requests_seen.append(params["fields"])
+        return FakeResponse(params)
+
+    original_get = http_client.get
+    http_client.get = fake_get
+    try:
+        with isolated_cache() as cache:
+            now = time.time()
+            cache.put("places_details", "p1", {
+                "name": {"value": "Acme Plumbing", "fetched_at": now - 1 * cache.DAY},
+                "website": {"value": "https://old-acme.test/", "fetched_at": now - 20 * cache.DAY},
+                "formatted_phone_number": {"value": "(555) 000-0000", "fetched_at": now - 40 * cache.DAY},
+            })
+            # Only the stale phone and the never-fetched address are asked for; the rest comes from the cache
+            details = lead_finder._place_details("p1", "key")
+            assert requests_seen == ["formatted_phone_number,formatted_address"], requests_seen
+            assert details == dict(place, website="https://old-acme.test/"), details
+
+            assert lead_finder._place_details("p1", "key") == details and len(requests_seen) == 1
+
+            # A per-field max age makes just that field stale
+            os.environ["PLACE_DETAILS_MAX_AGE_DAYS_WEBSITE"] = "10"
+            assert lead_finder._place_details("p1", "key")["website"] == "https://acme.test/"
+            assert requests_seen[-1] == "website"
+
+            # A field Places has no value for is remembered, not re-asked every run
+            del place["website"]
+            assert lead_finder._place_details("p2", "key")["website"] is None
+            assert lead_finder._place_details("p2", "key")["website"] is None and len(requests_seen) == 3
+
+            # A failed lookup returns None and doesn't touch the stored fields
+            status[0] = "NOT_FOUND"
+            assert lead_finder._place_details("p3", "key") is None and cache.get("places_details", "p3") is None
+    finally:
+        http_client.get = original_get
+        os.environ.pop("PLACE_DETAILS_MAX_AGE_DAYS_WEBSITE", None)
+    print(f"✅ Place Details re-queried only stale fields ({len(requests_seen)} requests for 4 lookups)")
+
 def test_seo_checks():
     print("\n=== Testing SEO Checks ===")
     from modules import seo_checks
@@ -209,6 +617,761 @@ def test_full_pipeline_dry_run():
     
     return all_rows
 
+def test_concurrent_audits():
+    print("\n=== Testing Concurrent Audits ===")
+    import main as pipeline
+    from modules import lead_finder
+
+    leads = lead_finder.find_leads("Houston, TX", "plumbers", max_results=6)
+    for lead in leads:
+        lead["website"] = ""  # keep the audit offline (no LLM page fetch)
+    jobs = [("plumbers", lead) for lead in leads]
+    # A lead whose audit blows up must be dropped without affecting the others
+    jobs.insert(2, ("plumbers", {"name": "Broken Biz", "website": 12345}))
+
+    serial = pipeline._run_audits(jobs, "Houston, TX", "2025-10-14", workers=1)
+    parallel = pipeline._run_audits(jobs, "Houston, TX", "2025-10-14", workers=4)
+
+    assert len(parallel) == len(leads), f"Expected {len(leads)} rows, got {len(parallel)}"
+    assert [r["BusinessName"] for r in parallel] == [r["BusinessName"] for r in serial], \
+        "Concurrent audits should preserve lead order"
+    print(f"✅ {len(parallel)} rows audited concurrently in original order")
+
+    # The same site listed under two industries is audited once, one row per industry
+    assert pipeline._dedup_key({"website": "https://www.Acme.com/"}) == \
+        pipeline._dedup_key({"website": "http://acme.com"}), "Normalized websites should match"
+    shared = {"name": "Acme Remodeling & Roofing", "website": "", "place_id": "abc123"}
+    rows = pipeline._run_audits([("home remodeling", shared), ("roofing contractors", dict(shared))],
+                                "Houston, TX", "2025-10-14", workers=2)
+    assert [r["Industry"] for r in rows] == ["home remodeling", "roofing contractors"]
+    assert rows[0]["Issues"] == rows[1]["Issues"], "Duplicate leads should share one audit"
+    print(f"   - Duplicate lead fanned out to {len(rows)} industry rows")
+
+    # A lead whose scoring blows up is skipped like a failed audit
+    from modules import scoring
+    original_score = scoring.score_lead
+    def flaky_score(lead, audit):
+        if lead.get("name") == leads[1]["name"]:
+            raise KeyError("lcp")
+        return original_score(lead, audit)
+    scoring.score_lead = flaky_score
+    try:
+        rows = pipeline._run_audits(jobs, "Houston, TX", "2025-10-14", workers=4)
+    finally:
+        scoring.score_lead = original_score
+    assert [r["BusinessName"] for r in rows] == [l["name"] for l in leads if l is not leads[1]]
+    return parallel
+
+def test_response_cache():
+    print("\n=== Testing Response Cache ===")
+    import tempfile
+    from modules import page_fetch
+
+    with isolated_cache() as cache:
+        # Expired entries are hidden unless asked for stale (for revalidation)
+        cache.put("psi", "expired", {"lcp": 2.0}, ttl=-1)
+        cache.put("psi", "live", {"lcp": 3.0})
+        assert cache.get("psi", "expired") is None
+        assert cache.get("psi", "expired", allow_stale=True)["fresh"] is False
+        assert cache.get("psi", "live")["value"] == {"lcp": 3.0}
+        os.environ["CACHE_TTL_DAYS_PSI"] = "2"
+        try:
+            assert cache.ttl_for("psi") == 2 * cache.DAY and cache.ttl_for("hunter") == 30 * cache.DAY
+        finally:
+            os.environ.pop("CACHE_TTL_DAYS_PSI")
+
+        # An entry cap drops the least recently used entries, not the oldest stored
+        os.environ["CACHE_MAX_ENTRIES_HUNTER"] = "2"
+        try:
+            for key in ("a", "b"):
+                cache.put("hunter", key, key)
+                time.sleep(0.01)
+            cache.get("hunter", "a")
+            time.sleep(0.01)
+            cache.put("hunter", "c", "c")
+        finally:
+            os.environ.pop("CACHE_MAX_ENTRIES_HUNTER")
+        assert [cache.get("hunter", k) is not None for k in ("a", "b", "c")] == [True, False, True]
+
+    # SQLite store: survives reopening and evicts least recently used rows past max_bytes
+    with tempfile.TemporaryDirectory() as tmp, isolated_cache() as cache:
+        path = os.path.join(tmp, "cache.sqlite")
+        cache._backend = cache.SQLiteBackend(path, max_bytes=1000)
+        for key in ("a", "b"):
+            cache.put("html", key, "x" * 400)
+            time.sleep(0.01)
+        cache.get("html", "a")
+        cache.put("html", "c", "x" * 400)
+        assert [cache.get("html", k) is not None for k in ("a", "b", "c")] == [True, False, True]
+        cache._backend._conn.close()
+        cache._backend = cache.SQLiteBackend(path, max_bytes=1000)
+        assert cache.get("html", "c")["value"] == "x" * 400, "Entries should persist across runs"
+        cache._backend._conn.close()
+
+    # Stale pages are revalidated with If-None-Match; a 304 reuses the cached copy
+    version = ['"v1"']
+    def page(headers):
+        if headers.get("If-None-Match") == version[0]:
+            return 304, {"ETag": version[0]}, ""
+        return 200, {"Content-Type": "text/html", "ETag": version[0]}, f"<title>Page {version[0]}</title>"
+
+    with local_site({"/": page}) as (base, seen), isolated_cache() as cache:
+        before = cache.stats().get("html", {}).get("revalidated", 0)
+        first = page_fetch.fetch_page(base + "/")
+        assert not first.from_cache and "If-None-Match" not in seen[-1][2]
+
+        cache.touch("html", base + "/", ttl=-1)
+        page_fetch.reset()
+        second = page_fetch.fetch_page(base + "/")
+        assert seen[-1][2].get("If-None-Match") == '"v1"' and len(seen) == 2
+        assert second.from_cache and second.html == first.html
+        assert cache.stats()["html"]["revalidated"] == before + 1
+        assert cache.get("html", base + "/")["fresh"], "A 304 should make the entry fresh again"
+
+        page_fetch.reset()
+        page_fetch.fetch_page(base + "/")
+        assert len(seen) == 2, "A fresh entry is served without a request"
+
+        # A changed page (new ETag) is downloaded and stored again
+        version[0] = '"v2"'
+        cache.touch("html", base + "/", ttl=-1)
+        page_fetch.reset()
+        third = page_fetch.fetch_page(base + "/")
+        assert not third.from_cache and third.html == '<title>Page "v2"</title>' and len(seen) == 3
+        assert cache.get("html", base + "/")["meta"]["etag"] == '"v2"'
+    print("✅ Cache TTLs, LRU eviction (memory and SQLite) and ETag revalidation behave")
+
+def test_page_read_and_encoding():
+    print("\n=== Testing Capped Page Reads and Charset Detection ===")
+    from modules import page_fetch
+
+    class FakeResponse:
+        def __init__(self, body: bytes):
+            self.body, self.closed = body, False
+
+        def iter_content(self, chunk_size):
+            for i in range(0, len(self.body), chunk_size):
+                yield self.body[i:i + chunk_size]
+
+        def close(self):
+            self.closed = True
+
+    settings = {"PAGE_MAX_BYTES": "40000", "PAGE_BODY_BYTES": "500"}
+    original = {name: os.environ.get(name) for name in settings}
+    os.environ.update(settings)
+    try:
+        small = FakeResponse(b"<html><head><title>x</title></head><body>hi</body></html>")
+        assert page_fetch._read_capped(small) == (small.body, False) and small.closed
+
+        # No </head> in sight: cut at PAGE_MAX_BYTES
+        raw, truncated = page_fetch._read_capped(FakeResponse(b"<html>" + b"x" * 50000))
+        assert truncated and len(raw) == 40000, len(raw)
+
+        # Once </head> arrives only PAGE_BODY_BYTES more are read, even when the tag straddles two chunks
+        head = b"<html><head>" + b"h" * (16 * 1024 - 15)
+        response = FakeResponse(head + b"</head><body>" + b"b" * 5000)
+        raw, truncated = page_fetch._read_capped(response)
+        assert truncated and len(raw) == len(head) + 500 and raw.startswith(head + b"</head>"), len(raw)
+        assert response.closed, "The connection should be released when reading stops early"
+    finally:
+        for name, value in original.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    detect = page_fetch._detect_encoding
+    # The Content-Type header wins, then a BOM, then <meta charset> / http-equiv
+    assert detect("text/html; charset=ISO-8859-1", b'<meta charset="utf-8">') == "iso8859-1"
+    assert detect("text/html; charset=bogus", b'<meta charset="windows-1252">') == "cp1252"
+    assert detect("text/html", b'<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">') == "shift_jis"
+    assert detect("text/html", b"\xef\xbb\xbf<html>") == "utf-8-sig"
+
+    # Nothing declared: sniff the bytes (ASCII is read as UTF-8)
+    text = "Сантехнические услуги в Москве. Круглосуточный вызов мастера и гарантия на все работы. " * 5
+    raw = f"<html><body><p>{text}</p></body></html>".encode("cp1251")
+    assert text in raw.decode(detect("text/html", raw)), detect("text/html", raw)
+    assert detect("", b"<html><body>plain ascii</body></html>") == "utf-8"
+    print(f"✅ Reads capped at the byte limits; charset from header, BOM, meta and sniffing ({detect('', raw)})")
+
+def test_fingerprints():
+    print("\n=== Testing Fingerprint Engine ===")
+    import json
+    import time
+    from modules import fingerprints, html_signals
+
+    html = ('<html><head><meta name="generator" content="WordPress 6.4">'
+            '<script src="/wp-content/plugins/x.js"></script>'
+            '<script type="application/ld+json">{"@type": ["Plumber", "FAQPage"]}</script></head></html>')
+    signals = html_signals.extract_signals(html, headers={"Server": "cloudflare"})
+    assert signals["tech_stack"] == "WordPress", f"Expected WordPress, got {signals['tech_stack']}"
+    assert "Cloudflare" in signals["technologies"]
+    assert signals["has_faq"] and signals["has_org"], "Plumber/FAQPage types should map to org/faq"
+    print(f"✅ Detected {signals['technologies']} and schema {signals['schema_types']}")
+
+    # Matching cost should not grow with the number of signatures
+    with open(fingerprints.signatures_path(), "r", encoding="utf-8") as f:
+        base = json.load(f)
+    extended = dict(base, technologies=base["technologies"] + [
+        {"name": f"Extra {i}", "category": "library", "html": [f"extra-lib-{i}.js", f"data-extra-{i}"]}
+        for i in range(50)
+    ])
+    page = html * 200
+
+    def timed(engine):
+        start = time.perf_counter()
+        for _ in range(20):
+            engine.detect(page)
+        return time.perf_counter() - start
+
+    small, large = fingerprints.FingerprintEngine(base), fingerprints.FingerprintEngine(extended)
+    assert large.detect(html)["tech_stack"] == "WordPress"
+    base_time, extended_time = timed(small), timed(large)
+    assert extended_time < base_time * 3, f"50 extra signatures slowed matching {extended_time / base_time:.1f}x"
+    print(f"   - +50 signatures: {base_time * 1000:.1f} ms -> {extended_time * 1000:.1f} ms")
+
+def test_crawler_links():
+    print("\n=== Testing Crawler Link Filtering ===")
+    from modules import crawler
+
+    base = "https://www.acme.com/services/"
+    assert crawler._normalize_link(base, "roofing#quote") == "https://www.acme.com/services/roofing"
+    assert crawler._normalize_link(base, "/logo.png") is None
+    assert crawler._normalize_link(base, "tel:+15551234") is None
+    assert crawler._same_site("www.acme.com", "acme.com")
+    assert not crawler._same_site("acme.com", "blog.other.com")
+    print("✅ Same-site HTML links kept, assets and non-http links dropped")
+
+def test_crawl_site():
+    print("\n=== Testing Site Crawl ===")
+    from modules import crawler
+
+    html = '<html><head><title>{0}</title></head><body>{1}</body></html>'
+    routes = {
+        "/": (200, {"Content-Type": "text/html"},
+              html.format("Home", '<a href="/services">Services</a> <a href="/private/x">Private</a>')),
+        "/services": (200, {"Content-Type": "text/html"}, html.format("Services", "")),
+        "/private/x": (200, {"Content-Type": "text/html"}, html.format("Private", "")),
+        "/robots.txt": (200, {"Content-Type": "text/plain"}, "User-agent: *\nDisallow: /private/\n"),
+    }
+    with local_site(routes) as (base, seen), isolated_cache():
+        os.environ["CRAWL_DELAY"] = "0"
+        try:
+            crawled = crawler.crawl(base + "/", pages=5, depth=1)
+        finally:
+            os.environ.pop("CRAWL_DELAY", None)
+
+    assert [item["url"] for item in crawled] == [base + "/", base + "/services"], [i["url"] for i in crawled]
+    assert [item["signals"]["title"] for item in crawled] == ["Home", "Services"]
+    assert "/robots.txt" in [path for _, path, _ in seen]
+    print(f"✅ Crawled {len(crawled)} pages with robots.txt loaded")
+
+def test_crawl_merge():
+    print("\n=== Testing Multi-Page Audit Merge ===")
+    from modules import seo_checks
+
+    def page(title, body="", head=""):
+        return (200, {"Content-Type": "text/html"},
+                f"<html><head><title>{title}</title>{head}</head><body>{body}</body></html>")
+
+    ld = '<script type="application/ld+json">{{"@context": "https://schema.org", "@type": "{0}"}}</script>'
+    routes = {
+        "/": page("Acme Plumbing Houston | Emergency Plumbers 24/7",
+                  '<a href="/services">Services</a> <a href="/about">About</a> <a href="/private/">Staff</a>'
+                  ' <a href="https://other.example/">Partner</a>'),
+        "/services": page("Services", '<a href="/services/drains">Drains</a>', ld.format("FAQPage")),
+        "/about": page("About", "", ld.format("LocalBusiness")),
+        "/services/drains": page("Drains"),
+        "/private/": page("Staff", "", ld.format("Organization")),
+        "/robots.txt": (200, {"Content-Type": "text/plain"}, "User-agent: *\nDisallow: /private/\n"),
+    }
+    env = {"CRAWL_MAX_PAGES": "10", "CRAWL_DEPTH": "1", "CRAWL_DELAY": "0.3"}
+    with local_site(routes) as (base, seen), isolated_cache():
+        os.environ.update(env)
+        try:
+            result = seo_checks._parse_html_seo(base + "/")
+        finally:
+            for name in env:
+                os.environ.pop(name, None)
+
+    assert "html_status" not in result, "Crawl fell back to stub data"
+    visited = [path for _, path, _ in seen if path in routes and path != "/robots.txt"]
+    assert sorted(visited) == ["/", "/about", "/services"], visited
+    assert result["pages_crawled"] == 3
+    # Homepage has no schema: FAQ and LocalBusiness come from the subpages
+    assert result["has_schema"] and result["has_faq"] and result["has_org"]
+    assert result["meta_title_ok"], "Meta tags are judged on the homepage"
+
+    # Requests to the host are spaced by CRAWL_DELAY (timed on receipt, so allow for jitter)
+    times = sorted(t for t, path, _ in seen if path in visited)
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert min(gaps) >= 0.2, gaps
+    print(f"✅ {result['pages_crawled']} pages merged, /private/ and depth-2 links skipped, "
+          f"min gap {min(gaps):.2f}s")
+
+def test_crawl_limits():
+    print("\n=== Testing Crawl Limits ===")
+    from concurrent.futures import ThreadPoolExecutor
+    from modules import cache, crawler, http_client, page_fetch
+
+    # A robots.txt outage allows the crawl but is not remembered across runs; a 404 is
+    original = os.environ.get("HTTP_BACKOFF")
+    os.environ["HTTP_BACKOFF"] = "0"
+    http_client.reset()
+    try:
+        for status in (503, 404):
+            routes = {"/robots.txt": (status, {"Content-Type": "text/plain"}, "")}
+            with local_site(routes) as (base, seen), isolated_cache():
+                crawler.reset()
+                assert crawler.robots_for(base + "/") is None
+                entry = cache.get("robots", base + "/robots.txt")
+                assert (entry is None) == (status >= 500), (status, entry)
+                first = len(seen)
+                crawler.reset()
+                crawler.robots_for(base + "/")
+                assert (len(seen) > first) == (status >= 500), (status, len(seen), first)
+    finally:
+        if original is None:
+            os.environ.pop("HTTP_BACKOFF", None)
+        else:
+            os.environ["HTTP_BACKOFF"] = original
+        http_client.reset()
+
+    # CRAWL_CONCURRENCY caps downloads across every audit thread's event loop
+    lock, in_flight, peak = threading.Lock(), [0], [0]
+
+    def slow_fetch(url, timeout=10):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.1)
+        with lock:
+            in_flight[0] -= 1
+        return page_fetch.Page(url, url, 200, {}, "<html></html>")
+
+    original = page_fetch.fetch_page
+    os.environ["CRAWL_CONCURRENCY"] = "2"
+    page_fetch.fetch_page = slow_fetch
+    try:
+        crawler.reset()
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(lambda i: crawler.crawl(f"http://site{i}.test/", pages=1), range(5)))
+    finally:
+        page_fetch.fetch_page = original
+        os.environ.pop("CRAWL_CONCURRENCY", None)
+        crawler.reset()
+    assert all(len(r) == 1 for r in results), results
+    assert peak[0] == 2, peak[0]
+    print(f"✅ robots.txt 503 refetched next run, 404 cached; peak downloads {peak[0]} across 5 crawls")
+
+def test_freshness_dates():
+    print("\n=== Testing Freshness Dates ===")
+    from modules import freshness, page_fetch
+
+    assert freshness._parse_date("2025-03-04T10:00:00Z").isoformat() == "2025-03-04T10:00:00+00:00"
+    assert freshness._parse_date("2025-03-04").year == 2025
+    assert freshness._parse_date("not a date") is None
+    # Last-Modified equal to Date is a dynamically rendered page, not a real edit time
+    dynamic = {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT", "Date": "Wed, 21 Oct 2015 07:28:05 GMT"}
+    static = {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT", "Date": "Mon, 02 Mar 2026 09:00:00 GMT"}
+    assert freshness.header_last_modified(dynamic) is None
+    assert freshness.header_last_modified(static).year == 2015
+
+    # Sitemaps are only read when the pages carry no date of their own
+    urls = "".join(f"<url><loc>/p{i}</loc><lastmod>2024-01-{i + 1:02d}</lastmod></url>" for i in range(20))
+    routes = {
+        "/robots.txt": (404, {}, ""),
+        "/sitemap.xml": (200, {"Content-Type": "application/xml"},
+                         f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'),
+    }
+    with local_site(routes) as (base, seen), isolated_cache():
+        dated = [{"page": page_fetch.Page(base, base, 200, {}, ""), "signals": {"modified_dates": ["2023-05-01"]}}]
+        undated = [{"page": page_fetch.Page(base, base, 200, {}, ""), "signals": {}}]
+        from_page = freshness.assess(base + "/", dated)
+        requests_after_page = len(seen)
+        from_sitemap = freshness.assess(base + "/", undated)
+    assert from_page["source"] == "page_date" and requests_after_page == 0, (from_page, requests_after_page)
+    assert from_sitemap["source"] == "sitemap" and from_sitemap["last_modified"] == "2024-01-20", from_sitemap
+    print("✅ Sitemap/schema dates parsed, dynamic Last-Modified ignored, sitemaps only for undated pages")
+
+def test_psi_quota_deferral():
+    print("\n=== Testing PageSpeed Quota Deferral ===")
+    import json
+    import tempfile
+    from modules import psi, scoring
+
+    original = (os.environ.get("PSI_STATE_PATH"), psi._state, os.environ.get("PSI_DAILY_QUOTA"))
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["PSI_STATE_PATH"] = os.path.join(tmp, "psi_state.json")
+        psi._state = None
+        os.environ["PSI_DAILY_QUOTA"] = "0"
+        try:
+            psi.reset()
+            metrics = psi.submit("https://quota-test.invalid/", "test-key").result()
+            assert metrics["lcp"] is None and metrics["psi_status"] == "deferred", metrics
+            assert psi.stats()["backlog"] == 1, "Deferred URL should be kept for the next run"
+            # One backlog change is below PSI_STATE_SAVE_EVERY: written at the end of the run
+            assert not os.path.exists(os.environ["PSI_STATE_PATH"])
+            psi.flush_state()
+            with open(os.environ["PSI_STATE_PATH"], encoding="utf-8") as f:
+                assert json.load(f)["backlog"] == ["https://quota-test.invalid/"]
+            # Nothing was measured, so the lead must not be scored as slow
+            assert scoring.score_lead({}, {"lcp": None, "has_schema": True}) == 0
+            print(f"✅ Over-quota URL deferred to backlog: {psi.stats()}")
+        finally:
+            psi._state = original[1]
+            if original[0] is None:
+                os.environ.pop("PSI_STATE_PATH", None)
+            else:
+                os.environ["PSI_STATE_PATH"] = original[0]
+            if original[2] is None:
+                os.environ.pop("PSI_DAILY_QUOTA", None)
+            else:
+                os.environ["PSI_DAILY_QUOTA"] = original[2]
+            psi.reset()
+
+def test_psi_payload_extraction():
+    print("\n=== Testing PageSpeed Payload Extraction ===")
+    import io
+    import json
+    from modules import psi
+
+    payload = {"lighthouseResult": {
+        "finalDisplayedUrl": "https://www.acme.com/",
+        "categories": {"performance": {"score": 0.42}, "seo": {"score": 0.83}},
+        "audits": {
+            "largest-contentful-paint": {"numericValue": 5123.4},
+            "cumulative-layout-shift": {"numericValue": 0.2134},
+            "total-blocking-time": {"numericValue": 612.2},
+            "final-screenshot": {"details": {"data": "A" * 200000}},
+            "render-blocking-resources": {"details": {"overallSavingsMs": 830, "items": [{"url": "a.css"}, {"url": "b.js"}]}},
+            "modern-image-formats": {"details": {"overallSavingsBytes": 102400, "items": [{"url": "x.jpg"}]}},
+            "is-crawlable": {"score": 0},
+        },
+    }}
+    body = json.dumps(payload).encode()
+
+    class FakeResponse:
+        raw = io.BytesIO(body)
+
+        def json(self):
+            return json.loads(body)
+
+        def close(self):
+            pass
+
+    streamed = psi._extract_metrics(psi._stream_payload(FakeResponse()))
+    assert streamed == psi._extract_metrics(payload), "Streamed and full parses should agree"
+    assert streamed["lcp"] == 5.12 and streamed["cls"] == 0.213 and streamed["tbt_ms"] == 612
+    assert streamed["render_blocking_count"] == 2 and streamed["image_savings_kb"] == 100
+    assert streamed["seo_score"] == 83 and streamed["seo_audits"]["is-crawlable"] == 0
+    assert streamed["final_url"] == "https://www.acme.com/"
+    # A payload without LCP or a performance score is not measured, not slow
+    partial = psi._extract_metrics({"lighthouseResult": {"audits": {}, "categories": {}}})
+    assert partial["lcp"] is None and partial["performance_score"] is None, partial
+    print(f"✅ Extracted {len(streamed)} metrics from one Lighthouse payload")
+
+def test_stub_determinism():
+    print("\n=== Testing Deterministic Stubs ===")
+    from modules import seo_checks, industry_discovery
+
+    url = "https://www.example-plumbers-1.com"
+    first = seo_checks.evaluate_site(url)
+    assert seo_checks.evaluate_site(url) == first, "Same URL should give the same stub audit"
+    assert industry_discovery._serp_volume_proxy("Houston, TX", "plumbers") == \
+        industry_discovery._serp_volume_proxy("houston, tx", "Plumbers")
+
+    original = os.environ.get("STUB_SEED")
+    try:
+        audits = []
+        for seed in ("1", "2"):
+            os.environ["STUB_SEED"] = seed
+            audits.append([seo_checks.evaluate_site(f"https://www.example-{i}.com") for i in range(10)])
+        assert audits[0] != audits[1], "A different STUB_SEED should give a different dataset"
+    finally:
+        if original is None:
+            os.environ.pop("STUB_SEED", None)
+        else:
+            os.environ["STUB_SEED"] = original
+    print(f"✅ Stub audits are stable per URL and seed (LCP {first['lcp']}s, {first['tech_stack']})")
+
+def test_stage_metrics():
+    print("\n=== Testing Stage Timings ===")
+    from modules import metrics
+
+    metrics.reset()
+    for seconds in (0.1, 0.2, 0.3, 0.4, 2.0):
+        metrics.record("audit", seconds)
+    try:
+        with metrics.timer("llm"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+
+    summary = metrics.stats()
+    assert list(summary) == ["audit", "llm"], "Stages should be reported in pipeline order"
+    assert summary["audit"]["count"] == 5 and summary["audit"]["p50_s"] == 0.3
+    assert summary["audit"]["p95_s"] == 2.0 and summary["audit"]["total_s"] == 3.0
+    assert summary["llm"]["count"] == 1, "A stage that raises should still be timed"
+    metrics.reset()
+    assert metrics.stats() == {}
+    print(f"✅ Stage timings: audit p50 {summary['audit']['p50_s']}s / p95 {summary['audit']['p95_s']}s")
+
+def test_llm_analysis_cache():
+    print("\n=== Testing LLM Analysis Cache ===")
+    from modules import cache, llm_seo_analyzer
+
+    calls = []
+    def fake_analyze(content, url, business_name, industry):
+        calls.append(content)
+        return {"seo_score": 40 + len(calls)}
+
+    original = (cache._backend, os.environ.get("CACHE_MAX_ENTRIES_LLM_ANALYSIS"))
+    cache._backend = cache.MemoryBackend()
+    os.environ["CACHE_MAX_ENTRIES_LLM_ANALYSIS"] = "2"
+    try:
+        analyze = lambda content, model="model-a": llm_seo_analyzer._cached_analysis(
+            fake_analyze, model, content, "https://acme.test", "Acme", "plumbers")
+        first = analyze("TITLE: Acme")
+        assert analyze("TITLE: Acme") == first and len(calls) == 1, "Unchanged content should skip the LLM"
+        analyze("TITLE: Acme v2")
+        analyze("TITLE: Acme", model="model-b")
+        assert len(calls) == 3, "Changed content or a different model needs a fresh analysis"
+
+        # Cap of 2 entries: storing the model-b analysis evicted the least recently used one,
+        # and re-analyzing it in turn evicts "v2"
+        analyze("TITLE: Acme")
+        assert len(calls) == 4
+        key = llm_seo_analyzer.analysis_cache_key("model-a", "TITLE: Acme v2", "Acme", "plumbers")
+        assert cache.get("llm_analysis", key) is None, "Oldest entry beyond the cap should be evicted"
+
+        # Model overrides (e.g. from .env, loaded after import) apply at call time
+        os.environ["ANTHROPIC_MODEL"] = "claude-test-model"
+        try:
+            payload = llm_seo_analyzer.build_payload("anthropic", "TITLE: Acme", "https://acme.test", "Acme", "plumbers")
+            assert payload["model"] == llm_seo_analyzer.model_for("anthropic") == "claude-test-model"
+        finally:
+            os.environ.pop("ANTHROPIC_MODEL", None)
+        print(f"✅ LLM analyses reused for unchanged content ({len(calls)} calls for 5 lookups)")
+    finally:
+        cache._backend = original[0]
+        if original[1] is None:
+            os.environ.pop("CACHE_MAX_ENTRIES_LLM_ANALYSIS", None)
+        else:
+            os.environ["CACHE_MAX_ENTRIES_LLM_ANALYSIS"] = original[1]
+
+def test_content_distill():
+    print("\n=== Testing LLM Content Distillation ===")
+    from bs4 import BeautifulSoup
+    from modules import content_distill, html_signals
+
+    filler = "<div>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40 + "</div>"
+    html = f"""<html><head><title>Acme Plumbing</title><meta name="description" content="Houston plumbers">
+    <script>var tracking = 1;</script></head><body>
+    <div class="menu"><a href="/">Home</a> <a href="/about">About</a> <a href="/blog">Blog</a></div>
+    {filler}
+    <h1>Emergency Plumbers in Houston</h1>
+    <ul><li>Drain cleaning and hydro jetting<li>Water heater installation</ul>
+    <p>Licensed, bonded and insured since 1998.</p><p>Licensed, bonded and insured since 1998.</p>
+    <a href="/quote">Get a free estimate</a> <a href="tel:+17135550100">(713) 555-0100</a>
+    <footer>Copyright Acme</footer></body></html>"""
+
+    # Blocks come from the audit's signal pass; the tree-based extractor finds the same ones
+    signals = html_signals.extract_signals(html)
+    assert signals["content_blocks"] == html_signals.extract_signals_soup(BeautifulSoup(html, "html.parser"),
+                                                                          html)["content_blocks"]
+    full = content_distill.distill(signals, budget=10000)
+    assert full["title"] == "Acme Plumbing" and full["meta_description"] == "Houston plumbers"
+    assert "tracking" not in full["content"] and "Copyright" not in full["content"]
+    assert full["content"].count("since 1998") == 1, "Repeated blocks should be sent once"
+
+    # The old 3000-character cut kept the menu and filler and dropped everything after them
+    small = content_distill.distill(signals, budget=60)
+    assert small["tokens"] <= 60, small["tokens"]
+    for expected in ("# Emergency Plumbers in Houston", "- Drain cleaning", "free estimate", "(713) 555-0100"):
+        assert expected in small["content"], f"{expected!r} missing from {small['content']!r}"
+    assert "Lorem" not in small["content"] and "About" not in small["content"]
+
+    # The LLM stage reuses the audit's parse of the page instead of parsing it again
+    from modules import llm_seo_analyzer, page_fetch
+    with local_site({"/": (200, {"Content-Type": "text/html"}, html)}) as (base, _), isolated_cache():
+        html_signals.extract_page_signals(page_fetch.fetch_page(base + "/"))
+        original = html_signals.extract_signals
+        html_signals.extract_signals = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("parsed twice"))
+        try:
+            assert "Emergency Plumbers in Houston" in llm_seo_analyzer.extract_page_content(base + "/")
+        finally:
+            html_signals.extract_signals = original
+    print(f"✅ {small['kept']} of {small['blocks']} blocks kept in {small['tokens']} tokens")
+
+def test_llm_prompt_caching():
+    print("\n=== Testing LLM Prompt Prefix & Usage Accounting ===")
+    import json
+    from modules import llm_seo_analyzer
+
+    # The instructions are a fixed, cache-marked prefix; only the user message varies per lead
+    first = llm_seo_analyzer.build_payload("anthropic", "TITLE: Acme", "https://acme.test", "Acme", "plumbers")
+    second = llm_seo_analyzer.build_payload("anthropic", "TITLE: Best", "https://best.test", "Best", "roofers")
+    assert first["system"] == second["system"], "System prefix must be identical across leads"
+    assert first["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert first["system"][-1]["text"] == llm_seo_analyzer.CLAUDE_INSTRUCTIONS
+    assert "TITLE: Acme" not in json.dumps(first["system"]) and "TITLE: Acme" in json.dumps(first["messages"])
+    openai = llm_seo_analyzer.build_payload("openai", "TITLE: Acme", "https://acme.test", "Acme", "plumbers")
+    assert openai["messages"][0]["content"] == llm_seo_analyzer.OPENAI_INSTRUCTIONS
+
+    llm_seo_analyzer.reset_usage()
+    try:
+        llm_seo_analyzer.record_usage("anthropic", {"input_tokens": 300, "cache_creation_input_tokens": 900,
+                                                    "output_tokens": 200})
+        llm_seo_analyzer.record_usage("anthropic", {"input_tokens": 310, "cache_read_input_tokens": 900,
+                                                    "output_tokens": 180})
+        llm_seo_analyzer.record_usage("openai", {"prompt_tokens": 1500, "completion_tokens": 100,
+                                                 "prompt_tokens_details": {"cached_tokens": 1024}})
+        stats = llm_seo_analyzer.usage_stats()
+        assert stats["anthropic"] == {"responses": 2, "input": 610, "cache_read": 900,
+                                      "cache_write": 900, "output": 380}, stats
+        assert stats["openai"]["input"] == 476 and stats["openai"]["cache_read"] == 1024
+        llm_seo_analyzer.report_usage()
+        print("✅ Shared instruction prefix, cached/uncached tokens accounted")
+    finally:
+        llm_seo_analyzer.reset_usage()
+
+def test_llm_stage():
+    print("\n=== Testing Concurrent LLM Stage ===")
+    import time
+    import threading
+    import requests
+    import main as pipeline
+    from modules import llm_seo_analyzer, rate_limit
+
+    # Token budget: a minute's worth up front, unused estimate refunded
+    bucket = rate_limit.TokenBucket(100 / 60, 100)
+    bucket.acquire(100)
+    bucket.refund(60)
+    started = time.monotonic()
+    bucket.acquire(50)
+    assert time.monotonic() - started < 0.5, "Refunded tokens should be reusable at once"
+
+    response = requests.Response()
+    response.headers["retry-after"] = "7"
+    assert llm_seo_analyzer._retry_after(response) == 7.0
+    response.headers["retry-after-ms"] = "1500"
+    assert llm_seo_analyzer._retry_after(response) == 1.5
+
+    # A provider that keeps answering 429 is retried LLM_MAX_ATTEMPTS times (read per call), by this
+    # loop alone, and the rejected attempts hand their token charge back
+    from modules import http_client
+    assert 429 not in http_client.get_session(retry_429=False).get_adapter("https://x").max_retries.status_forcelist
+    assert 429 in http_client.get_session().get_adapter("https://x").max_retries.status_forcelist
+    posts = []
+    def always_429(url, **kwargs):
+        posts.append((url, kwargs.get("retry_429")))
+        limited = requests.Response()
+        limited.status_code = 429
+        limited.headers["retry-after-ms"] = "10"
+        return limited
+    original_post = http_client.post
+    http_client.post = always_429
+    os.environ["LLM_MAX_ATTEMPTS"] = "2"
+    try:
+        payload = llm_seo_analyzer.build_payload("openai", "TITLE: Acme", "https://acme.test", "Acme", "plumbers")
+        limiter = rate_limit.get_token_limiter("openai")
+        limiter.acquire(0)  # refill to now
+        before = limiter._tokens
+        assert llm_seo_analyzer._post_llm("openai", "https://llm.test", {}, payload).status_code == 429
+        assert posts == [("https://llm.test", False)] * 2, posts
+        assert limiter._tokens >= before, f"429s drained the token budget ({before:.0f} -> {limiter._tokens:.0f})"
+    finally:
+        http_client.post = original_post
+        os.environ.pop("LLM_MAX_ATTEMPTS", None)
+
+    calls, in_flight, peak = [], [0], [0]
+    lock = threading.Lock()
+    def fake_analyze(url, business_name="", industry=""):
+        with lock:
+            calls.append(url)
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.2)
+        with lock:
+            in_flight[0] -= 1
+        return {"llm_seo_score": 55, "llm_pitch_angle": f"Pitch for {business_name}"}
+
+    rows = [{"Website": f"https://site-{i}.test", "BusinessName": f"Biz {i}", "Industry": "plumbers",
+             "Score": 80 if i < 8 else 20} for i in range(10)]
+    rows.append(dict(rows[0]))  # same lead twice shares one analysis
+    # Same site found under another industry (audit dedup key): still one analysis
+    rows.append(dict(rows[1], Website="https://www.site-1.test/", Industry="pipe repair"))
+    original = llm_seo_analyzer.analyze_website_with_llm
+    llm_seo_analyzer.analyze_website_with_llm = fake_analyze
+    try:
+        started = time.monotonic()
+        analyzed = pipeline._run_llm_stage(rows, workers=8)
+        elapsed = time.monotonic() - started
+    finally:
+        llm_seo_analyzer.analyze_website_with_llm = original
+
+    assert analyzed == 8 and len(calls) == 8, "Only qualifying, distinct leads should be analyzed"
+    assert peak[0] > 1 and elapsed < 1.0, f"Analyses should overlap (peak {peak[0]}, {elapsed:.2f}s)"
+    assert rows[-2]["LLM_PitchAngle"] == "Pitch for Biz 0" and rows[9].get("LLM_PitchAngle") is None
+    assert rows[-1]["LLM_PitchAngle"] == "Pitch for Biz 1", "Cross-industry duplicate should reuse the analysis"
+    print(f"✅ {analyzed} LLM analyses ran {peak[0]} at a time in {elapsed:.2f}s")
+
+def test_llm_batch_local():
+    print("\n=== Testing LLM Batch Mode (local backend) ===")
+    import json
+    import tempfile
+    import main as pipeline
+    from modules import cache, llm_batch, llm_seo_analyzer
+
+    settings = {"LLM_BATCH_PROVIDER": "local", "LLM_BATCH_WAIT": "0", "LLM_LOCAL_BATCH_DELAY": "3600"}
+    original = (cache._backend, llm_seo_analyzer.extract_page_content,
+                {name: os.environ.get(name) for name in list(settings) + ["LLM_BATCH_DIR", "LLM_MODE"]})
+    targets = [(f"https://site-{i}.test", f"Biz {i}", "plumbers") for i in range(3)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache._backend = cache.MemoryBackend()
+        llm_seo_analyzer.extract_page_content = lambda url: f"TITLE: {url}"
+        os.environ.update(settings, LLM_BATCH_DIR=tmp)
+        try:
+            # Batch not done yet: rows get placeholders and the batch is tracked
+            first = llm_batch.analyze_batch(targets)
+            assert all(r["llm_pitch_angle"] == "Analysis pending (batch)" for r in first)
+            assert len(llm_batch.pending_ids()) == 3
+            batch_file = [f for f in os.listdir(tmp) if f.endswith(".jsonl")][0]
+            with open(os.path.join(tmp, batch_file)) as f:
+                line = json.loads(f.readline())
+            assert set(line) == {"custom_id", "params"} and line["params"]["messages"]
+
+            # Re-running while pending must not resubmit the same requests
+            llm_batch.analyze_batch(targets)
+            assert len([f for f in os.listdir(tmp) if f.endswith(".jsonl")]) == 1
+
+            # In the pipeline, rows waiting on a batch are held back instead of saved with a placeholder
+            os.environ["LLM_MODE"] = "batch"
+            rows = [{"Website": website, "BusinessName": name, "Industry": industry, "Score": 80}
+                    for website, name, industry in targets]
+            rows.append({"Website": "", "BusinessName": "No site", "Industry": "plumbers", "Score": 90})
+            pipeline._run_llm_stage(rows, workers=4)
+            assert [r["BusinessName"] for r in rows] == ["No site"], rows
+
+            # Once the batch ends, results are collected into the cache and the held rows released
+            os.environ["LLM_LOCAL_BATCH_DELAY"] = "0"
+            assert llm_batch.collect()["collected"] == 3
+            released = []
+            pipeline._run_llm_stage(released, workers=4)
+            assert sorted(r["BusinessName"] for r in released) == ["Biz 0", "Biz 1", "Biz 2"]
+            assert all(r["LLM_SEOScore"] is not None for r in released) and llm_batch.release_rows() == []
+            merged = llm_batch.analyze_batch(targets)
+            assert all(r["llm_seo_score"] is not None for r in merged) and not llm_batch.pending_ids()
+            print(f"✅ Batch submitted once, collected and merged (scores {[r['llm_seo_score'] for r in merged]})")
+        finally:
+            cache._backend, llm_seo_analyzer.extract_page_content = original[0], original[1]
+            for name, value in original[2].items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
 def main():
     print("=" * 60)
     print("SEO Lead Finder - Test Suite")
@@ -222,12 +1385,35 @@ def main():
     try:
         # Run all tests
         test_industry_discovery()
+        test_dataforseo_batch()
+        test_http_retries()
+        test_discovery_concurrency()
         test_lead_finder()
+        test_places_pagination()
+        test_place_details_fields()
         test_seo_checks()
         test_scoring()
         test_sheets_io_mock()
         test_alerts()
         test_full_pipeline_dry_run()
+        test_concurrent_audits()
+        test_response_cache()
+        test_page_read_and_encoding()
+        test_fingerprints()
+        test_crawler_links()
+        test_crawl_site()
+        test_crawl_merge()
+        test_crawl_limits()
+        test_freshness_dates()
+        test_psi_quota_deferral()
+        test_psi_payload_extraction()
+        test_stub_determinism()
+        test_stage_metrics()
+        test_llm_analysis_cache()
+        test_content_distill()
+        test_llm_prompt_caching()
+        test_llm_stage()
+        test_llm_batch_local()
         
         print("\n" + "=" * 60)
         print("✅ ALL TESTS PASSED!")